@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Codec micro-benchmarks: per-frame scalar codec throughput / allocation,
+signal_db-compiled codecs vs. hand-written struct code, and scalar
+Message2.decode vs. batched decode_many.
+
+Usage::
+
+    python benchmarks/bench_codec.py [N_FRAMES]
+"""
+
+from __future__ import annotations
+
+import struct
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from obc_controller.can_protocol import (  # noqa: E402
+    MESSAGE2_DTYPE,
+    Message1,
+    Message2,
+    StatusFlags,
+    decode_many,
+    encode_many,
+)
+from obc_controller.signal_db import SignalDatabase  # noqa: E402
+
+# ---------------------------------------------------------------------------
+# Hand-written reference codec (the pre-signal_db implementation)
+# ---------------------------------------------------------------------------
+_M1 = struct.Struct(">HHB3x")
+_M2 = struct.Struct(">HHBHB")
+
+
+def _hand_encode_m1(m: Message1) -> bytes:
+    v_raw = int(round(m.voltage_setpoint * 10))
+    i_raw = int(round(m.current_setpoint * 10))
+    v_raw = 0 if v_raw < 0 else 0xFFFF if v_raw > 0xFFFF else v_raw
+    i_raw = 0 if i_raw < 0 else 0xFFFF if i_raw > 0xFFFF else i_raw
+    return _M1.pack(v_raw, i_raw, m.control)
+
+
+def _hand_decode_m2(data: bytes) -> Message2:
+    if len(data) < 8:
+        raise ValueError(f"Message2 requires 8 bytes, got {len(data)}")
+    v_raw, i_raw, status, vin_raw, temp_raw = _M2.unpack_from(data, 0)
+    return Message2(v_raw / 10.0, i_raw / 10.0,
+                    StatusFlags.from_byte(status), vin_raw / 10.0,
+                    temp_raw - 40)
+
+
+def _hand_encode_m2(m: Message2) -> bytes:
+    v_raw = int(round(m.output_voltage * 10))
+    i_raw = int(round(m.output_current * 10))
+    vin_raw = int(round(m.input_voltage * 10))
+    temp_raw = int(round(m.temperature + 40))
+    v_raw = 0 if v_raw < 0 else 0xFFFF if v_raw > 0xFFFF else v_raw
+    i_raw = 0 if i_raw < 0 else 0xFFFF if i_raw > 0xFFFF else i_raw
+    vin_raw = 0 if vin_raw < 0 else 0xFFFF if vin_raw > 0xFFFF else vin_raw
+    temp_raw = 0 if temp_raw < 0 else 0xFF if temp_raw > 0xFF else temp_raw
+    return _M2.pack(v_raw, i_raw, m.status.to_byte(), vin_raw, temp_raw)
+
+
+def _session(n: int) -> bytes:
+    """Synthetic recorded session: *n* random Message2 payloads."""
+    rng = np.random.default_rng(0)
+    rec = np.empty(n, dtype=MESSAGE2_DTYPE)
+    rec["vout"] = rng.uniform(0, 450, n).round(1)
+    rec["iout"] = rng.uniform(0, 60, n).round(1)
+    rec["status"] = rng.integers(0, 32, n)
+    rec["vin"] = rng.uniform(180, 260, n).round(1)
+    rec["temp"] = rng.integers(-40, 120, n)
+    return encode_many(rec)
+
+
+def _best(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _retained_bytes(fn, n: int) -> float:
+    """Bytes allocated per call when *n* results are kept alive."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    keep = [fn() for _ in range(n)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(st.size_diff for st in after.compare_to(before, "filename"))
+    del keep
+    return (total - sys.getsizeof([None] * n)) / n
+
+
+def bench_scalar(n: int) -> None:
+    frame2 = Message2(output_voltage=321.4, output_current=12.3,
+                      input_voltage=230.1, temperature=45).encode()
+    msg1 = Message1(voltage_setpoint=320.0, current_setpoint=9.5)
+    msg2 = Message2.decode(frame2)
+    cases = [
+        ("Message2.decode", lambda: Message2.decode(frame2)),
+        ("Message2.encode", msg2.encode),
+        ("Message1.encode", msg1.encode),
+        ("StatusFlags.from_byte", lambda: msg2.status.from_byte(0x05)),
+    ]
+    print(f"Scalar codec, {n:,} calls")
+    for name, fn in cases:
+        t = _best(lambda: [fn() for _ in range(n)])
+        alloc = _retained_bytes(fn, min(n, 100_000))
+        print(f"  {name:<22}: {t / n * 1e9:6.0f} ns/call  "
+              f"{alloc:6.0f} B/result")
+
+
+def bench_compiled(n: int) -> None:
+    frame2 = Message2(output_voltage=321.4, output_current=12.3,
+                      input_voltage=230.1, temperature=45).encode()
+    msg1 = Message1(voltage_setpoint=320.0, current_setpoint=9.5)
+    msg2 = Message2.decode(frame2)
+    assert _hand_decode_m2(frame2) == msg2
+    assert _hand_encode_m1(msg1) == msg1.encode()
+
+    # A bit-packed little-endian variant exercises the generic
+    # (int.from_bytes + shift/mask) path instead of struct.
+    packed = SignalDatabase.from_dict({"messages": [{
+        "name": "Message2", "frame_id": 0x18FF50E5,
+        "byte_order": "little_endian",
+        "signals": [
+            {"name": "output_voltage", "start_bit": 0, "length": 14,
+             "factor": 0.1},
+            {"name": "output_current", "start_bit": 14, "length": 12,
+             "factor": 0.1},
+            {"name": "status", "start_bit": 26, "length": 5},
+            {"name": "input_voltage", "start_bit": 31, "length": 13,
+             "factor": 0.1},
+            {"name": "temperature", "start_bit": 44, "length": 8,
+             "offset": -40},
+        ],
+    }]})
+    generic_decode = packed.codec("Message2").make_decoder()
+
+    cases = [
+        ("Message2.decode", lambda: _hand_decode_m2(frame2),
+         lambda: Message2.decode(frame2)),
+        ("Message2.encode", lambda: _hand_encode_m2(msg2), msg2.encode),
+        ("Message1.encode", lambda: _hand_encode_m1(msg1), msg1.encode),
+        ("Message2.decode (bit-packed)", None,
+         lambda: generic_decode(Message2, frame2)),
+    ]
+    print(f"Compiled signal_db codec vs. hand-written, {n:,} calls")
+    for name, hand, compiled in cases:
+        t_c = _best(lambda: [compiled() for _ in range(n)], repeat=5)
+        if hand is None:
+            print(f"  {name:<28}: {'':>14} compiled "
+                  f"{t_c / n * 1e9:5.0f} ns")
+            continue
+        t_h = _best(lambda: [hand() for _ in range(n)], repeat=5)
+        print(f"  {name:<28}: hand {t_h / n * 1e9:5.0f} ns  compiled "
+              f"{t_c / n * 1e9:5.0f} ns  ({(t_c / t_h - 1) * 100:+.0f}%)")
+
+
+def bench_decode(n: int) -> None:
+    buf = _session(n)
+    frames = [buf[k:k + 8] for k in range(0, len(buf), 8)]
+
+    t_scalar = _best(lambda: [Message2.decode(f) for f in frames])
+    t_vector = _best(lambda: decode_many(buf))
+
+    # Sanity: both paths must agree
+    arr = decode_many(buf)
+    for k in (0, n // 2, n - 1):
+        m = Message2.decode(frames[k])
+        assert arr["vout"][k] == m.output_voltage
+        assert arr["temp"][k] == m.temperature
+        assert arr["status"][k] == m.status.to_byte()
+
+    print(f"Message2 decode, {n:,} frames")
+    print(f"  scalar  Message2.decode : {t_scalar * 1e3:9.1f} ms "
+          f"({t_scalar / n * 1e9:7.0f} ns/frame)")
+    print(f"  batched decode_many     : {t_vector * 1e3:9.1f} ms "
+          f"({t_vector / n * 1e9:7.0f} ns/frame)  "
+          f"x{t_scalar / t_vector:.0f}")
+
+
+def bench_encode(n: int) -> None:
+    arr = decode_many(_session(n))
+    msgs = [
+        Message2(output_voltage=vout, output_current=iout,
+                 input_voltage=vin, temperature=temp)
+        for vout, iout, _, vin, temp in arr.tolist()
+    ]
+    t_scalar = _best(lambda: b"".join(m.encode() for m in msgs))
+    t_vector = _best(lambda: encode_many(arr))
+    print(f"Message2 encode, {n:,} frames")
+    print(f"  scalar  Message2.encode : {t_scalar * 1e3:9.1f} ms")
+    print(f"  batched encode_many     : {t_vector * 1e3:9.1f} ms  "
+          f"x{t_scalar / t_vector:.0f}")
+
+    m1 = np.zeros(n, dtype=[("voltage", "f8"), ("current", "f8"),
+                            ("control", "u1")])
+    m1["voltage"] = arr["vout"]
+    m1["current"] = arr["iout"]
+    t_m1 = _best(lambda: encode_many(m1, Message1))
+    print(f"  batched encode_many(M1) : {t_m1 * 1e3:9.1f} ms")
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    bench_scalar(min(n, 200_000))
+    bench_compiled(min(n, 200_000))
+    bench_decode(n)
+    bench_encode(min(n, 200_000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""TX timing under UI load: engine thread vs. isolated engine process.
+
+Runs the charger engine on a python-can virtual bus twice -- once as a
+thread of this process (like ``CANWorker``) and once in a child process
+(``ProcessEngine``) -- while *LOAD_THREADS* pure-Python busy loops in this
+process stand in for a saturated UI thread.  Prints the Message1 period
+percentiles and scheduler jitter reported by the engine in each mode.
+
+Usage::
+
+    python benchmarks/bench_engine_isolation.py [SECONDS] [LOAD_THREADS]
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from obc_controller.can_protocol import ChargerControl  # noqa: E402
+from obc_controller.engine import ChargerEngine  # noqa: E402
+from obc_controller.events import EventBuffer  # noqa: E402
+from obc_controller.process_engine import ProcessEngine  # noqa: E402
+
+
+def _configure(engine, channel: str) -> None:
+    engine.set_connection_params("virtual", channel, 500000)
+    engine.set_setpoints(320.0, 10.0)
+    engine.set_control(ChargerControl.START_CHARGING)
+    engine.enable_tx(True)
+
+
+def _busy(stop: threading.Event) -> None:
+    """GIL-holding work, like layout / plotting on the UI thread."""
+    while not stop.is_set():
+        acc = 0
+        for i in range(20000):
+            acc += i * i
+
+
+def _latest(events: EventBuffer, found: dict) -> None:
+    for kind, args in events.drain():
+        if kind in ("health_stats", "tx_jitter"):
+            found[kind] = args
+
+
+def _run(mode: str, seconds: float, load_threads: int) -> dict:
+    events = EventBuffer()
+    if mode == "thread":
+        engine = ChargerEngine(events.push)
+        _configure(engine, "bench-thread")
+        runner = threading.Thread(target=engine.run, daemon=True)
+        runner.start()
+    else:
+        engine = ProcessEngine(events)
+        _configure(engine, "bench-process")
+        engine.start()
+
+    stop = threading.Event()
+    load = [threading.Thread(target=_busy, args=(stop,), daemon=True)
+            for _ in range(load_threads)]
+    for t in load:
+        t.start()
+
+    found: dict = {}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        time.sleep(0.033)
+        if mode == "process":
+            engine.poll()
+        _latest(events, found)
+
+    stop.set()
+    for t in load:
+        t.join()
+    engine.request_stop()
+    if mode == "thread":
+        runner.join()
+    else:
+        engine.wait()
+    _latest(events, found)
+    return found
+
+
+def main() -> int:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 15.0
+    load_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    print(f"{seconds:.0f} s per mode, {load_threads} busy thread(s)\n")
+    print(f"{'mode':<8} {'cycles':>6} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'jitter mean':>12} {'jitter max':>11}")
+    for mode in ("thread", "process"):
+        found = _run(mode, seconds, load_threads)
+        if "health_stats" not in found:
+            print(f"{mode:<8} no health data")
+            continue
+        period = found["health_stats"][0].tx_period
+        jmean, jmax = found.get("tx_jitter", (0.0, 0.0))
+        print(f"{mode:<8} {period.count:>6} {period.p50_ms:>8.2f} "
+              f"{period.p99_ms:>8.2f} {period.max_ms:>8.2f} "
+              f"{jmean:>12.3f} {jmax:>11.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
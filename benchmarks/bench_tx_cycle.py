@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Achieved Message1 rate and jitter at configurable TX cycles.
+
+Runs the charger engine on a python-can virtual bus at each cycle in
+*CYCLES_MS* and receives its Message1 frames on a second virtual bus
+node.  For every cycle prints the achieved rate against the nominal one,
+the long-run drift (last frame vs. ``first + n * period``), the period
+percentiles seen on the bus, the scheduler jitter reported by the engine
+and the slots given up after a stall.
+
+Usage::
+
+    python benchmarks/bench_tx_cycle.py [SECONDS] [CYCLE_MS ...]
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import can  # noqa: E402
+
+from obc_controller.can_protocol import (  # noqa: E402
+    DEFAULT_PROTOCOL,
+    ChargerControl,
+)
+from obc_controller.engine import ChargerEngine  # noqa: E402
+from obc_controller.stats import TIMING_PER_DECADE, LogHistogram  # noqa: E402
+
+CYCLES_MS = (10, 20, 100, 500)
+
+
+def _run(cycle_ms: int, seconds: float) -> dict:
+    channel = f"bench-cycle-{cycle_ms}"
+    found: dict = {}
+
+    def publish(kind: str, *args) -> None:
+        if kind in ("health_stats", "tx_jitter"):
+            found[kind] = args
+
+    engine = ChargerEngine(publish)
+    engine.set_connection_params("virtual", channel, 500000)
+    engine.set_cycle_ms(cycle_ms)
+    engine.set_setpoints(320.0, 10.0)
+    engine.set_control(ChargerControl.START_CHARGING)
+    engine.enable_tx(True)
+
+    peer = can.Bus(interface="virtual", channel=channel)
+    runner = threading.Thread(target=engine.run, daemon=True)
+    runner.start()
+
+    # Time frames by their bus timestamp, not the engine's own clock
+    stamps: list[float] = []
+    msg1_id = DEFAULT_PROTOCOL.msg1_id
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = peer.recv(timeout=0.1)
+        if frame is not None and frame.arbitration_id == msg1_id:
+            stamps.append(frame.timestamp)
+    engine.enable_tx(False)
+    engine.request_stop()
+    runner.join()
+    peer.shutdown()
+
+    found["stamps"] = stamps
+    return found
+
+
+def main() -> int:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    cycles = [int(v) for v in sys.argv[2:]] or list(CYCLES_MS)
+    print(f"{seconds:.0f} s per cycle on a virtual bus\n")
+    print(f"{'cycle':>6} {'frames':>7} {'rate Hz':>9} {'nominal':>8} "
+          f"{'drift ms':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'jitter mean':>12} {'jitter max':>11} {'missed':>7}")
+    for cycle_ms in cycles:
+        found = _run(cycle_ms, seconds)
+        stamps = found["stamps"]
+        if len(stamps) < 2:
+            print(f"{cycle_ms:>6} too few frames")
+            continue
+        period = cycle_ms / 1000.0
+        n = len(stamps) - 1
+        span = stamps[-1] - stamps[0]
+        hist = LogHistogram(per_decade=TIMING_PER_DECADE)
+        for a, b in zip(stamps, stamps[1:]):
+            hist.add(b - a)
+        s = hist.summary_ms()
+        drift_ms = (span - n * period) * 1000.0
+        jmean, jmax = found.get("tx_jitter", (0.0, 0.0))
+        missed = found["health_stats"][0].tx_missed
+        print(f"{cycle_ms:>6} {len(stamps):>7} {n / span:>9.2f} "
+              f"{1.0 / period:>8.2f} {drift_ms:>9.2f} {s.p50_ms:>8.2f} "
+              f"{s.p99_ms:>8.2f} {s.max_ms:>8.2f} {jmean:>12.3f} "
+              f"{jmax:>11.3f} {missed:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
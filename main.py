@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """OBC Charger Controller — desktop application entry point."""
 
+import multiprocessing
 import sys
 from pathlib import Path
 
@@ -30,4 +31,5 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # frozen builds: process engine child
     main()
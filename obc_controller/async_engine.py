@@ -0,0 +1,463 @@
+"""
+asyncio charger engine for headless and scripted use.
+
+:class:`AsyncChargerEngine` runs the same cycle as
+:class:`~obc_controller.engine.ChargerEngine` -- Message1 TX with ramp,
+Message2 RX with timeout alarm and status-bit change detection,
+safe-stop on shutdown -- as coroutines on the caller's event loop.
+RX goes through a ``can.Notifier`` into an ``AsyncBufferedReader``;
+for buses with a file descriptor (SocketCAN) the notifier registers it
+with the loop, so one event loop drives dozens of chargers without a
+Qt event loop or a thread per bus::
+
+    async with AsyncChargerEngine("socketcan", "can0", 250000) as obc:
+        await obc.set_setpoints(320.0, 10.0)
+        await obc.set_control(ChargerControl.START_CHARGING)
+        await obc.enable_tx(True)
+        async for msg2 in obc.telemetry():
+            print(msg2.output_voltage)
+
+Commands resolve with the first Message1 sent after the change.  Other
+events go to the optional ``publish(kind, *args)`` callback, with the
+:data:`~obc_controller.engine.EVENT_KINDS` names.  Driver-cyclic TX
+(``send_periodic``) is not used here; Message1 is always sent from the
+loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Iterable, Optional
+
+import can
+
+from obc_controller.can_protocol import (
+    CYCLE_MS,
+    DEFAULT_PROTOCOL,
+    TIMEOUT_S,
+    ChargerControl,
+    ChargerProtocol,
+    Message1,
+    Message2,
+)
+from obc_controller.clock import AdapterClock
+from obc_controller.engine import MIN_CYCLE_MS, SAFE_STOP_CYCLES
+from obc_controller.engine_common import (
+    FilterStats,
+    Publisher,
+    RampState,
+    TxFrameCache,
+    discard,
+    install_filters,
+    status_edges,
+    stop_frame,
+)
+from obc_controller.scheduler import TxScheduler
+from obc_controller.stats import (
+    TIMING_PER_DECADE,
+    HealthStats,
+    LogHistogram,
+    TimingCache,
+    TrafficMeter,
+    TrafficStats,
+)
+
+log = logging.getLogger(__name__)
+
+_NOTIFIER_TIMEOUT_S = 0.05
+
+
+class AsyncChargerEngine:
+    """One charger on one bus, driven by the running asyncio loop.
+
+    Not thread-safe: call every method from the loop that ran
+    :meth:`start`.
+    """
+
+    def __init__(
+        self,
+        interface: str = "pcan",
+        channel: str = "PCAN_USBBUS1",
+        bitrate: int = 250000,
+        *,
+        protocol: ChargerProtocol = DEFAULT_PROTOCOL,
+        monitored_ids: Iterable[int] = (),
+        cycle_ms: int = CYCLE_MS,
+        publish: Optional[Publisher] = None,
+    ):
+        if cycle_ms < MIN_CYCLE_MS:
+            raise ValueError(
+                f"TX cycle must be at least {MIN_CYCLE_MS} ms, "
+                f"got {cycle_ms}"
+            )
+        self._interface = interface
+        self._channel = channel
+        self._bitrate = bitrate
+        self._protocol = protocol
+        self._monitored_ids = frozenset(monitored_ids)
+        self._period = cycle_ms / 1000.0
+        self._sink: Publisher = publish or discard
+
+        self._bus: Optional[can.BusABC] = None
+        self._notifier: Optional[can.Notifier] = None
+        self._reader: Optional[can.AsyncBufferedReader] = None
+        self._tasks: list[asyncio.Task] = []
+        self._tx_wake: Optional[asyncio.Event] = None
+        self._watchdog: Optional[asyncio.TimerHandle] = None
+
+        # TX target state
+        self._target_voltage = 0.0
+        self._target_current = 0.0
+        self._control = ChargerControl.STOP_OUTPUTTING
+        self._tx_enabled = False
+        self._ramp_enabled = False
+        self._ramp_rate_v = 5.0   # V/s
+        self._ramp_rate_a = 0.5   # A/s
+        self._ramp = RampState()
+
+        # Command futures resolved by the next Message1 sent
+        self._tx_waiters: list[asyncio.Future] = []
+        # One queue per telemetry() iterator
+        self._subscribers: list[asyncio.Queue] = []
+
+        # RX state
+        self._last_rx_time = 0.0
+        self._rx_seen = False
+        self._alarm_active = False
+        self._prev_status_byte: int | None = None
+        self._filter_stats = FilterStats()
+
+        # Health tracking
+        self._tx_meter = TrafficMeter()
+        self._tx_period = LogHistogram(per_decade=TIMING_PER_DECADE)
+        self._rx_interval = LogHistogram(per_decade=TIMING_PER_DECADE)
+        self._rx_traffic = TrafficStats()
+        self._rx_clock = AdapterClock()
+        self._rx_delay = LogHistogram(per_decade=TIMING_PER_DECADE)
+
+    # ---- lifetime ----------------------------------------------------------
+
+    @property
+    def connected(self) -> bool:
+        return self._bus is not None
+
+    async def __aenter__(self) -> "AsyncChargerEngine":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        """Open the bus and start the TX / RX tasks.
+
+        Connection errors are published and then re-raised.
+        """
+        if self._bus is not None:
+            return
+        iface, chan = self._interface, self._channel
+        if iface == "pcan":
+            self._publish(
+                "log_message",
+                f"Connecting PCAN channel={chan} "
+                f"bitrate={self._bitrate} \u2026"
+            )
+        try:
+            # Driver initialisation can block for a while; keep the loop
+            # (and every other charger on it) running meanwhile.
+            bus = await asyncio.to_thread(
+                can.Bus, interface=iface, channel=chan, bitrate=self._bitrate
+            )
+        except Exception as exc:
+            msg = f"CAN connect failed: {exc}"
+            self._publish("log_message", msg)
+            self._publish("error", msg)
+            self._publish("disconnected")
+            raise
+
+        loop = asyncio.get_running_loop()
+        self._bus = bus
+        self._publish("log_message", "CAN bus connected.")
+        self._filter_stats = install_filters(
+            bus, {self._protocol.msg2_id, *self._monitored_ids},
+            self._publish,
+        )
+        self._reader = can.AsyncBufferedReader()
+        # Buses without a file descriptor get a notifier thread; a short
+        # recv() timeout keeps the join in stop() from stalling the loop.
+        self._notifier = can.Notifier(
+            bus, [self._reader], timeout=_NOTIFIER_TIMEOUT_S, loop=loop
+        )
+        self._tx_wake = asyncio.Event()
+
+        self._tx_meter.reset()
+        self._tx_period.reset()
+        self._rx_interval.reset()
+        self._rx_traffic.reset()
+        self._rx_clock.reset()
+        self._rx_delay.reset()
+        self._prev_status_byte = None
+        self._last_rx_time = time.monotonic()
+        self._rx_seen = False
+        self._alarm_active = False
+
+        self._tasks = [
+            asyncio.create_task(self._tx_loop(), name=f"obc-tx-{chan}"),
+            asyncio.create_task(self._rx_loop(), name=f"obc-rx-{chan}"),
+        ]
+        self._publish("connected")
+
+    async def stop(self) -> None:
+        """Stop TX, send the safe-stop sequence and close the bus."""
+        if self._bus is None:
+            return
+        self._tx_enabled = False
+        self._disarm_watchdog()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        try:
+            await self._safe_stop()
+        finally:
+            self._notifier.stop()
+            try:
+                self._bus.shutdown()
+            except Exception:
+                pass
+            self._bus = None
+            self._notifier = None
+            self._reader = None
+            self._resolve_waiters(None)
+            for q in self._subscribers:
+                q.put_nowait(None)
+            self._publish("log_message", "CAN bus closed.")
+            self._publish("disconnected")
+
+    # ---- commands ----------------------------------------------------------
+
+    async def set_setpoints(
+        self, voltage: float, current: float
+    ) -> Optional[Message1]:
+        self._target_voltage = voltage
+        self._target_current = current
+        return await self._next_tx()
+
+    async def set_control(self, ctrl: ChargerControl) -> Optional[Message1]:
+        self._control = ctrl
+        self._ramp.observe(ctrl)
+        return await self._next_tx()
+
+    async def enable_tx(self, enabled: bool) -> Optional[Message1]:
+        self._tx_enabled = enabled
+        if self._tx_wake is not None:
+            self._tx_wake.set()
+        if enabled:
+            self._arm_watchdog()
+        return await self._next_tx()
+
+    def set_ramp_config(
+        self, enabled: bool, rate_v: float, rate_a: float
+    ) -> None:
+        self._ramp_enabled = enabled
+        self._ramp_rate_v = rate_v
+        self._ramp_rate_a = rate_a
+
+    def reset_ramp(self) -> None:
+        """Restart the ramp from 0."""
+        self._ramp.reset()
+
+    def _next_tx(self) -> "asyncio.Future[Optional[Message1]]":
+        """Future for the next Message1 sent; None right away when TX is
+        off or the bus is closed."""
+        fut = asyncio.get_running_loop().create_future()
+        if self._tx_enabled and self._bus is not None:
+            self._tx_waiters.append(fut)
+        else:
+            fut.set_result(None)
+        return fut
+
+    def _resolve_waiters(self, msg1: Optional[Message1]) -> None:
+        waiters, self._tx_waiters = self._tx_waiters, []
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(msg1)
+
+    # ---- telemetry ---------------------------------------------------------
+
+    async def telemetry(self) -> AsyncIterator[Message2]:
+        """Every Message2 received from now on, until :meth:`stop`.
+
+        Each iterator has its own queue, so several consumers see the
+        same frames.
+        """
+        q: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(q)
+        try:
+            while self._bus is not None or not q.empty():
+                msg = await q.get()
+                if msg is None:
+                    return
+                yield msg
+        finally:
+            self._subscribers.remove(q)
+
+    # ---- TX ----------------------------------------------------------------
+
+    async def _tx_loop(self) -> None:
+        sched = TxScheduler(self._period)
+        tx_cache = TxFrameCache(self._protocol)
+        msg2_meter = self._rx_traffic.meter(self._protocol.msg2_id)
+        last_tx_time = 0.0
+        timing = TimingCache()  # percentiles, refreshed at 1 Hz
+
+        while True:
+            if not self._tx_enabled:
+                sched.stop()
+                last_tx_time = 0.0  # a pause is not a TX period
+                self._resolve_waiters(None)
+                self._tx_wake.clear()
+                await self._tx_wake.wait()
+                continue
+
+            now = time.monotonic()
+            if not sched.active:
+                sched.start(now)
+            delay = sched.next_deadline - now
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            dt = now - last_tx_time if last_tx_time > 0 else sched.period
+            ctrl = self._control
+            send_v, send_a, ramp_active = self._ramp.step(
+                ctrl, self._target_voltage, self._target_current,
+                self._ramp_enabled, self._ramp_rate_v, self._ramp_rate_a,
+                dt,
+            )
+            msg1, frame = tx_cache.lookup(send_v, send_a, ctrl)
+            try:
+                self._bus.send(frame)
+                if last_tx_time > 0:
+                    self._tx_period.add(now - last_tx_time)
+                last_tx_time = now
+                self._tx_meter.record(now)
+                self._publish("tx_message", msg1)
+                self._publish("ramp_state", ramp_active, send_v, send_a)
+                self._resolve_waiters(msg1)
+            except can.CanError as exc:
+                self._publish("log_message", f"TX error: {exc}")
+            sched.mark_sent(now)
+
+            if timing.due(now):
+                self._publish("timing_histograms", timing.update(now, {
+                    "tx_period": self._tx_period,
+                    "rx_interval": self._rx_interval,
+                    "rx_queue_delay": self._rx_delay,
+                }))
+            self._publish("health_stats", HealthStats(
+                tx_rate=self._tx_meter.rate.rate(now),
+                rx_rate=msg2_meter.rate.rate(now),
+                last_rx_age=now - self._last_rx_time,
+                tx_period=timing.summary("tx_period"),
+                rx_interval=timing.summary("rx_interval"),
+                rx_queue_delay=timing.summary("rx_queue_delay"),
+                tx_missed=sched.missed,
+            ))
+            self._publish("traffic_stats", self._rx_traffic.snapshot(now))
+            self._publish("tx_jitter", *sched.jitter_ms())
+            self._publish("tx_cache_stats", tx_cache.hits, tx_cache.misses)
+            fs = self._filter_stats
+            self._publish(
+                "filter_stats", fs.passed, -1 if fs.hw_filtered else fs.dropped
+            )
+
+    async def _safe_stop(self) -> None:
+        """Send Control=1 (stop) for several cycles before shutting down."""
+        self._publish("log_message", "Safe-stop: sending Control=STOP \u2026")
+        frame = stop_frame(self._protocol)
+        for _ in range(SAFE_STOP_CYCLES):
+            try:
+                self._bus.send(frame)
+            except can.CanError:
+                break
+            await asyncio.sleep(self._period)
+        self._publish("log_message", "Safe-stop complete.")
+
+    # ---- RX ----------------------------------------------------------------
+
+    async def _rx_loop(self) -> None:
+        msg2_id = self._protocol.msg2_id
+        monitored = self._monitored_ids
+        async for frame in self._reader:
+            dequeued = time.monotonic()
+            now = self._rx_clock.to_host(frame.timestamp, dequeued)
+            if now != dequeued:
+                self._rx_delay.add(dequeued - now)
+            self._filter_stats.passed += 1
+            self._rx_traffic.record(frame.arbitration_id, now)
+            if frame.arbitration_id in monitored:
+                self._publish(
+                    "monitored_frame", frame.arbitration_id, bytes(frame.data)
+                )
+            if frame.arbitration_id == msg2_id:
+                self._on_message2(frame, now)
+
+    def _on_message2(self, frame: can.Message, now: float) -> None:
+        try:
+            msg2 = self._protocol.decode_message2(frame.data)
+        except Exception as exc:
+            self._publish("log_message", f"Message2 decode error: {exc}")
+            return
+        msg2.timestamp = now
+        self._publish("message2_received", msg2)
+        for q in self._subscribers:
+            q.put_nowait(msg2)
+
+        if self._rx_seen:
+            self._rx_interval.add(now - self._last_rx_time)
+        self._rx_seen = True
+        self._last_rx_time = now
+        if self._alarm_active:
+            self._alarm_active = False
+            self._publish(
+                "log_message", "Message2 received \u2014 timeout cleared."
+            )
+        self._arm_watchdog()
+
+        new_status = msg2.status.to_byte()
+        for edge in status_edges(self._prev_status_byte, new_status):
+            self._publish("status_bit_changed", *edge)
+        self._prev_status_byte = new_status
+
+    # ---- Message2 timeout --------------------------------------------------
+
+    def _arm_watchdog(self) -> None:
+        """(Re)schedule the alarm for TIMEOUT_S after the last Message2."""
+        self._disarm_watchdog()
+        if self._bus is None or self._alarm_active:
+            return
+        loop = asyncio.get_running_loop()
+        delay = self._last_rx_time + TIMEOUT_S - time.monotonic()
+        self._watchdog = loop.call_later(max(0.0, delay), self._on_timeout)
+
+    def _disarm_watchdog(self) -> None:
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+
+    def _on_timeout(self) -> None:
+        self._watchdog = None
+        if not self._tx_enabled or self._alarm_active:
+            return
+        self._alarm_active = True
+        self._publish("timeout_alarm")
+        self._publish("log_message", "ALARM: No Message2 for > 5 s!")
+
+    # ---- internal helpers --------------------------------------------------
+
+    def _publish(self, kind: str, *args) -> None:
+        self._sink(kind, *args)
+
@@ -0,0 +1,348 @@
+"""
+Several CAN channels in parallel, one charger engine each.
+
+:class:`BusManager` starts a :class:`~obc_controller.engine.ChargerEngine`
+per channel, each in its own thread or -- with ``processes=True`` -- its
+own process (:class:`~obc_controller.process_engine.ProcessEngine`), so
+a slow adapter or a blocking driver call only delays its own channel.
+
+Every engine publishes into its own
+:class:`~obc_controller.events.EventBuffer`.  :meth:`BusManager.poll`
+drains them, merges the Message2 telemetry of all channels into one
+stream ordered by reception time (``time.monotonic()``, comparable
+across threads and processes) and keeps a :class:`ChannelHealth` per
+channel.
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from obc_controller.can_protocol import (
+    CYCLE_MS,
+    DEFAULT_PROTOCOL,
+    ChargerControl,
+    ChargerProtocol,
+    Message2,
+)
+from obc_controller.engine import ChargerEngine
+from obc_controller.events import EventBuffer
+from obc_controller.stats import HealthStats
+from obc_controller.tx_jobs import TxJob
+
+# A connected channel with TX on that publishes nothing for this long is
+# reported as stalled (health is published every TX cycle).
+STALL_CYCLES = 3
+
+EventCallback = Callable[[str, str, tuple], None]  # (channel, kind, args)
+
+
+@dataclass(frozen=True)
+class ChannelConfig:
+    """One CAN channel and the charger(s) on it."""
+
+    interface: str
+    channel: str
+    bitrate: int = 250000
+    protocol: Optional[ChargerProtocol] = None
+    nodes: tuple[int, ...] = ()
+    periodic_tx: bool = False
+    monitored_ids: tuple[int, ...] = ()
+    cycle_ms: int = CYCLE_MS
+    auto_reconnect: bool = True
+
+    @property
+    def name(self) -> str:
+        return f"{self.interface}:{self.channel}"
+
+    @property
+    def address(self) -> int:
+        """Source address of the channel's primary charger."""
+        if self.nodes:
+            return self.nodes[0]
+        return (self.protocol or DEFAULT_PROTOCOL).address
+
+
+@dataclass(frozen=True)
+class TelemetrySample:
+    """One Message2 of the merged stream."""
+
+    timestamp: float   # time.monotonic() at reception
+    channel: str
+    address: int
+    message: Message2
+
+
+@dataclass(frozen=True)
+class ChannelHealth:
+    """Per-channel state for the health display."""
+
+    channel: str
+    connected: bool = False
+    stalled: bool = False
+    rx_frames: int = 0
+    last_event_age: float = 0.0
+    stats: Optional[HealthStats] = None
+    error: str = ""
+
+
+def _by_time(sample: TelemetrySample) -> float:
+    return sample.timestamp
+
+
+def _discard_event(channel: str, kind: str, args: tuple) -> None:
+    pass
+
+
+@dataclass
+class _Channel:
+    config: ChannelConfig
+    events: EventBuffer
+    engine: object  # ChargerEngine or ProcessEngine
+    thread: Optional[threading.Thread] = None
+    connected: bool = False
+    rx_frames: int = 0
+    last_event: float = 0.0
+    stats: Optional[HealthStats] = None
+    error: str = ""
+
+
+class BusManager:
+    """Runs one charger engine per CAN channel.
+
+    *on_event* receives every event other than telemetry as
+    ``(channel_name, kind, args)`` from :meth:`poll`; telemetry is
+    returned by :meth:`poll` as one merged stream.
+    """
+
+    def __init__(
+        self,
+        configs: Iterable[ChannelConfig],
+        *,
+        processes: bool = False,
+        on_event: Optional[EventCallback] = None,
+    ):
+        self._processes = processes
+        self._on_event = on_event or _discard_event
+        self._tx_enabled = False
+        self._channels: dict[str, _Channel] = {}
+        for cfg in configs:
+            if cfg.name in self._channels:
+                raise ValueError(f"Channel {cfg.name} configured twice")
+            self._channels[cfg.name] = self._make_channel(cfg)
+        if not self._channels:
+            raise ValueError("At least one channel is required")
+
+    def _make_channel(self, cfg: ChannelConfig) -> _Channel:
+        events = EventBuffer()
+        if self._processes:
+            from obc_controller.process_engine import ProcessEngine
+
+            engine = ProcessEngine(events)
+        else:
+            engine = ChargerEngine(events.push)
+        engine.set_connection_params(cfg.interface, cfg.channel, cfg.bitrate)
+        engine.set_periodic_tx(cfg.periodic_tx)
+        engine.set_cycle_ms(cfg.cycle_ms)
+        engine.set_auto_reconnect(cfg.auto_reconnect)
+        engine.set_monitored_ids(cfg.monitored_ids)
+        if cfg.protocol is not None:
+            engine.set_protocol(cfg.protocol)
+        if cfg.nodes:
+            engine.set_nodes(cfg.nodes)
+        return _Channel(cfg, events, engine)
+
+    @property
+    def channels(self) -> list[str]:
+        return list(self._channels)
+
+    # ---- lifetime ----------------------------------------------------------
+
+    def start(self) -> None:
+        now = time.monotonic()
+        for ch in self._channels.values():
+            ch.last_event = now
+            if self._processes:
+                ch.engine.start()
+            else:
+                ch.thread = threading.Thread(
+                    target=ch.engine.run,
+                    name=f"obc-{ch.config.name}",
+                )
+                ch.thread.start()
+
+    def request_stop(self) -> None:
+        for ch in self._channels.values():
+            ch.engine.request_stop()
+
+    def wait(self, timeout_s: float = 10.0) -> bool:
+        """Wait for every channel's safe-stop; False if one timed out.
+
+        The channels stop in parallel, so this takes about as long as
+        the slowest one.
+        """
+        deadline = time.monotonic() + timeout_s
+        ok = True
+        for ch in self._channels.values():
+            left = max(0.0, deadline - time.monotonic())
+            if self._processes:
+                ok = ch.engine.wait(int(left * 1000)) and ok
+            elif ch.thread is not None:
+                ch.thread.join(left)
+                ok = not ch.thread.is_alive() and ok
+        return ok
+
+    @property
+    def running(self) -> bool:
+        """True while any channel's engine is still running."""
+        if self._processes:
+            return any(ch.engine.is_alive() for ch in self._channels.values())
+        return any(
+            ch.thread is not None and ch.thread.is_alive()
+            for ch in self._channels.values()
+        )
+
+    # ---- commands ----------------------------------------------------------
+
+    def _targets(self, channel: Optional[str]) -> Iterable[_Channel]:
+        if channel is None:
+            return self._channels.values()
+        try:
+            return (self._channels[channel],)
+        except KeyError:
+            raise ValueError(f"Unknown channel {channel!r}") from None
+
+    def configure(
+        self,
+        channel: Optional[str] = None,
+        node: Optional[int] = None,
+        *,
+        reset_ramp: bool = False,
+        **changes,
+    ) -> None:
+        """See :meth:`ChargerEngine.configure`."""
+        for ch in self._targets(channel):
+            ch.engine.configure(node, reset_ramp=reset_ramp, **changes)
+
+    def set_setpoints(
+        self,
+        voltage: float,
+        current: float,
+        channel: Optional[str] = None,
+        node: Optional[int] = None,
+    ) -> None:
+        for ch in self._targets(channel):
+            ch.engine.set_setpoints(voltage, current, node)
+
+    def set_control(
+        self,
+        ctrl: ChargerControl,
+        channel: Optional[str] = None,
+        node: Optional[int] = None,
+    ) -> None:
+        for ch in self._targets(channel):
+            ch.engine.set_control(ctrl, node)
+
+    def set_ramp_config(
+        self,
+        enabled: bool,
+        rate_v: float,
+        rate_a: float,
+        channel: Optional[str] = None,
+        node: Optional[int] = None,
+    ) -> None:
+        for ch in self._targets(channel):
+            ch.engine.set_ramp_config(enabled, rate_v, rate_a, node)
+
+    def reset_ramp(
+        self, channel: Optional[str] = None, node: Optional[int] = None
+    ) -> None:
+        for ch in self._targets(channel):
+            ch.engine.reset_ramp(node)
+
+    def enable_tx(self, enabled: bool) -> None:
+        self._tx_enabled = enabled
+        for ch in self._channels.values():
+            ch.engine.enable_tx(enabled)
+
+    def submit_job(self, job: TxJob, channel: Optional[str] = None) -> None:
+        """Queue a one-shot TX sequence on *channel* (default: all)."""
+        for ch in self._targets(channel):
+            ch.engine.submit_job(job)
+
+    def cancel_jobs(self, channel: Optional[str] = None) -> None:
+        for ch in self._targets(channel):
+            ch.engine.cancel_jobs()
+
+    # ---- events ------------------------------------------------------------
+
+    def poll(self) -> list[TelemetrySample]:
+        """Drain all channels; returns their new telemetry merged in
+        reception order.  Call periodically from one thread."""
+        now = time.monotonic()
+        streams: list[list[TelemetrySample]] = []
+        for ch in self._channels.values():
+            if self._processes:
+                ch.engine.poll()
+            samples = self._drain(ch, now)
+            if samples:
+                streams.append(samples)
+        if len(streams) == 1:
+            return streams[0]
+        return list(heapq.merge(*streams, key=_by_time))
+
+    def _drain(self, ch: _Channel, now: float) -> list[TelemetrySample]:
+        name = ch.config.name
+        samples: list[TelemetrySample] = []
+        events = ch.events.drain()
+        if events:
+            ch.last_event = now
+        for kind, args in events:
+            if kind == "message2_received":
+                msg = args[0]
+                samples.append(TelemetrySample(
+                    msg.timestamp, name, ch.config.address, msg
+                ))
+                continue
+            if kind == "node_event" and args[1] == "message2_received":
+                msg = args[2][0]
+                samples.append(TelemetrySample(
+                    msg.timestamp, name, args[0], msg
+                ))
+                continue
+            if kind == "health_stats":
+                ch.stats = args[0]
+            elif kind == "connected":
+                ch.connected = True
+                ch.error = ""
+            elif kind == "disconnected":
+                ch.connected = False
+            elif kind == "link_state":  # reconnecting / back
+                ch.connected = args[0]
+            elif kind == "error":
+                ch.error = args[0]
+            self._on_event(name, kind, args)
+        ch.rx_frames += len(samples)
+        return samples
+
+    def health(self) -> dict[str, ChannelHealth]:
+        """Per-channel health as of the last :meth:`poll`."""
+        now = time.monotonic()
+        out: dict[str, ChannelHealth] = {}
+        for name, ch in self._channels.items():
+            stall_s = STALL_CYCLES * ch.config.cycle_ms / 1000.0
+            age = now - ch.last_event
+            out[name] = ChannelHealth(
+                channel=name,
+                connected=ch.connected,
+                stalled=ch.connected and self._tx_enabled and age > stall_s,
+                rx_frames=ch.rx_frames,
+                last_event_age=age,
+                stats=ch.stats,
+                error=ch.error,
+            )
+        return out
@@ -0,0 +1,162 @@
+"""
+Open CAN bus handles kept for the next connect.
+
+Opening a channel is the slow part of a connect: the PCAN driver
+initialises the adapter, SocketCAN binds a socket, USB adapters may
+re-enumerate.  After a normal disconnect the engine parks its bus in
+:data:`POOL` instead of shutting it down, and the next connect with the
+same interface, channel and bitrate takes the open handle back.  One
+handle is kept per channel, up to :data:`MAX_IDLE` channels, so
+switching back and forth between adapters does not re-initialise the
+driver either.
+
+A parked handle is closed
+
+  - after :data:`IDLE_S` without a reconnect,
+  - when :data:`MAX_IDLE` other channels were parked after it,
+  - when the same channel is opened with another bitrate (most drivers
+    allow one handle per channel),
+  - at interpreter exit.
+
+Frames the adapter received while the handle was parked are discarded
+on reuse.  A bus that reports an error state is not parked, and the
+engine never parks a handle it lost the link on.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+
+import can
+
+log = logging.getLogger(__name__)
+
+# Parked handles are closed after this long without a reconnect
+IDLE_S = 30.0
+# Channels kept open at most; the longest parked one goes first
+MAX_IDLE = 4
+# Upper bound for discarding stale frames on reuse (a busy bus never
+# runs empty)
+DRAIN_MAX_S = 0.05
+
+
+def _usable(bus: can.BusABC) -> bool:
+    try:
+        return bus.state != can.BusState.ERROR
+    except NotImplementedError:  # backend does not report its state
+        return True
+    except Exception:
+        return False
+
+
+def _drain(bus: can.BusABC) -> None:
+    """Discard what the handle buffered while parked.
+
+    ``recv(0)`` also returns None for a frame the software filter
+    rejects, so the filters are cleared first (the engine installs its
+    own after the connect); then None means the buffer is empty.
+    """
+    try:
+        bus.flush_tx_buffer()
+    except Exception:  # not every backend has one
+        pass
+    try:
+        bus.set_filters(None)
+    except Exception as exc:
+        log.debug("Clearing filters of parked bus failed: %s", exc)
+    end = time.monotonic() + DRAIN_MAX_S
+    while bus.recv(timeout=0.0) is not None:
+        if time.monotonic() >= end:
+            break
+
+
+def _shutdown(bus: can.BusABC) -> None:
+    try:
+        bus.shutdown()
+    except Exception as exc:
+        log.debug("Closing parked bus failed: %s", exc)
+
+
+class BusPool:
+    """Idle open bus handles, at most one per interface and channel."""
+
+    def __init__(self, idle_s: float = IDLE_S, max_idle: int = MAX_IDLE):
+        self._idle_s = idle_s
+        self._max_idle = max_idle
+        self._lock = threading.Lock()
+        # (interface, channel) -> (bitrate, bus, expiry timer), oldest
+        # first
+        self._idle: dict[
+            tuple[str, str], tuple[int, can.BusABC, threading.Timer]
+        ] = {}
+
+    def acquire(
+        self, interface: str, channel: str, bitrate: int
+    ) -> tuple[can.BusABC, bool]:
+        """Open bus for the configuration and whether it was reused.
+
+        Raises like ``can.Bus`` when a new handle has to be opened.
+        """
+        with self._lock:
+            entry = self._idle.pop((interface, channel), None)
+        if entry is not None:
+            parked_bitrate, bus, timer = entry
+            timer.cancel()
+            if parked_bitrate == bitrate and _usable(bus):
+                _drain(bus)  # stale frames from while nobody listened
+                return bus, True
+            _shutdown(bus)  # frees the channel for the new bitrate
+        bus = can.Bus(interface=interface, channel=channel, bitrate=bitrate)
+        return bus, False
+
+    def release(
+        self, bus: can.BusABC, interface: str, channel: str, bitrate: int
+    ) -> bool:
+        """Park *bus* for reuse; False if it was closed instead."""
+        if not _usable(bus):
+            _shutdown(bus)
+            return False
+        key = (interface, channel)
+        timer = threading.Timer(self._idle_s, self._expire, (key, bus))
+        timer.daemon = True
+        with self._lock:
+            evicted = []
+            old = self._idle.pop(key, None)
+            if old is not None:
+                evicted.append(old)
+            self._idle[key] = (bitrate, bus, timer)
+            while len(self._idle) > self._max_idle:
+                evicted.append(self._idle.pop(next(iter(self._idle))))
+        timer.start()
+        for _, old_bus, old_timer in evicted:
+            old_timer.cancel()
+            _shutdown(old_bus)
+        return True
+
+    def close_all(self) -> None:
+        """Shut down every parked handle."""
+        with self._lock:
+            entries = list(self._idle.values())
+            self._idle.clear()
+        for _, bus, timer in entries:
+            timer.cancel()
+            _shutdown(bus)
+
+    def __len__(self) -> int:
+        return len(self._idle)
+
+    def _expire(self, key: tuple[str, str], bus: can.BusABC) -> None:
+        with self._lock:
+            entry = self._idle.get(key)
+            if entry is None or entry[1] is not bus:
+                return  # reused or replaced meanwhile
+            del self._idle[key]
+        _shutdown(bus)
+
+
+# Shared by every engine in the process
+POOL = BusPool()
+atexit.register(POOL.close_all)
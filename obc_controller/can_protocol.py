@@ -6,14 +6,24 @@ Based on CAN BUS COMMUNICATION SPECIFICATION v1.3:
   - Default bus speed: 250 kbps
   - Message1: BMS -> OBC  (ID 0x1806E5F4, 500 ms)
   - Message2: OBC -> BCA  (ID 0x18FF50E5, 500 ms)
+
+The byte layout is declared once in :data:`OBC_V13_SPEC` and compiled by
+:mod:`obc_controller.signal_db`; ``Message1.encode`` / ``Message2.decode``
+are the generated functions.  Other OBC variants (different scaling,
+offsets, byte order) are described the same way and wrapped in a
+:class:`ChargerProtocol`.
 """
 
 from __future__ import annotations
 
-import struct
+import copy
 from dataclasses import dataclass, field
-from enum import IntEnum
-from typing import Optional
+from enum import IntEnum, IntFlag
+from typing import Mapping, Union
+
+import numpy as np
+
+from obc_controller.signal_db import SignalDatabase
 
 
 # ---------------------------------------------------------------------------
@@ -42,127 +52,442 @@ class ChargerControl(IntEnum):
     HEATING_DC_SUPPLY = 2
 
 
+# Index -> member lookup; avoids the Enum call in the per-frame decode path
+_CONTROLS = tuple(ChargerControl)
+
+
+# ---------------------------------------------------------------------------
+# Signal table (spec v1.3)
+# ---------------------------------------------------------------------------
+# DBC conventions: big-endian (Motorola) signals give the MSB as start_bit.
+OBC_V13_SPEC = {
+    "name": "OBC CAN spec v1.3",
+    "messages": [
+        {
+            "name": "Message1",
+            "frame_id": MSG1_ID,
+            "length": 8,
+            "cycle_ms": CYCLE_MS,
+            "senders": ["BMS"],
+            "signals": [
+                {"name": "voltage_setpoint", "start_bit": 7, "length": 16,
+                 "factor": 0.1, "maximum": 6553.5, "unit": "V"},
+                {"name": "current_setpoint", "start_bit": 23, "length": 16,
+                 "factor": 0.1, "maximum": 6553.5, "unit": "A"},
+                {"name": "control", "start_bit": 39, "length": 8,
+                 "maximum": 2},
+            ],
+        },
+        {
+            "name": "Message2",
+            "frame_id": MSG2_ID,
+            "length": 8,
+            "cycle_ms": CYCLE_MS,
+            "senders": ["OBC"],
+            "signals": [
+                {"name": "output_voltage", "start_bit": 7, "length": 16,
+                 "factor": 0.1, "maximum": 6553.5, "unit": "V"},
+                {"name": "output_current", "start_bit": 23, "length": 16,
+                 "factor": 0.1, "maximum": 6553.5, "unit": "A"},
+                {"name": "status", "start_bit": 39, "length": 8},
+                {"name": "input_voltage", "start_bit": 47, "length": 16,
+                 "factor": 0.1, "maximum": 6553.5, "unit": "V"},
+                {"name": "temperature", "start_bit": 63, "length": 8,
+                 "offset": -40, "minimum": -40, "maximum": 215,
+                 "unit": "degC"},
+            ],
+        },
+    ],
+}
+
+OBC_V13 = SignalDatabase.from_dict(OBC_V13_SPEC)
+
+# Signal order == dataclass field order
+_MSG1_FIELDS = ("voltage_setpoint", "current_setpoint", "control")
+_MSG2_FIELDS = (
+    "output_voltage", "output_current", "status", "input_voltage",
+    "temperature",
+)
+
+
+def _control_from_raw(ctrl: int) -> ChargerControl:
+    if not 0 <= ctrl < len(_CONTROLS):
+        raise ValueError(
+            f"Unknown ChargerControl value: {ctrl} "
+            f"(expected 0, 1, or 2)"
+        )
+    return _CONTROLS[ctrl]
+
+
 # ---------------------------------------------------------------------------
 # Message1  (BMS -> OBC)
 # ---------------------------------------------------------------------------
-@dataclass
+_MSG1_CODEC = OBC_V13.codec("Message1")
+
+
+@dataclass(slots=True)
 class Message1:
     """Command message sent from BMS (this app) to OBC."""
     voltage_setpoint: float = 0.0   # V, resolution 0.1 V
     current_setpoint: float = 0.0   # A, resolution 0.1 A
     control: ChargerControl = ChargerControl.STOP_OUTPUTTING
 
-    def encode(self) -> bytes:
-        """Encode to 8-byte CAN payload (big-endian, unsigned)."""
-        v_raw = int(round(self.voltage_setpoint * 10))
-        i_raw = int(round(self.current_setpoint * 10))
-        v_raw = max(0, min(v_raw, 0xFFFF))
-        i_raw = max(0, min(i_raw, 0xFFFF))
-        return struct.pack(">HHB3x", v_raw, i_raw, int(self.control))
+    # Encode to 8-byte CAN payload (compiled from OBC_V13_SPEC)
+    encode = _MSG1_CODEC.make_encoder(
+        attrs=_MSG1_FIELDS, transforms={"control": int}
+    )
 
     @classmethod
     def decode(cls, data: bytes) -> "Message1":
         """Decode 8-byte CAN payload."""
-        if len(data) < 5:
-            raise ValueError(f"Message1 requires >= 5 bytes, got {len(data)}")
-        v_raw, i_raw, ctrl = struct.unpack_from(">HHB", data, 0)
-        try:
-            control = ChargerControl(ctrl)
-        except ValueError:
-            raise ValueError(
-                f"Unknown ChargerControl value: {ctrl} "
-                f"(expected 0, 1, or 2)"
-            )
-        return cls(
-            voltage_setpoint=v_raw / 10.0,
-            current_setpoint=i_raw / 10.0,
-            control=control,
-        )
+        v, i, ctrl = _MSG1_CODEC.decode_values(data)
+        return cls(v, i, _control_from_raw(ctrl))
 
 
 # ---------------------------------------------------------------------------
 # Status flags in Message2 BYTE4
 # ---------------------------------------------------------------------------
-@dataclass
+class StatusBit(IntFlag):
+    HW_FAIL = 0x01        # bit0: 0=Normal, 1=Failure
+    OVER_TEMP = 0x02      # bit1: 0=Normal, 1=Over-temp
+    INPUT_V_ERR = 0x04    # bit2: 0=Normal, 1=Wrong
+    STARTING = 0x08       # bit3: 0=Charging, 1=Stays off
+    COMM_TIMEOUT = 0x10   # bit4: 0=Normal, 1=Timeout
+
+
+_STATUS_MASK = 0x1F
+_FAULT_MASK = int(
+    StatusBit.HW_FAIL
+    | StatusBit.OVER_TEMP
+    | StatusBit.INPUT_V_ERR
+    | StatusBit.COMM_TIMEOUT
+)
+
+
 class StatusFlags:
-    hardware_failure: bool = False       # bit0: 0=Normal, 1=Failure
-    over_temperature: bool = False       # bit1: 0=Normal, 1=Over-temp
-    input_voltage_error: bool = False    # bit2: 0=Normal, 1=Wrong
-    starting_state: bool = False         # bit3: 0=Charging, 1=Stays off
-    communication_timeout: bool = False  # bit4: 0=Normal, 1=Timeout
+    """Message2 BYTE4 status bits, backed by a single int.
+
+    Instances are immutable; :meth:`from_byte` returns shared,
+    pre-built instances so decoding a frame allocates nothing here.
+    """
+
+    __slots__ = ("_bits",)
+
+    def __init__(
+        self,
+        hardware_failure: bool = False,
+        over_temperature: bool = False,
+        input_voltage_error: bool = False,
+        starting_state: bool = False,
+        communication_timeout: bool = False,
+    ):
+        self._bits = (
+            (0x01 if hardware_failure else 0)
+            | (0x02 if over_temperature else 0)
+            | (0x04 if input_voltage_error else 0)
+            | (0x08 if starting_state else 0)
+            | (0x10 if communication_timeout else 0)
+        )
 
     @classmethod
     def from_byte(cls, b: int) -> "StatusFlags":
-        return cls(
-            hardware_failure=bool(b & 0x01),
-            over_temperature=bool(b & 0x02),
-            input_voltage_error=bool(b & 0x04),
-            starting_state=bool(b & 0x08),
-            communication_timeout=bool(b & 0x10),
-        )
+        return _STATUS_TABLE[b & 0xFF]
 
     def to_byte(self) -> int:
-        b = 0
-        if self.hardware_failure:
-            b |= 0x01
-        if self.over_temperature:
-            b |= 0x02
-        if self.input_voltage_error:
-            b |= 0x04
-        if self.starting_state:
-            b |= 0x08
-        if self.communication_timeout:
-            b |= 0x10
-        return b
+        return self._bits
+
+    @property
+    def bits(self) -> StatusBit:
+        return StatusBit(self._bits)
+
+    @property
+    def hardware_failure(self) -> bool:
+        return bool(self._bits & 0x01)
+
+    @property
+    def over_temperature(self) -> bool:
+        return bool(self._bits & 0x02)
+
+    @property
+    def input_voltage_error(self) -> bool:
+        return bool(self._bits & 0x04)
+
+    @property
+    def starting_state(self) -> bool:
+        return bool(self._bits & 0x08)
+
+    @property
+    def communication_timeout(self) -> bool:
+        return bool(self._bits & 0x10)
 
     def any_fault(self) -> bool:
+        return bool(self._bits & _FAULT_MASK)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, StatusFlags):
+            return NotImplemented
+        return self._bits == other._bits
+
+    def __hash__(self) -> int:
+        return hash(self._bits)
+
+    def __repr__(self) -> str:
         return (
-            self.hardware_failure
-            or self.over_temperature
-            or self.input_voltage_error
-            or self.communication_timeout
+            f"StatusFlags(hardware_failure={self.hardware_failure}, "
+            f"over_temperature={self.over_temperature}, "
+            f"input_voltage_error={self.input_voltage_error}, "
+            f"starting_state={self.starting_state}, "
+            f"communication_timeout={self.communication_timeout})"
         )
 
 
+def _build_status_table() -> tuple[StatusFlags, ...]:
+    """Shared instances for every BYTE4 value (unused bits ignored)."""
+    unique = []
+    for b in range(_STATUS_MASK + 1):
+        flags = StatusFlags.__new__(StatusFlags)
+        flags._bits = b
+        unique.append(flags)
+    return tuple(unique[b & _STATUS_MASK] for b in range(256))
+
+
+_STATUS_TABLE = _build_status_table()
+_STATUS_OK = _STATUS_TABLE[0]
+
+
 # ---------------------------------------------------------------------------
 # Message2  (OBC -> BCA)
 # ---------------------------------------------------------------------------
-@dataclass
+_MSG2_CODEC = OBC_V13.codec("Message2")
+
+
+@dataclass(slots=True)
 class Message2:
     """Telemetry message broadcast by OBC."""
     output_voltage: float = 0.0    # V
     output_current: float = 0.0    # A
-    status: StatusFlags = field(default_factory=StatusFlags)
+    status: StatusFlags = _STATUS_OK
     input_voltage: float = 0.0     # V
     temperature: float = 0.0       # degC
+    # time.monotonic() at bus reception, from the adapter's RX timestamp
+    # where available (0 = not from the bus)
+    timestamp: float = field(default=0.0, repr=False, compare=False)
 
-    def encode(self) -> bytes:
-        """Encode to 8-byte CAN payload."""
-        v_raw = int(round(self.output_voltage * 10))
-        i_raw = int(round(self.output_current * 10))
-        vin_raw = int(round(self.input_voltage * 10))
-        temp_raw = int(round(self.temperature + 40))
-        v_raw = max(0, min(v_raw, 0xFFFF))
-        i_raw = max(0, min(i_raw, 0xFFFF))
-        vin_raw = max(0, min(vin_raw, 0xFFFF))
-        temp_raw = max(0, min(temp_raw, 0xFF))
-        return struct.pack(
-            ">HHBHB",
-            v_raw, i_raw, self.status.to_byte(), vin_raw, temp_raw,
-        )
+    # Encode to / decode from 8-byte CAN payload (compiled from
+    # OBC_V13_SPEC); the status byte maps to shared StatusFlags instances.
+    encode = _MSG2_CODEC.make_encoder(
+        attrs=_MSG2_FIELDS, transforms={"status": StatusFlags.to_byte}
+    )
+    decode = classmethod(
+        _MSG2_CODEC.make_decoder(transforms={"status": _STATUS_TABLE})
+    )
 
     @classmethod
-    def decode(cls, data: bytes) -> "Message2":
-        """Decode 8-byte CAN payload."""
-        if len(data) < 8:
-            raise ValueError(f"Message2 requires 8 bytes, got {len(data)}")
-        v_raw, i_raw, status_byte, vin_raw, temp_raw = struct.unpack_from(
-            ">HHBHB", data, 0
-        )
+    def from_signals(cls, signals: Mapping[str, float]) -> "Message2":
+        """Build from a ``{signal_name: value}`` dict, e.g. the output of
+        a variant / DBC codec's ``decode()``."""
         return cls(
-            output_voltage=v_raw / 10.0,
-            output_current=i_raw / 10.0,
-            status=StatusFlags.from_byte(status_byte),
-            input_voltage=vin_raw / 10.0,
-            temperature=temp_raw - 40,
+            signals.get("output_voltage", 0.0),
+            signals.get("output_current", 0.0),
+            _STATUS_TABLE[int(signals.get("status", 0)) & 0xFF],
+            signals.get("input_voltage", 0.0),
+            signals.get("temperature", 0.0),
+        )
+
+
+# ---------------------------------------------------------------------------
+# Protocol variants
+# ---------------------------------------------------------------------------
+def _j1939_ids(msg1_id: int, msg2_id: int, address: int) -> tuple[int, int]:
+    """Message1 / Message2 IDs re-addressed to the charger at *address*.
+
+    Message1 (PDU1) carries the charger as destination address in bits
+    8..15, Message2 (PDU2) as source address in bits 0..7.
+    """
+    if not 0 <= address <= 0xFD:
+        raise ValueError(f"Invalid J1939 source address: {address:#x}")
+    if (msg1_id >> 16) & 0xFF >= 0xF0:
+        raise ValueError(
+            f"Message1 0x{msg1_id:08X} is not destination-addressed (PDU1)"
+        )
+    return (
+        (msg1_id & ~0xFF00) | (address << 8),
+        (msg2_id & ~0xFF) | address,
+    )
+
+
+class ChargerProtocol:
+    """Message1 / Message2 codecs for one OBC variant.
+
+    *db* must define the two messages (by default named ``Message1`` and
+    ``Message2``) with at least the signals of the v1.3 table; IDs,
+    scaling, offsets, byte order and additional signals may differ.
+    *signal_map* renames fields to the database's signal names (e.g.
+    ``{"output_voltage": "OBC_Vout"}``) for imported DBC files.
+    """
+
+    def __init__(
+        self,
+        db: SignalDatabase,
+        message1: Union[int, str] = "Message1",
+        message2: Union[int, str] = "Message2",
+        signal_map: Mapping[str, str] | None = None,
+        address: int | None = None,
+    ):
+        signal_map = dict(signal_map or {})
+        self._args = (db, message1, message2, signal_map, address)
+        m1 = db.codec(message1)
+        m2 = db.codec(message2)
+        sig1 = [signal_map.get(f, f) for f in _MSG1_FIELDS]
+        sig2 = [signal_map.get(f, f) for f in _MSG2_FIELDS]
+        for codec, names in ((m1, sig1), (m2, sig2)):
+            missing = [n for n in names if n not in codec.names]
+            if missing:
+                raise ValueError(
+                    f"{codec.message.name} is missing signal(s) {missing}"
+                )
+        self.db = db
+        self.name = db.name
+        self.msg1_id = m1.message.frame_id
+        self.msg2_id = m2.message.frame_id
+        if address is not None:
+            self.msg1_id, self.msg2_id = _j1939_ids(
+                self.msg1_id, self.msg2_id, address
+            )
+        # (voltage, current, control) -> quantized raw tuple (cache key)
+        self.message1_raw = m1.make_encoder(pack=False, signals=sig1)
+        self.encode_message1 = m1.make_encoder(
+            attrs=_MSG1_FIELDS, transforms={sig1[2]: int}, signals=sig1
+        )
+        self._m1_values = m1.make_encoder(signals=sig1)
+        self._m1_decode = m1.make_decoder(factory=False, signals=sig1[:2])
+        self._decode_m2 = m2.make_decoder(
+            transforms={sig2[2]: _STATUS_TABLE}, signals=sig2
+        )
+
+    def __reduce__(self):
+        return (ChargerProtocol, self._args)
+
+    @property
+    def address(self) -> int:
+        """J1939 source address of the charger (low byte of Message2)."""
+        return self.msg2_id & 0xFF
+
+    def with_address(self, address: int) -> "ChargerProtocol":
+        """Same codecs for the charger at J1939 source address *address*."""
+        proto = copy.copy(self)
+        proto.msg1_id, proto.msg2_id = _j1939_ids(
+            self.msg1_id, self.msg2_id, address
+        )
+        proto._args = self._args[:4] + (address,)
+        return proto
+
+    def quantize_message1(
+        self, voltage: float, current: float, ctrl: ChargerControl
+    ) -> Message1:
+        """Message1 with setpoints as they appear on the wire."""
+        v, i = self._m1_decode(self._m1_values(voltage, current, ctrl))
+        return Message1(v, i, ctrl)
+
+    def decode_message2(self, data: bytes) -> Message2:
+        return self._decode_m2(Message2, data)
+
+
+DEFAULT_PROTOCOL = ChargerProtocol(OBC_V13)
+
+
+# ---------------------------------------------------------------------------
+# Batched (vectorized) codec for recorded sessions
+# ---------------------------------------------------------------------------
+# Wire layout of one 8-byte payload; viewing a contiguous buffer with these
+# dtypes decodes every frame in a single NumPy pass.
+_MSG1_WIRE = np.dtype(
+    [("v", ">u2"), ("i", ">u2"), ("control", "u1"), ("_rsv", "V3")]
+)
+_MSG2_WIRE = np.dtype(
+    [("v", ">u2"), ("i", ">u2"), ("status", "u1"), ("vin", ">u2"),
+     ("temp", "u1")]
+)
+
+# Decoded (physical-unit) record layouts
+MESSAGE1_DTYPE = np.dtype(
+    [("voltage", "f8"), ("current", "f8"), ("control", "u1")]
+)
+MESSAGE2_DTYPE = np.dtype(
+    [("vout", "f8"), ("iout", "f8"), ("status", "u1"), ("vin", "f8"),
+     ("temp", "i2")]
+)
+
+BufferLike = Union[bytes, bytearray, memoryview, np.ndarray]
+
+
+def _wire_view(buf: BufferLike, wire: np.dtype) -> np.ndarray:
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    if raw.size % 8:
+        raise ValueError(
+            f"Buffer length must be a multiple of 8, got {raw.size}"
         )
+    return raw.view(wire)
+
+
+def _to_raw(values: np.ndarray, scale: float, offset: float, hi: int,
+            dtype: str) -> np.ndarray:
+    raw = np.rint(np.asarray(values, dtype=np.float64) * scale + offset)
+    return np.clip(raw, 0, hi).astype(dtype)
+
+
+def decode_many(buf: BufferLike, message: type = Message2) -> np.ndarray:
+    """Decode a contiguous buffer of 8-byte payloads in one pass.
+
+    Returns a structured array with :data:`MESSAGE2_DTYPE` fields
+    (vout, iout, status, vin, temp) or, for ``message=Message1``,
+    :data:`MESSAGE1_DTYPE` fields (voltage, current, control).
+    Values are identical to the scalar :meth:`Message2.decode` path.
+    """
+    if message is Message2:
+        wire = _wire_view(buf, _MSG2_WIRE)
+        out = np.empty(wire.shape[0], dtype=MESSAGE2_DTYPE)
+        out["vout"] = wire["v"] / 10.0
+        out["iout"] = wire["i"] / 10.0
+        out["status"] = wire["status"] & 0x1F  # the five defined bits
+        out["vin"] = wire["vin"] / 10.0
+        out["temp"] = wire["temp"].astype(np.int16) - 40
+        return out
+    if message is Message1:
+        wire = _wire_view(buf, _MSG1_WIRE)
+        bad = wire["control"] > max(ChargerControl)
+        if bad.any():
+            ctrl = int(wire["control"][bad][0])
+            raise ValueError(
+                f"Unknown ChargerControl value: {ctrl} "
+                f"(expected 0, 1, or 2)"
+            )
+        out = np.empty(wire.shape[0], dtype=MESSAGE1_DTYPE)
+        out["voltage"] = wire["v"] / 10.0
+        out["current"] = wire["i"] / 10.0
+        out["control"] = wire["control"]
+        return out
+    raise TypeError(f"Unsupported message type: {message!r}")
+
+
+def encode_many(records: np.ndarray, message: type = Message2) -> bytes:
+    """Encode a structured array (as returned by :func:`decode_many`)
+    into a contiguous buffer of 8-byte payloads.
+
+    Scaling, rounding and clamping match the scalar ``encode()`` methods.
+    """
+    if message is Message2:
+        wire = np.zeros(len(records), dtype=_MSG2_WIRE)
+        wire["v"] = _to_raw(records["vout"], 10, 0, 0xFFFF, ">u2")
+        wire["i"] = _to_raw(records["iout"], 10, 0, 0xFFFF, ">u2")
+        wire["status"] = records["status"]
+        wire["vin"] = _to_raw(records["vin"], 10, 0, 0xFFFF, ">u2")
+        wire["temp"] = _to_raw(records["temp"], 1, 40, 0xFF, "u1")
+        return wire.tobytes()
+    if message is Message1:
+        wire = np.zeros(len(records), dtype=_MSG1_WIRE)
+        wire["v"] = _to_raw(records["voltage"], 10, 0, 0xFFFF, ">u2")
+        wire["i"] = _to_raw(records["current"], 10, 0, 0xFFFF, ">u2")
+        wire["control"] = records["control"]
+        return wire.tobytes()
+    raise TypeError(f"Unsupported message type: {message!r}")
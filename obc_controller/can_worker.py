@@ -1,143 +1,29 @@
 """
-CAN bus worker running in a QThread.
-
-Handles:
-  - Connecting / disconnecting the python-can bus
-  - Periodic Message1 TX (500 ms) with optional ramp (soft-start)
-  - Message2 RX with timeout alarm (5 s)
-  - Safe-stop on disconnect (sends Control=1 for several cycles)
-  - TX/RX health stats and status-bit change detection
+Qt front end of the charger engine.
+
+``CANWorker`` runs :class:`obc_controller.engine.ChargerEngine` in a
+QThread and turns its events into Qt signals (or, with an
+:class:`~obc_controller.events.EventBuffer`, into batched UI events).
+One-shot sequences such as the OBC baudrate switch are submitted to the
+engine as TX jobs (:mod:`obc_controller.tx_jobs`).
 """
 
 from __future__ import annotations
 
 import logging
-import time
-from collections import deque
-from typing import Optional
+from typing import Iterable, Optional
 
 import can
 
-from PySide6.QtCore import QThread, Signal, QMutex, QMutexLocker
+from PySide6.QtCore import QThread, Signal
 
-from obc_controller.can_protocol import (
-    MSG1_ID,
-    MSG2_ID,
-    CYCLE_MS,
-    TIMEOUT_S,
-    ChargerControl,
-    Message1,
-    Message2,
-)
+from obc_controller.can_protocol import ChargerControl, ChargerProtocol
+from obc_controller.engine import ChargerEngine
+from obc_controller.events import EventBuffer
+from obc_controller.tx_jobs import TxJob
 
 log = logging.getLogger(__name__)
 
-SAFE_STOP_CYCLES = 5  # Send Control=1 this many times before disconnect
-
-# ---------------------------------------------------------------------------
-# Baudrate-switch CAN sequence constants
-# ---------------------------------------------------------------------------
-BAUD_SWITCH_ID = 0x01002100  # Extended CAN ID for baudrate commands
-BAUD_FRAME1 = bytes([0x07, 0x01, 0x00, 0x00, 0x3D, 0x8A, 0x09, 0x00])
-BAUD_FRAME2 = bytes([0x07, 0x02, 0x0E, 0x00, 0x71, 0xB7, 0x0F, 0x00])
-BAUD_FRAME2_COUNT = 7
-BAUD_FRAME2_INTERVAL_S = 0.5
-
-# Status bit names for change detection
-_STATUS_BIT_NAMES = {
-    0: "HW_FAIL",
-    1: "OVER_TEMP",
-    2: "INPUT_V_ERR",
-    3: "STARTING",
-    4: "COMM_TIMEOUT",
-}
-
-
-def _calc_rate(times: deque, now: float, window: float = 2.0) -> float:
-    """Count messages in the last *window* seconds and return rate (Hz)."""
-    cutoff = now - window
-    count = sum(1 for t in times if t >= cutoff)
-    return count / window
-
-
-class BaudrateSwitchWorker(QThread):
-    """Sends the CAN baudrate-switch sequence in a background thread.
-
-    Sequence:
-      1. Send BAUD_FRAME1 once
-      2. Send BAUD_FRAME2 seven times at 500 ms intervals
-    """
-
-    progress = Signal(int, int)    # (current_step 1-based, total)
-    finished_ok = Signal()
-    error = Signal(str)
-    log_message = Signal(str)
-
-    def __init__(self, bus: can.Bus, parent=None):
-        super().__init__(parent)
-        self._bus = bus
-        self._running = True
-
-    def request_stop(self) -> None:
-        self._running = False
-
-    def run(self) -> None:
-        total = 1 + BAUD_FRAME2_COUNT  # 8 steps
-
-        # Step 1: send frame #1 once
-        frame1 = can.Message(
-            arbitration_id=BAUD_SWITCH_ID,
-            data=BAUD_FRAME1,
-            is_extended_id=True,
-        )
-        try:
-            self._bus.send(frame1)
-            self.log_message.emit(
-                f"Baudrate switch: sent frame #1 "
-                f"(ID=0x{BAUD_SWITCH_ID:08X}, data={BAUD_FRAME1.hex()})"
-            )
-            self.progress.emit(1, total)
-        except can.CanError as exc:
-            self.error.emit(f"Baudrate switch frame #1 TX error: {exc}")
-            return
-
-        # Steps 2-8: send frame #2 seven times @ 500 ms
-        frame2 = can.Message(
-            arbitration_id=BAUD_SWITCH_ID,
-            data=BAUD_FRAME2,
-            is_extended_id=True,
-        )
-        for i in range(BAUD_FRAME2_COUNT):
-            if not self._running:
-                self.log_message.emit("Baudrate switch aborted.")
-                return
-
-            time.sleep(BAUD_FRAME2_INTERVAL_S)
-
-            try:
-                self._bus.send(frame2)
-                step = 2 + i
-                self.log_message.emit(
-                    f"Baudrate switch: sent frame #2 ({i + 1}/{BAUD_FRAME2_COUNT})"
-                )
-                self.progress.emit(step, total)
-            except can.CanError as exc:
-                self.error.emit(
-                    f"Baudrate switch frame #2 [{i + 1}] TX error: {exc}"
-                )
-                return
-
-        self.log_message.emit("Baudrate switch sequence completed.")
-        self.finished_ok.emit()
-
-
-def _move_towards(current: float, target: float, max_step: float) -> float:
-    """Move *current* towards *target* by at most *max_step*."""
-    diff = target - current
-    if abs(diff) <= max_step:
-        return target
-    return current + (max_step if diff > 0 else -max_step)
-
 
 class CANWorker(QThread):
     """Background thread that owns the python-can bus object."""
@@ -151,306 +37,131 @@ class CANWorker(QThread):
     timeout_alarm = Signal()
     tx_message = Signal(object)         # Message1 sent (for log)
     ramp_state = Signal(bool, float, float)  # active, ramped_v, ramped_a
+    regulator_state = Signal(bool, float, float)  # closed, trim_v, trim_a
+    curve_state = Signal(int, str, bool)     # segment_index, phase, done
+    link_state = Signal(bool)           # bus lost (reconnecting) / back
+    job_progress = Signal(str, int, int)     # job name, step, total
+    job_done = Signal(str, bool, str)        # job name, ok, detail
 
     # Health & diagnostics
-    health_stats = Signal(float, float, float)    # tx_rate, rx_rate, last_rx_age
+    health_stats = Signal(object)                 # HealthStats
+    timing_histograms = Signal(object)            # {name: histogram dict}
+    tx_jitter = Signal(float, float)              # mean_ms, max_ms
+    traffic_stats = Signal(object)                # {can_id: TrafficSnapshot}
     status_bit_changed = Signal(int, str, bool)   # bit_idx, name, is_fault
+    filter_stats = Signal(int, int)               # passed, dropped (-1 = HW)
+    tx_cache_stats = Signal(int, int)             # hits, misses
+    monitored_frame = Signal(int, bytes)          # arbitration_id, data
+    node_event = Signal(int, str, object)         # address, kind, args
+
+    # Lifecycle events bypass the event buffer
+    _DIRECT_KINDS = frozenset({"connected", "disconnected", "error"})
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self._bus: Optional[can.Bus] = None
-        self._running = False
-        self._mutex = QMutex()
-
-        # TX target state (set from UI thread, protected by mutex)
-        self._target_voltage: float = 0.0
-        self._target_current: float = 0.0
-        self._control: ChargerControl = ChargerControl.STOP_OUTPUTTING
-        self._tx_enabled = False
-
-        # Ramp config (set from UI thread, protected by mutex)
-        self._ramp_enabled: bool = False
-        self._ramp_rate_v: float = 5.0   # V/s
-        self._ramp_rate_a: float = 0.5   # A/s
-        self._ramp_reset_flag: bool = False
-
-        # Connection parameters (set before start, protected by mutex)
-        self._interface = "pcan"
-        self._channel = "PCAN_USBBUS1"
-        self._bitrate = 250000
-
-        # Health tracking
-        self._tx_times: deque[float] = deque(maxlen=20)
-        self._rx_times: deque[float] = deque(maxlen=20)
-        self._prev_status_byte: int | None = None
+        self._engine = ChargerEngine(self._publish)
+        # Batched UI delivery (None: one queued signal per event)
+        self._events: EventBuffer | None = None
+
+    @property
+    def engine(self) -> ChargerEngine:
+        return self._engine
 
     # ---- public setters (called from UI thread) --------------------------
 
     def set_connection_params(
         self, interface: str, channel: str, bitrate: int
     ) -> None:
-        with QMutexLocker(self._mutex):
-            self._interface = interface
-            self._channel = channel
-            self._bitrate = bitrate
+        self._engine.set_connection_params(interface, channel, bitrate)
+
+    def set_periodic_tx(self, enabled: bool) -> None:
+        self._engine.set_periodic_tx(enabled)
+
+    def set_cycle_ms(self, cycle_ms: int) -> None:
+        self._engine.set_cycle_ms(cycle_ms)
+
+    def set_auto_reconnect(self, enabled: bool) -> None:
+        self._engine.set_auto_reconnect(enabled)
+
+    def set_protocol(self, protocol: ChargerProtocol) -> None:
+        self._engine.set_protocol(protocol)
+
+    def set_monitored_ids(self, ids: Iterable[int]) -> None:
+        self._engine.set_monitored_ids(ids)
+
+    def set_nodes(self, addresses: Iterable[int]) -> None:
+        self._engine.set_nodes(addresses)
+
+    def set_event_buffer(self, buffer: EventBuffer | None) -> None:
+        """Queue events in *buffer* for the UI to drain in batches instead
+        of emitting one queued signal each.
+
+        ``connected`` / ``disconnected`` / ``error`` are always emitted
+        directly.  Must be called before :meth:`start`.
+        """
+        self._events = buffer
+
+    def configure(
+        self, node: Optional[int] = None, *, reset_ramp: bool = False,
+        **changes,
+    ) -> None:
+        """Apply setpoint / control / ramp changes as one snapshot."""
+        self._engine.configure(node, reset_ramp=reset_ramp, **changes)
 
-    def set_setpoints(self, voltage: float, current: float) -> None:
-        with QMutexLocker(self._mutex):
-            self._target_voltage = voltage
-            self._target_current = current
+    def set_setpoints(
+        self, voltage: float, current: float, node: Optional[int] = None
+    ) -> None:
+        self._engine.set_setpoints(voltage, current, node)
 
-    def set_control(self, ctrl: ChargerControl) -> None:
-        with QMutexLocker(self._mutex):
-            self._control = ctrl
+    def set_control(
+        self, ctrl: ChargerControl, node: Optional[int] = None
+    ) -> None:
+        self._engine.set_control(ctrl, node)
 
     def set_ramp_config(
-        self, enabled: bool, rate_v: float, rate_a: float
+        self,
+        enabled: bool,
+        rate_v: float,
+        rate_a: float,
+        node: Optional[int] = None,
     ) -> None:
-        with QMutexLocker(self._mutex):
-            self._ramp_enabled = enabled
-            self._ramp_rate_v = rate_v
-            self._ramp_rate_a = rate_a
+        self._engine.set_ramp_config(enabled, rate_v, rate_a, node)
 
-    def reset_ramp(self) -> None:
-        """Request ramp state machine to restart from 0."""
-        with QMutexLocker(self._mutex):
-            self._ramp_reset_flag = True
+    def reset_ramp(self, node: Optional[int] = None) -> None:
+        self._engine.reset_ramp(node)
 
     def enable_tx(self, enabled: bool) -> None:
-        with QMutexLocker(self._mutex):
-            self._tx_enabled = enabled
+        self._engine.enable_tx(enabled)
 
     def request_stop(self) -> None:
-        with QMutexLocker(self._mutex):
-            self._running = False
+        self._engine.request_stop()
+
+    def submit_job(self, job: TxJob) -> None:
+        self._engine.submit_job(job)
+
+    def cancel_jobs(self) -> None:
+        self._engine.cancel_jobs()
 
     # ---- thread entry point ----------------------------------------------
 
-    def run(self) -> None:  # noqa: C901
-        # --- connect ---
-        with QMutexLocker(self._mutex):
-            iface = self._interface
-            chan = self._channel
-            brate = self._bitrate
-        try:
-            kwargs: dict = {
-                "interface": iface,
-                "channel": chan,
-                "bitrate": brate,
-            }
-            if iface == "pcan":
-                self.log_message.emit(
-                    f"Connecting PCAN channel={chan} "
-                    f"bitrate={brate} \u2026"
-                )
-            self._bus = can.Bus(**kwargs)
-            self.log_message.emit("CAN bus connected.")
-            self.connected.emit()
-        except Exception as exc:
-            msg = f"CAN connect failed: {exc}"
-            if iface == "pcan" and "bitrate" in str(exc).lower():
-                msg += (
-                    "\nNote: Bitrate is configured in PCAN driver / PCAN-View."
-                )
-            self.log_message.emit(msg)
-            self.error.emit(msg)
-            self.disconnected.emit()
-            return
-
-        with QMutexLocker(self._mutex):
-            self._running = True
-        last_tx_time = 0.0
-        last_rx_time = time.monotonic()
-        alarm_active = False
-
-        # Reset health tracking for fresh connection
-        self._tx_times.clear()
-        self._rx_times.clear()
-        self._prev_status_byte = None
-
-        # Ramp internal state
-        ramped_v = 0.0
-        ramped_a = 0.0
-        prev_control = ChargerControl.STOP_OUTPUTTING
-
-        try:
-            while True:
-                now = time.monotonic()
-
-                # ---- read UI state under lock ----------------------------
-                with QMutexLocker(self._mutex):
-                    if not self._running:
-                        break
-                    tx_en = self._tx_enabled
-                    ctrl = self._control
-                    tgt_v = self._target_voltage
-                    tgt_a = self._target_current
-                    ramp_en = self._ramp_enabled
-                    ramp_rv = self._ramp_rate_v
-                    ramp_ra = self._ramp_rate_a
-                    do_reset = self._ramp_reset_flag
-                    self._ramp_reset_flag = False
-
-                # ---- ramp reset triggers ---------------------------------
-                if do_reset:
-                    ramped_v = 0.0
-                    ramped_a = 0.0
-
-                # Transition from STOP to active mode -> reset ramp
-                if (
-                    ctrl != ChargerControl.STOP_OUTPUTTING
-                    and prev_control == ChargerControl.STOP_OUTPUTTING
-                ):
-                    ramped_v = 0.0
-                    ramped_a = 0.0
-                prev_control = ctrl
-
-                # ---- TX --------------------------------------------------
-                if tx_en and (now - last_tx_time) >= (CYCLE_MS / 1000.0):
-                    dt = now - last_tx_time if last_tx_time > 0 else CYCLE_MS / 1000.0
-
-                    # Compute actual setpoints
-                    if (
-                        ctrl == ChargerControl.STOP_OUTPUTTING
-                        or not ramp_en
-                    ):
-                        # No ramp: send target directly
-                        send_v = tgt_v
-                        send_a = tgt_a
-                        ramp_active = False
-                    else:
-                        # Ramp towards target
-                        step_v = ramp_rv * dt
-                        step_a = ramp_ra * dt
-                        ramped_v = _move_towards(ramped_v, tgt_v, step_v)
-                        ramped_a = _move_towards(ramped_a, tgt_a, step_a)
-                        # Round to 0.1 (CAN resolution)
-                        send_v = round(ramped_v, 1)
-                        send_a = round(ramped_a, 1)
-                        ramp_active = (
-                            send_v != round(tgt_v, 1)
-                            or send_a != round(tgt_a, 1)
-                        )
-
-                    msg1 = Message1(
-                        voltage_setpoint=send_v,
-                        current_setpoint=send_a,
-                        control=ctrl,
-                    )
-                    frame = can.Message(
-                        arbitration_id=MSG1_ID,
-                        data=msg1.encode(),
-                        is_extended_id=True,
-                    )
-                    try:
-                        self._bus.send(frame)
-                        last_tx_time = now
-                        self._tx_times.append(now)
-                        self.tx_message.emit(msg1)
-                        self.ramp_state.emit(ramp_active, send_v, send_a)
-                    except can.CanError as exc:
-                        self.log_message.emit(f"TX error: {exc}")
-
-                    # Emit health stats every TX cycle
-                    tx_rate = _calc_rate(self._tx_times, now)
-                    rx_rate = _calc_rate(self._rx_times, now)
-                    rx_age = now - last_rx_time
-                    self.health_stats.emit(tx_rate, rx_rate, rx_age)
-
-                # ---- RX --------------------------------------------------
-                try:
-                    frame = self._bus.recv(timeout=0.05)
-                except can.CanError as exc:
-                    self.log_message.emit(f"RX error: {exc}")
-                    frame = None
-
-                if frame is not None and frame.arbitration_id == MSG2_ID:
-                    try:
-                        msg2 = Message2.decode(frame.data)
-                        self.message2_received.emit(msg2)
-                        last_rx_time = now
-                        self._rx_times.append(now)
-                        if alarm_active:
-                            alarm_active = False
-                            self.log_message.emit(
-                                "Message2 received \u2014 timeout cleared."
-                            )
-
-                        # Detect status bit changes
-                        new_status = msg2.status.to_byte()
-                        if self._prev_status_byte is not None:
-                            xor = new_status ^ self._prev_status_byte
-                            for bit in range(5):
-                                if xor & (1 << bit):
-                                    name = _STATUS_BIT_NAMES.get(
-                                        bit, f"bit{bit}"
-                                    )
-                                    is_fault = bool(new_status & (1 << bit))
-                                    self.status_bit_changed.emit(
-                                        bit, name, is_fault
-                                    )
-                        self._prev_status_byte = new_status
-
-                    except Exception as exc:
-                        self.log_message.emit(
-                            f"Message2 decode error: {exc}"
-                        )
-
-                # ---- timeout check ---------------------------------------
-                if tx_en and (now - last_rx_time) > TIMEOUT_S:
-                    if not alarm_active:
-                        alarm_active = True
-                        self.timeout_alarm.emit()
-                        self.log_message.emit(
-                            "ALARM: No Message2 for > 5 s!"
-                        )
-
-        finally:
-            self._safe_stop()
-            self._close_bus()
-            self.disconnected.emit()
-
-    # ---- internal helpers ------------------------------------------------
-
-    def _safe_stop(self) -> None:
-        """Send Control=1 (stop) for several cycles before shutting down."""
-        if self._bus is None:
-            return
-        self.log_message.emit("Safe-stop: sending Control=STOP \u2026")
-        msg1 = Message1(
-            voltage_setpoint=0,
-            current_setpoint=0,
-            control=ChargerControl.STOP_OUTPUTTING,
-        )
-        frame = can.Message(
-            arbitration_id=MSG1_ID,
-            data=msg1.encode(),
-            is_extended_id=True,
-        )
-        for _ in range(SAFE_STOP_CYCLES):
-            try:
-                self._bus.send(frame)
-            except can.CanError:
-                break
-            time.sleep(CYCLE_MS / 1000.0)
-        self.log_message.emit("Safe-stop complete.")
-
-    def _close_bus(self) -> None:
-        if self._bus is not None:
-            try:
-                self._bus.shutdown()
-            except Exception:
-                pass
-            self._bus = None
-            self.log_message.emit("CAN bus closed.")
+    def run(self) -> None:
+        self._engine.run()
+
+    def _publish(self, kind: str, *args) -> None:
+        """Deliver engine event *kind* (the name of the matching signal)."""
+        events = self._events
+        if events is not None and kind not in self._DIRECT_KINDS:
+            events.push(kind, *args)
+        else:
+            getattr(self, kind).emit(*args)
 
     def get_bus(self) -> Optional[can.Bus]:
         """Return the underlying CAN bus object (or None if not connected).
 
-        Used by BaudrateSwitchWorker to send frames on the same bus.
+        Only for inspection: frames go through the engine (TX jobs).
         """
-        return self._bus
+        return self._engine.get_bus()
 
     def is_bus_connected(self) -> bool:
         """Return True if the CAN bus is currently open."""
-        return self._bus is not None
+        return self._engine.is_bus_connected()
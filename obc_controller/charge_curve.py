@@ -0,0 +1,219 @@
+"""
+Multi-segment charge curves (CC / CV with taper / hold), precompiled.
+
+A :class:`~obc_controller.profiles.Profile` may list curve segments::
+
+    "curve": [
+      {"phase": "cc",   "voltage_v": 400, "current_a": 10,
+       "until_voltage_v": 398},
+      {"phase": "cv",   "voltage_v": 400, "current_a": 10,
+       "end_current_a": 1, "duration_s": 3600, "until_current_a": 1},
+      {"phase": "hold", "voltage_v": 400, "current_a": 1,
+       "duration_s": 600}
+    ]
+
+Segments run in order.  Each one ends when its measured criterion is
+met (``until_voltage_v``: output voltage reached, ``until_current_a``:
+output current fell to) or after ``duration_s``; after the last one
+the charger is stopped.  The measured criteria are only checked after
+:data:`MIN_DWELL_S` in the segment, so the first readings after a
+change (output still settling) cannot end it.  In a CV segment with
+``end_current_a`` the current limit tapers linearly from ``current_a``
+to ``end_current_a`` over ``duration_s``.
+
+:func:`compile_curve` turns the segments into one current table per
+segment, indexed by elapsed time in :data:`TICK_S` steps (the voltage
+is constant within a segment), so the engine does an index computation
+and one array read per TX instead of curve math; the termination
+checks are two comparisons per Message2.
+"""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Mapping, Optional
+
+# Time resolution of the setpoint tables
+TICK_S = 0.1
+
+# Measured end criteria are ignored for this long after a segment starts
+MIN_DWELL_S = 2.0
+
+PHASES = ("cc", "cv", "hold")
+
+
+@dataclass(frozen=True)
+class CurveSegment:
+    """One phase of a charge curve (see the module docstring)."""
+
+    phase: str
+    voltage_v: float
+    current_a: float
+    end_current_a: Optional[float] = None
+    duration_s: float = 0.0          # 0 = no time limit
+    until_voltage_v: Optional[float] = None
+    until_current_a: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "CurveSegment":
+        try:
+            seg = cls(**data)
+        except TypeError as exc:  # unknown / missing keys
+            raise ValueError(
+                f"Bad curve segment {dict(data)}: {exc}"
+            ) from None
+        seg.validate()
+        return seg
+
+    def validate(self) -> None:
+        if self.phase not in PHASES:
+            raise ValueError(
+                f"Unknown curve phase {self.phase!r} "
+                f"(expected one of {', '.join(PHASES)})"
+            )
+        if self.voltage_v < 0 or self.current_a < 0:
+            raise ValueError(f"{self.phase}: setpoints must be >= 0")
+        if self.duration_s < 0:
+            raise ValueError(f"{self.phase}: duration_s must be >= 0")
+        if self.end_current_a is not None:
+            if self.phase != "cv":
+                raise ValueError("end_current_a (taper) is only for cv")
+            if self.duration_s <= 0:
+                raise ValueError("cv taper needs a duration_s")
+        if (
+            self.duration_s == 0
+            and self.until_voltage_v is None
+            and self.until_current_a is None
+        ):
+            raise ValueError(
+                f"{self.phase}: needs duration_s or an until_* criterion"
+            )
+
+
+class ChargeCurve:
+    """Compiled charge curve: per-segment setpoint tables.
+
+    Immutable once built, so it can be shared between threads and
+    pickled to an engine process.
+    """
+
+    __slots__ = ("segments", "_volts", "_amps", "_inv_tick")
+
+    def __init__(
+        self, segments: Iterable[CurveSegment], tick_s: float = TICK_S
+    ):
+        self.segments = tuple(segments)
+        if not self.segments:
+            raise ValueError("A charge curve needs at least one segment")
+        self._inv_tick = 1.0 / tick_s
+        volts: list[float] = []
+        amps: list[array] = []
+        for seg in self.segments:
+            seg.validate()
+            i0 = seg.current_a
+            if seg.end_current_a is None:
+                rows, step = 1, 0.0  # constant setpoints
+            else:
+                rows = int(seg.duration_s * self._inv_tick) + 1
+                step = (seg.end_current_a - i0) / max(rows - 1, 1)
+            # Rounded to the 0.1 V / 0.1 A CAN resolution up front
+            volts.append(round(seg.voltage_v, 1))
+            amps.append(array("d", (round(i0 + k * step, 1)
+                                    for k in range(rows))))
+        self._volts: tuple[float, ...] = tuple(volts)
+        self._amps: tuple[array, ...] = tuple(amps)
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def __reduce__(self):
+        return (ChargeCurve, (self.segments, 1.0 / self._inv_tick))
+
+    def setpoints(self, index: int, elapsed: float) -> tuple[float, float]:
+        """``(voltage, current)`` of segment *index*, *elapsed* seconds
+        after it started."""
+        amps = self._amps[index]
+        row = int(elapsed * self._inv_tick)
+        if row >= len(amps):
+            row = len(amps) - 1
+        return self._volts[index], amps[row]
+
+    def finished(
+        self,
+        index: int,
+        elapsed: float,
+        meas_v: Optional[float] = None,
+        meas_a: Optional[float] = None,
+    ) -> bool:
+        """Whether segment *index* is over: by time, or by the latest
+        reading if one is given and the segment has run for
+        :data:`MIN_DWELL_S`."""
+        seg = self.segments[index]
+        if seg.duration_s and elapsed >= seg.duration_s:
+            return True
+        if meas_v is None or elapsed < MIN_DWELL_S:
+            return False
+        if seg.until_voltage_v is not None and meas_v >= seg.until_voltage_v:
+            return True
+        return (
+            seg.until_current_a is not None and meas_a <= seg.until_current_a
+        )
+
+
+def compile_curve(
+    segments: Iterable[Mapping], tick_s: float = TICK_S
+) -> ChargeCurve:
+    """Validate the JSON segment dicts of a profile and build the
+    tables."""
+    return ChargeCurve(
+        [CurveSegment.from_dict(s) for s in segments], tick_s
+    )
+
+
+class CurveRunner:
+    """Position of one charger in a :class:`ChargeCurve`."""
+
+    __slots__ = ("curve", "index", "started", "done")
+
+    def __init__(self) -> None:
+        self.curve: Optional[ChargeCurve] = None
+        self.index = 0
+        self.started = 0.0
+        self.done = False
+
+    def start(self, curve: Optional[ChargeCurve], now: float) -> None:
+        self.curve = curve
+        self.index = 0
+        self.started = now
+        self.done = False
+
+    def setpoints(self, now: float) -> tuple[float, float]:
+        return self.curve.setpoints(self.index, now - self.started)
+
+    def observe(
+        self,
+        now: float,
+        meas_v: Optional[float] = None,
+        meas_a: Optional[float] = None,
+    ) -> bool:
+        """Check the segment's end criteria (only its time limit without
+        a reading); True if the segment changed or the curve ended (see
+        :attr:`done`)."""
+        curve = self.curve
+        if curve is None or self.done:
+            return False
+        if not curve.finished(
+            self.index, now - self.started, meas_v, meas_a
+        ):
+            return False
+        if self.index + 1 >= len(curve):
+            self.done = True
+        else:
+            self.index += 1
+            self.started = now
+        return True
+
+    @property
+    def phase(self) -> str:
+        return self.curve.segments[self.index].phase if self.curve else ""
@@ -0,0 +1,330 @@
+"""
+Headless command-line front end.
+
+    python -m obc_controller.cli -i socketcan -c can0 -V 320 -A 10 \\
+        -m charge -d 600 -o run.csv
+
+Connects, sends Message1 with the given setpoints / mode (or those of a
+saved ``--profile``, including its charge curve), writes every
+Message2 to a CSV file (the graph panel export columns plus channel and
+charger address) and safe-stops on exit (end of ``--duration``, end of
+the charge curve on every charger, or Ctrl+C).  Repeat ``-c`` to run
+several channels in parallel through a
+:class:`~obc_controller.bus_manager.BusManager`.  Neither Qt nor
+pyqtgraph is imported, so it starts in a fraction of a second on bench
+machines without a display.
+
+While running, commands can be typed on stdin::
+
+    v 320          voltage setpoint [V]
+    i 10           current setpoint [A]
+    mode charge    charge | heat | stop
+    quit
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import sys
+import threading
+import time
+from typing import IO, Iterable, List, Optional
+
+from obc_controller.bus_manager import (
+    BusManager,
+    ChannelConfig,
+    TelemetrySample,
+)
+from obc_controller.can_protocol import CYCLE_MS, ChargerControl
+from obc_controller.charge_curve import compile_curve
+from obc_controller.profiles import load_profiles
+from obc_controller.settings import (
+    charger_addresses_setting,
+    load_settings,
+    monitored_ids_setting,
+    protocol_from_setting,
+    regulator_setting,
+)
+
+MODES = {
+    "charge": ChargerControl.START_CHARGING,
+    "heat": ChargerControl.HEATING_DC_SUPPLY,
+    "stop": ChargerControl.STOP_OUTPUTTING,
+}
+
+CSV_HEADER = [
+    "timestamp_s", "channel", "address",
+    "Vout_V", "Iout_A", "Vin_V", "Temp_C", "status_flags",
+]
+
+POLL_S = 0.05  # merged telemetry / event drain interval
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        prog="python -m obc_controller.cli",
+        description="Drive the OBC charger without the GUI.",
+    )
+    p.add_argument("-i", "--interface", default="pcan",
+                   help="python-can interface (default: pcan)")
+    p.add_argument("-c", "--channel", action="append",
+                   help="CAN channel, repeat for several "
+                        "(default: PCAN_USBBUS1)")
+    p.add_argument("-b", "--bitrate", type=int, default=250000,
+                   help="bitrate in bit/s (default: 250000)")
+    p.add_argument("-V", "--voltage", type=float, default=0.0,
+                   help="voltage setpoint [V]")
+    p.add_argument("-A", "--current", type=float, default=0.0,
+                   help="current setpoint [A]")
+    p.add_argument("-m", "--mode", choices=MODES, default="stop",
+                   help="control mode (default: stop)")
+    p.add_argument("-p", "--profile",
+                   help="saved profile: setpoints, mode, ramp and charge "
+                        "curve (overrides -V / -A / -m / --ramp)")
+    p.add_argument("--ramp", nargs=2, type=float, metavar=("V_S", "A_S"),
+                   help="soft-start ramp rates [V/s] [A/s]")
+    p.add_argument("--closed-loop", action="store_true",
+                   help="trim the setpoints from the measured output (PI, "
+                        "gains from settings.json \"regulator\")")
+    p.add_argument("--cycle-ms", type=int, default=CYCLE_MS,
+                   help=f"Message1 period in ms (default: {CYCLE_MS})")
+    p.add_argument("--no-reconnect", action="store_true",
+                   help="exit instead of reopening a lost channel")
+    p.add_argument("--periodic-tx", action="store_true",
+                   help="let the driver repeat Message1 (send_periodic)")
+    p.add_argument("--node", action="append", type=lambda v: int(v, 0),
+                   metavar="ADDR",
+                   help="charger source address on every channel, "
+                        "repeat for several (default: settings.json)")
+    p.add_argument("--processes", action="store_true",
+                   help="run each channel's engine in its own process")
+    p.add_argument("--signal-db",
+                   help="JSON / DBC signal table (default: settings.json)")
+    p.add_argument("-d", "--duration", type=float, default=0.0,
+                   help="seconds to run; 0 = until Ctrl+C / quit")
+    p.add_argument("-o", "--output",
+                   help="write Message2 telemetry to this CSV file")
+    p.add_argument("-q", "--quiet", action="store_true",
+                   help="no log lines on stderr")
+    return p.parse_args(argv)
+
+
+class _Session:
+    """Event sink and telemetry writer for one CLI run."""
+
+    def __init__(self, out: Optional[IO[str]], quiet: bool, tagged: bool):
+        self._writer = csv.writer(out) if out is not None else None
+        if self._writer is not None:
+            self._writer.writerow(CSV_HEADER)
+        self._quiet = quiet
+        self._tagged = tagged  # prefix lines with the channel name
+        self._t0 = time.monotonic()
+        self.connected: set[str] = set()
+        self.failed = False
+        self.quit = threading.Event()
+        self.rx_count = 0
+        # Chargers running a charge curve; quit once all are done
+        self.curve_nodes = 0
+        self._curves_done: set[tuple[str, int]] = set()
+
+    def log(self, text: str, channel: str = "") -> None:
+        if self._quiet:
+            return
+        if channel and self._tagged:
+            text = f"{channel}: {text}"
+        print(f"[{time.strftime('%H:%M:%S')}] {text}", file=sys.stderr)
+
+    def on_event(self, channel: str, kind: str, args: tuple) -> None:
+        if kind == "log_message":
+            self.log(args[0], channel)
+        elif kind == "status_bit_changed":
+            _, name, is_fault = args
+            self.log(
+                f"Status {name} {'set' if is_fault else 'cleared'}", channel
+            )
+        elif kind == "curve_state":
+            self._curve_state(channel, -1, args[2])
+        elif kind == "node_event" and args[1] == "curve_state":
+            self._curve_state(channel, args[0], args[2][2])
+        elif kind == "connected":
+            self.connected.add(channel)
+        elif kind == "error":  # connect failed or link lost for good
+            self.failed = True
+            if self._quiet:  # otherwise already logged via log_message
+                print(f"{channel}: {args[0]}", file=sys.stderr)
+
+    def _curve_state(self, channel: str, address: int, done: bool) -> None:
+        key = (channel, address)
+        if not done:  # restarted, e.g. "mode charge" after the end
+            self._curves_done.discard(key)
+            return
+        self._curves_done.add(key)
+        if self.curve_nodes and len(self._curves_done) >= self.curve_nodes:
+            self.log("Charge curve complete on all chargers.")
+            self.quit.set()
+
+    def write(self, samples: Iterable[TelemetrySample]) -> None:
+        for s in samples:
+            self.rx_count += 1
+            msg = s.message
+            if self._writer is None:
+                if not self._quiet:
+                    tag = (
+                        f"{s.channel} 0x{s.address:02X} "
+                        if self._tagged else ""
+                    )
+                    print(
+                        f"{tag}Vout={msg.output_voltage:.1f}V "
+                        f"Iout={msg.output_current:.1f}A "
+                        f"Vin={msg.input_voltage:.1f}V "
+                        f"T={msg.temperature:.0f}C "
+                        f"status=0x{msg.status.to_byte():02X}",
+                        flush=True,
+                    )
+                continue
+            self._writer.writerow([
+                f"{s.timestamp - self._t0:.3f}",
+                s.channel,
+                f"0x{s.address:02X}",
+                f"{msg.output_voltage:.1f}",
+                f"{msg.output_current:.1f}",
+                f"{msg.input_voltage:.1f}",
+                f"{msg.temperature:.1f}",
+                f"0x{msg.status.to_byte():02X}",
+            ])
+
+
+def _read_commands(
+    manager: BusManager, session: _Session, voltage: float, current: float
+) -> None:
+    """Apply stdin commands until EOF or ``quit``."""
+    for line in sys.stdin:
+        parts = line.split()
+        if not parts:
+            continue
+        cmd, arg = parts[0].lower(), parts[1] if len(parts) > 1 else ""
+        try:
+            if cmd in ("q", "quit", "exit"):
+                break
+            elif cmd == "v":
+                voltage = float(arg)
+                manager.set_setpoints(voltage, current)
+            elif cmd == "i":
+                current = float(arg)
+                manager.set_setpoints(voltage, current)
+            elif cmd == "mode" and arg in MODES:
+                manager.set_control(MODES[arg])
+            else:
+                session.log(f"Unknown command: {line.strip()!r}")
+                continue
+        except ValueError:
+            session.log(f"Bad value: {line.strip()!r}")
+            continue
+        session.log(f"> {line.strip()}")
+    else:
+        return  # EOF: keep running until --duration / Ctrl+C
+    session.quit.set()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    protocol = None
+    db_entry = args.signal_db or load_settings().get("signal_db")
+    if db_entry:
+        try:
+            protocol = protocol_from_setting(db_entry)
+        except Exception as exc:
+            print(f"signal_db {db_entry!r} not usable: {exc}", file=sys.stderr)
+            return 2
+    voltage, current, mode = args.voltage, args.current, MODES[args.mode]
+    ramp, curve = args.ramp, None
+    if args.profile:
+        profile = load_profiles().get(args.profile)
+        if profile is None:
+            print(f"No profile named {args.profile!r}", file=sys.stderr)
+            return 2
+        try:
+            curve = compile_curve(profile.curve) if profile.curve else None
+        except ValueError as exc:
+            print(f"Profile {args.profile!r}: {exc}", file=sys.stderr)
+            return 2
+        voltage, current = profile.voltage_set_v, profile.current_set_a
+        mode = (
+            ChargerControl.HEATING_DC_SUPPLY if profile.mode == "heating"
+            else ChargerControl.START_CHARGING
+        )
+        ramp = (
+            (profile.ramp_rate_v_per_s, profile.ramp_rate_a_per_s)
+            if profile.ramp_enabled else None
+        )
+    nodes = tuple(args.node or charger_addresses_setting())
+    monitored = tuple(monitored_ids_setting())
+    channels = args.channel or ["PCAN_USBBUS1"]
+    configs = [
+        ChannelConfig(
+            interface=args.interface,
+            channel=chan,
+            bitrate=args.bitrate,
+            protocol=protocol,
+            nodes=nodes,
+            periodic_tx=args.periodic_tx,
+            monitored_ids=monitored,
+            cycle_ms=args.cycle_ms,
+            auto_reconnect=not args.no_reconnect,
+        )
+        for chan in channels
+    ]
+
+    out = (
+        open(args.output, "w", newline="", encoding="utf-8", buffering=1)
+        if args.output else None
+    )
+    session = _Session(out, args.quiet, tagged=len(configs) > 1)
+    if curve is not None:
+        session.curve_nodes = len(configs) * max(len(nodes), 1)
+    try:
+        manager = BusManager(
+            configs, processes=args.processes, on_event=session.on_event
+        )
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    manager.configure(
+        voltage=voltage,
+        current=current,
+        control=mode,
+        regulator=regulator_setting() if args.closed_loop else None,
+        curve=curve,
+    )
+    if ramp:
+        manager.set_ramp_config(True, *ramp)
+    manager.enable_tx(True)
+
+    manager.start()
+    threading.Thread(
+        target=_read_commands,
+        args=(manager, session, voltage, current),
+        daemon=True,
+    ).start()
+    end = time.monotonic() + args.duration if args.duration > 0 else None
+    try:
+        while manager.running and not session.quit.is_set():
+            if end is not None and time.monotonic() >= end:
+                break
+            session.write(manager.poll())
+            time.sleep(POLL_S)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.request_stop()
+        manager.wait()
+        session.write(manager.poll())
+        if out is not None:
+            out.close()
+    session.log(f"{session.rx_count} Message2 frame(s) received.")
+    return 1 if session.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
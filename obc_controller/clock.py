@@ -0,0 +1,75 @@
+"""
+Adapter RX timestamps on the host clock.
+
+CAN adapters stamp every received frame (``can.Message.timestamp``) with
+their own clock -- a free-running hardware counter, or ``time.time()``
+on software backends.  The engine works in ``time.monotonic()``.
+:class:`AdapterClock` maps one onto the other so a Message2 carries the
+moment the bus delivered it, not the moment the engine dequeued it.
+
+For every frame the offset ``host_dequeue - adapter_stamp`` is the true
+clock offset plus that frame's queueing delay (driver, python-can
+buffer, a busy engine loop).  Queueing delay is never negative, so the
+*minimum* offset over a sliding window is the best estimate of the
+clock offset.  Because the window slides, the estimate follows the
+drift between the two oscillators: the error stays below drift rate x
+window, e.g. 100 ppm x 10 s = 1 ms.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+
+# Sliding window of the min-filter
+WINDOW_S = 10.0
+
+
+class AdapterClock:
+    """Maps adapter RX timestamps onto ``time.monotonic()``.
+
+    One instance per bus; feed it every received frame.  A timestamp
+    that runs backwards (adapter reset, wall-clock step on a software
+    backend) restarts the estimate.
+    """
+
+    __slots__ = ("_window", "_offsets", "_last_stamp")
+
+    def __init__(self, window_s: float = WINDOW_S):
+        self._window = window_s
+        # (host time, offset) with strictly increasing offsets: the
+        # front is the minimum of the window (monotonic queue)
+        self._offsets: deque[tuple[float, float]] = deque()
+        self._last_stamp = 0.0
+
+    def reset(self) -> None:
+        self._offsets.clear()
+        self._last_stamp = 0.0
+
+    @property
+    def offset(self) -> float | None:
+        """Current adapter-to-host offset [s], None before the first
+        timestamped frame."""
+        return self._offsets[0][1] if self._offsets else None
+
+    def to_host(self, stamp: float, host: float) -> float:
+        """Host time at which the bus delivered a frame stamped *stamp*
+        by the adapter and dequeued at *host*; never later than *host*.
+
+        Returns *host* unchanged when the backend does not stamp frames.
+        """
+        if not stamp or not math.isfinite(stamp):
+            return host
+        if stamp < self._last_stamp:
+            self._offsets.clear()
+        self._last_stamp = stamp
+
+        offsets = self._offsets
+        off = host - stamp
+        while offsets and offsets[-1][1] >= off:
+            offsets.pop()
+        offsets.append((host, off))
+        horizon = host - self._window
+        while offsets[0][0] < horizon:
+            offsets.popleft()
+        return stamp + offsets[0][1]
@@ -0,0 +1,263 @@
+"""
+DBC import / export for :mod:`obc_controller.signal_db`.
+
+Only the parts of the format the charger needs are handled:
+
+  - ``BU_``  node list
+  - ``BO_`` / ``SG_``  messages and signals (multiplexed ``m<n>`` signals
+    are skipped; the ``M`` switch itself is kept as a plain signal)
+  - ``CM_ BO_``  message comments (may span several lines)
+  - ``BA_ "GenMsgCycleTime" BO_``  cycle time
+
+Everything else (value tables, ``SIG_VALTYPE_`` floats, other attributes)
+is ignored.  The loader streams the file line by line and builds the
+database indexed by frame ID; codecs are compiled lazily on first use, so
+loading a DBC with thousands of signals takes milliseconds.
+
+Export the built-in v1.3 table with::
+
+    python -m obc_controller.dbc export obc_v13.dbc
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from obc_controller.signal_db import (
+    BIG_ENDIAN,
+    LITTLE_ENDIAN,
+    MessageDef,
+    SignalDatabase,
+    SignalDef,
+)
+
+# DBC encodes "extended frame" as bit 31 of the message ID
+_EXTENDED_FLAG = 0x80000000
+# Pseudo message holding signals not assigned to any frame
+_INDEPENDENT_SIG_ID = 0xC0000000
+_NO_NODE = "Vector__XXX"
+
+_RE_BO = re.compile(r"BO_\s+(\d+)\s+(\w+)\s*:\s*(\d+)\s+(\w+)")
+_RE_SG = re.compile(
+    r"SG_\s+(\w+)\s*(M|m\d+M?)?\s*:\s*(\d+)\|(\d+)@([01])([+-])\s*"
+    r"\(\s*([^,\s]+)\s*,\s*([^)\s]+)\s*\)\s*"
+    r"\[\s*([^|\s]*)\s*\|\s*([^\]\s]*)\s*\]\s*"
+    r"\"((?:[^\"\\]|\\.)*)\""
+)
+_RE_CM_BO = re.compile(r"CM_\s+BO_\s+(\d+)\s+\"((?:[^\"\\]|\\.)*)\"\s*;",
+                       re.S)
+_RE_CYCLE = re.compile(
+    r"BA_\s+\"GenMsgCycleTime\"\s+BO_\s+(\d+)\s+(\d+)\s*;"
+)
+
+
+def _unescape(text: str) -> str:
+    return text.replace('\\"', '"').replace("\\\\", "\\")
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    return format(value, ".15g")
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+def _iter_statements(lines: Iterable[str]):
+    """Yield stripped statements; a ``CM_`` whose string spans several
+    lines is joined until its closing ``";``."""
+    pending: Optional[List[str]] = None
+    for line in lines:
+        if pending is not None:
+            pending.append(line)
+            if line.rstrip().endswith(";"):
+                yield "\n".join(pending)
+                pending = None
+            continue
+        s = line.strip()
+        if not s:
+            continue
+        if s.startswith("CM_ ") and not s.endswith(";"):
+            pending = [s]
+            continue
+        yield s
+    if pending is not None:
+        yield "\n".join(pending)
+
+
+def parse_dbc(lines: Iterable[str], name: str = "") -> SignalDatabase:
+    """Build a :class:`SignalDatabase` from an iterable of DBC lines."""
+    messages: Dict[int, MessageDef] = {}
+    signals: Dict[int, List[SignalDef]] = {}
+    current: Optional[List[SignalDef]] = None
+    cycles: Dict[int, int] = {}
+    comments: Dict[int, str] = {}
+
+    for stmt in _iter_statements(lines):
+        if stmt.startswith("SG_"):
+            if current is None:
+                continue
+            m = _RE_SG.match(stmt)
+            if m is None:
+                raise ValueError(f"Malformed DBC signal: {stmt!r}")
+            mux = m.group(2)
+            if mux and mux.startswith("m"):
+                continue
+            lo, hi = float(m.group(9) or 0), float(m.group(10) or 0)
+            current.append(SignalDef(
+                name=m.group(1),
+                start_bit=int(m.group(3)),
+                length=int(m.group(4)),
+                factor=float(m.group(7)),
+                offset=float(m.group(8)),
+                byte_order=LITTLE_ENDIAN if m.group(5) == "1" else BIG_ENDIAN,
+                signed=m.group(6) == "-",
+                minimum=None if lo == hi == 0 else lo,
+                maximum=None if lo == hi == 0 else hi,
+                unit=_unescape(m.group(11)),
+            ))
+            continue
+        current = None
+        if stmt.startswith("BO_ "):
+            m = _RE_BO.match(stmt)
+            if m is None:
+                raise ValueError(f"Malformed DBC message: {stmt!r}")
+            raw_id = int(m.group(1))
+            if raw_id == _INDEPENDENT_SIG_ID:
+                continue
+            extended = bool(raw_id & _EXTENDED_FLAG)
+            frame_id = raw_id & ~_EXTENDED_FLAG
+            sender = m.group(4)
+            messages[frame_id] = MessageDef(
+                name=m.group(2),
+                frame_id=frame_id,
+                length=int(m.group(3)),
+                signals=(),
+                is_extended=extended,
+                senders=() if sender == _NO_NODE else (sender,),
+            )
+            current = signals[frame_id] = []
+        elif stmt.startswith("BA_ "):
+            m = _RE_CYCLE.match(stmt)
+            if m is not None:
+                cycles[int(m.group(1)) & ~_EXTENDED_FLAG] = int(m.group(2))
+        elif stmt.startswith("CM_"):
+            m = _RE_CM_BO.match(stmt)
+            if m is not None:
+                comments[int(m.group(1)) & ~_EXTENDED_FLAG] = _unescape(
+                    m.group(2)
+                )
+
+    db = SignalDatabase(name=name)
+    for frame_id, msg in messages.items():
+        db.add_message(replace(
+            msg,
+            signals=tuple(signals[frame_id]),
+            cycle_ms=cycles.get(frame_id),
+            comment=comments.get(frame_id, ""),
+        ))
+    return db
+
+
+def loads_dbc(text: str, name: str = "") -> SignalDatabase:
+    return parse_dbc(text.splitlines(), name)
+
+
+def load_dbc(path: str | Path) -> SignalDatabase:
+    """Load a DBC file (streamed, not read into memory at once)."""
+    path = Path(path)
+    with path.open(encoding="cp1252", errors="replace") as fh:
+        return parse_dbc(fh, name=path.stem)
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+def _dbc_id(msg: MessageDef) -> int:
+    return msg.frame_id | _EXTENDED_FLAG if msg.is_extended else msg.frame_id
+
+
+def dumps_dbc(db: SignalDatabase) -> str:
+    msgs = db.messages
+    nodes: List[str] = []
+    for msg in msgs:
+        for node in msg.senders:
+            if node not in nodes:
+                nodes.append(node)
+
+    out = [
+        'VERSION ""',
+        "",
+        "NS_ :",
+        "    CM_",
+        "    BA_DEF_",
+        "    BA_",
+        "",
+        "BS_:",
+        "",
+        "BU_: " + " ".join(nodes),
+        "",
+    ]
+    for msg in msgs:
+        sender = msg.senders[0] if msg.senders else _NO_NODE
+        out.append(f"BO_ {_dbc_id(msg)} {msg.name}: {msg.length} {sender}")
+        for s in msg.signals:
+            order = "1" if s.byte_order == LITTLE_ENDIAN else "0"
+            sign = "-" if s.signed else "+"
+            lo = s.minimum if s.minimum is not None else (
+                s.raw_min * s.factor + s.offset
+            )
+            hi = s.maximum if s.maximum is not None else (
+                s.raw_max * s.factor + s.offset
+            )
+            out.append(
+                f" SG_ {s.name} : {s.start_bit}|{s.length}@{order}{sign} "
+                f"({_fmt(s.factor)},{_fmt(s.offset)}) "
+                f"[{_fmt(lo)}|{_fmt(hi)}] \"{_escape(s.unit)}\" {_NO_NODE}"
+            )
+        out.append("")
+
+    for msg in msgs:
+        if msg.comment:
+            out.append(f'CM_ BO_ {_dbc_id(msg)} "{_escape(msg.comment)}";')
+    if any(msg.cycle_ms is not None for msg in msgs):
+        out.append('BA_DEF_ BO_ "GenMsgCycleTime" INT 0 65535;')
+        out.append('BA_DEF_DEF_ "GenMsgCycleTime" 0;')
+        for msg in msgs:
+            if msg.cycle_ms is not None:
+                out.append(
+                    f'BA_ "GenMsgCycleTime" BO_ {_dbc_id(msg)} '
+                    f"{msg.cycle_ms};"
+                )
+    out.append("")
+    return "\n".join(out)
+
+
+def save_dbc(db: SignalDatabase, path: str | Path) -> None:
+    Path(path).write_text(dumps_dbc(db), encoding="cp1252")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) not in (1, 2) or argv[0] != "export":
+        print("usage: python -m obc_controller.dbc export [FILE.dbc]",
+              file=sys.stderr)
+        return 2
+    from obc_controller.can_protocol import OBC_V13
+
+    if len(argv) == 2:
+        save_dbc(OBC_V13, argv[1])
+    else:
+        sys.stdout.write(dumps_dbc(OBC_V13))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1225 @@
+"""
+Qt-free charger engine: the CAN I/O loop behind every front end.
+
+Handles:
+  - Connecting / disconnecting the python-can bus
+  - Periodic Message1 TX (500 ms, fixed-epoch deadlines) with optional
+    ramp (soft-start), either sent from Python or handed to the driver /
+    adapter as a cyclic task (python-can ``send_periodic``)
+  - Message2 RX with timeout alarm (5 s), with kernel / adapter acceptance
+    filters so unrelated bus traffic never reaches Python
+  - Safe-stop on disconnect (sends Control=1 for several cycles, as a
+    phase of the loop) and reuse of the open bus on reconnect
+  - Link supervision: on bus-off or persistent driver errors the bus is
+    reopened with exponential backoff
+  - One-shot TX sequences (e.g. the baudrate switch) queued as jobs
+  - A priority TX queue (STOP > Message1 > job frames) that backs off
+    while the driver's transmit buffer is full
+  - TX/RX health stats and status-bit change detection
+
+Results are reported through a single ``publish(kind, *args)`` callback;
+*kind* is one of :data:`EVENT_KINDS` (the same names as the
+``CANWorker`` signals).  :meth:`ChargerEngine.run` blocks, so front ends
+run it in a thread (``CANWorker``, :mod:`obc_controller.cli`) or a child
+process (:mod:`obc_controller.process_engine`).  Nothing here imports Qt.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import Iterable, Optional
+
+import can
+from can.broadcastmanager import CyclicSendTaskABC, ModifiableCyclicTaskABC
+
+from obc_controller.bus_pool import POOL
+from obc_controller.can_protocol import (
+    CYCLE_MS,
+    DEFAULT_PROTOCOL,
+    TIMEOUT_S,
+    ChargerControl,
+    ChargerProtocol,
+    Message1,
+)
+from obc_controller.charge_curve import ChargeCurve, CurveRunner
+from obc_controller.clock import AdapterClock
+from obc_controller.engine_common import (
+    FilterStats,
+    Publisher,
+    RampState,
+    TxFrameCache,
+    discard,
+    install_filters,
+    status_edges,
+    stop_frame,
+)
+from obc_controller.regulator import RegulatorConfig, SetpointRegulator
+from obc_controller.scheduler import TxScheduler
+from obc_controller.stats import (
+    TIMING_PER_DECADE,
+    HealthStats,
+    LogHistogram,
+    TimingCache,
+    TrafficMeter,
+    TrafficStats,
+)
+from obc_controller.tx_jobs import JobRunner, TxJob, TxStep
+from obc_controller.tx_queue import (
+    PRIO_CYCLIC,
+    PRIO_DIAG,
+    PRIO_SAFETY,
+    TxQueue,
+)
+
+log = logging.getLogger(__name__)
+
+
+# Event kinds passed to the publish callback
+EVENT_KINDS = (
+    "connected",            # ()
+    "disconnected",         # () safe-stopped, bus released; run() returns
+    "error",                # (str)
+    "log_message",          # (str)
+    "message2_received",    # (Message2)
+    "timeout_alarm",        # ()
+    "tx_message",           # (Message1)
+    "ramp_state",           # (active, ramped_v, ramped_a)
+    "regulator_state",      # (closed_loop, trim_v, trim_a)
+    "curve_state",          # (segment_index, phase, done)
+    "link_state",           # (up) bus lost / reopened while running
+    "job_progress",         # (job_name, step, total) frame sent
+    "job_done",             # (job_name, ok, detail)
+    "health_stats",         # (HealthStats)
+    "timing_histograms",    # ({name: LogHistogram.to_dict()}) at 1 Hz
+    "tx_jitter",            # (mean_ms, max_ms)
+    "traffic_stats",        # ({can_id: TrafficSnapshot})
+    "status_bit_changed",   # (bit_idx, name, is_fault)
+    "filter_stats",         # (passed, dropped; -1 = HW)
+    "tx_cache_stats",       # (hits, misses)
+    "monitored_frame",      # (arbitration_id, data)
+    "node_event",           # (address, kind, args) of a secondary charger
+)
+
+SAFE_STOP_CYCLES = 5  # Send Control=1 this many times before disconnect
+MIN_CYCLE_MS = 10  # Shortest Message1 cycle set_cycle_ms() accepts
+IDLE_WAIT_S = CYCLE_MS / 1000.0  # Max recv() block when nothing is scheduled
+# A blocking recv() cannot be interrupted, so longer waits are split
+# into slices this long to notice submit_job() / cancel_jobs()
+WAKE_POLL_S = 0.02
+
+# Link supervision: CAN errors with no successful TX / RX in between for
+# this long mean the adapter or bus is gone; reopen after RECONNECT_MIN_S,
+# doubling up to RECONNECT_MAX_S per failed attempt
+LINK_FAULT_S = 1.0
+RECONNECT_MIN_S = 0.5
+RECONNECT_MAX_S = 10.0
+_CAN_ERR_BUSOFF = 0x40  # error frame class bit (SocketCAN layout)
+
+
+@dataclass(frozen=True)
+class TargetConfig:
+    """What one charger is told in Message1: setpoints, control, ramp.
+
+    Never mutated: setters publish a new object by replacing a single
+    reference, and the engine loop reads whichever object is current
+    without locking.  Fields changed in one :meth:`ChargerEngine.configure`
+    call therefore always land in the same TX frame.
+    """
+
+    voltage: float = 0.0
+    current: float = 0.0
+    control: ChargerControl = ChargerControl.STOP_OUTPUTTING
+    ramp_enabled: bool = False
+    ramp_rate_v: float = 5.0   # V/s
+    ramp_rate_a: float = 0.5   # A/s
+    # Closed-loop trim from Message2 readings (None = open loop)
+    regulator: Optional[RegulatorConfig] = None
+    # Automated charge curve; replaces voltage / current while active
+    curve: Optional[ChargeCurve] = None
+    # Bumped to restart the ramp from 0 (explicit reset or STOP -> active)
+    ramp_generation: int = 0
+
+
+class _Node:
+    """One charger on the bus: targets, ramp, TX slot, RX timeout, health.
+
+    *config* is replaced (never modified) by the setters; everything
+    else belongs to the engine loop.
+    """
+
+    def __init__(self, address: int):
+        self.address = address
+        self.protocol: ChargerProtocol = DEFAULT_PROTOCOL
+        self.config = TargetConfig()
+
+        # Loop state
+        self.ramp = RampState()
+        self.ramp_generation = 0  # last TargetConfig.ramp_generation seen
+        self.ramp_active = False
+        self.regulator = SetpointRegulator()
+        self.curve = CurveRunner()
+        # Setpoints the charger should reach (target or curve)
+        self.target_v = 0.0
+        self.target_a = 0.0
+        self.sched = TxScheduler(CYCLE_MS / 1000.0)
+        self.tx_cache = TxFrameCache(self.protocol)
+        self.last_tx_time = 0.0
+        self.last_rx_time = 0.0
+        self.rx_seen = False  # last_rx_time is a real Message2 arrival
+        self.alarm_active = False
+        self.prev_status_byte: int | None = None
+
+        # Driver-cyclic Message1 task (periodic TX engine only)
+        self.periodic_task: Optional[CyclicSendTaskABC] = None
+        self.periodic_payload: bytes | None = None
+
+        # Safe-stop phase: TX slots left, STOP frame to send in them
+        # (None while the driver task repeats it)
+        self.stop_slots = 0
+        self.stop_frame: Optional[can.Message] = None
+
+        # Health tracking
+        self.tx_meter = TrafficMeter()
+        self.rx_meter = TrafficMeter()  # Message2 meter of the bus stats
+        # Fine-grained timing histograms (actual Message1 period,
+        # Message2 inter-arrival) for the health panel / JSON report
+        self.tx_period = LogHistogram(per_decade=TIMING_PER_DECADE)
+        self.rx_interval = LogHistogram(per_decade=TIMING_PER_DECADE)
+        self.timing = TimingCache()  # their percentiles, refreshed at 1 Hz
+
+    def label(self, text: str) -> str:
+        return f"[OBC 0x{self.address:02X}] {text}"
+
+    def reset(
+        self, protocol: ChargerProtocol, now: float, period: float
+    ) -> None:
+        """Fresh loop state for a new connection with TX *period* [s]."""
+        self.protocol = protocol
+        self.ramp = RampState()
+        self.ramp_generation = self.config.ramp_generation
+        self.ramp_active = False
+        self.regulator.reset()
+        self.curve.start(None, now)
+        self.sched = TxScheduler(period)
+        self.tx_cache = TxFrameCache(protocol)
+        self.last_tx_time = 0.0
+        self.last_rx_time = now
+        self.rx_seen = False
+        self.alarm_active = False
+        self.prev_status_byte = None
+        self.periodic_task = None
+        self.periodic_payload = None
+        self.stop_slots = 0
+        self.stop_frame = None
+        self.tx_meter.reset()
+        self.tx_period.reset()
+        self.rx_interval.reset()
+        self.timing.reset()
+
+    def resume(self, now: float) -> None:
+        """Loop state after the bus was reopened.  The charger has
+        probably timed out meanwhile, so the ramp starts again from 0;
+        setpoints, curve position and statistics are kept."""
+        self.ramp.reset()
+        self.ramp_active = False
+        self.regulator.reset()
+        self.sched.stop()
+        self.last_tx_time = 0.0
+        self.last_rx_time = now
+        self.alarm_active = False
+        self.periodic_task = None
+        self.periodic_payload = None
+
+
+class ChargerEngine:
+    """Owns the python-can bus; :meth:`run` is the blocking I/O loop.
+
+    Setters are thread-safe and may be called while :meth:`run` is
+    executing in another thread.  They serialize among themselves; the
+    engine loop never takes the lock, it reads the current immutable
+    :class:`TargetConfig` of each charger.
+
+    By default the engine drives the single charger addressed by the
+    protocol.  :meth:`set_nodes` adds chargers at other J1939 source
+    addresses on the same bus; each has its own setpoints, ramp,
+    timeout alarm and health stats.  The setters' *node* argument picks
+    one charger by address; without it they apply to all.  Events of
+    the first (primary) node are published as usual, those of the
+    others as ``node_event(address, kind, args)``.
+    """
+
+    def __init__(self, publish: Optional[Publisher] = None):
+        self._sink: Publisher = publish or discard
+        self._bus: Optional[can.Bus] = None
+        self._bus_key = ("", "", 0)  # interface, channel, bitrate of _bus
+        self._running = False
+        self._lock = threading.Lock()
+
+        self._tx_enabled = False
+        self._auto_reconnect = True
+        self._jobs = JobRunner()  # one-shot TX sequences
+        self._wake = threading.Event()  # set when a job is (un)queued
+        self._txq = TxQueue()  # every software TX frame goes through it
+
+        # Link supervision: start of the current run of CAN errors
+        # (0 = last TX / RX succeeded) and a fault found on the bus
+        self._error_since = 0.0
+        self._link_fault = ""
+        # A TX error was logged and no send succeeded since (a dead link
+        # fails every cycle; it is logged once)
+        self._tx_failing = False
+
+        # Connection parameters (set before start, protected by lock)
+        self._interface = "pcan"
+        self._channel = "PCAN_USBBUS1"
+        self._bitrate = 250000
+        self._periodic_tx = False
+        self._cycle_ms = CYCLE_MS
+
+        # Message1/Message2 layout (OBC variant), set before start
+        self._protocol: ChargerProtocol = DEFAULT_PROTOCOL
+
+        # Chargers by source address, primary first.  Until set_nodes()
+        # is called the only node is the protocol's own charger.
+        self._nodes: dict[int, _Node] = {
+            DEFAULT_PROTOCOL.address: _Node(DEFAULT_PROTOCOL.address)
+        }
+        self._explicit_nodes = False
+
+        # Extra arbitration IDs to accept besides Message2
+        self._monitored_ids: tuple[int, ...] = ()
+        self._filter_stats = FilterStats()
+
+        self._rx_traffic = TrafficStats()  # per arbitration ID
+        # Adapter RX timestamps -> host clock, and the dequeue delay
+        self._rx_clock = AdapterClock()
+        self._rx_delay = LogHistogram(per_decade=TIMING_PER_DECADE)
+        self._primary: Optional[_Node] = None  # set by run()
+
+    # ---- public setters (called from any thread) --------------------------
+
+    def set_connection_params(
+        self, interface: str, channel: str, bitrate: int
+    ) -> None:
+        with self._lock:
+            self._interface = interface
+            self._channel = channel
+            self._bitrate = bitrate
+
+    def set_periodic_tx(self, enabled: bool) -> None:
+        """Let the driver / adapter repeat Message1 (python-can
+        ``send_periodic``) instead of sending every frame from Python.
+
+        Must be called before :meth:`run`.
+        """
+        with self._lock:
+            self._periodic_tx = enabled
+
+    def set_auto_reconnect(self, enabled: bool) -> None:
+        """Reopen the bus after bus-off / adapter loss (default) instead
+        of ending :meth:`run`."""
+        self._auto_reconnect = enabled
+
+    def set_cycle_ms(self, cycle_ms: int) -> None:
+        """Message1 period for the next connection (default
+        :data:`CYCLE_MS`); it also paces the safe-stop frames.
+
+        Must be called before :meth:`run`.
+        """
+        if cycle_ms < MIN_CYCLE_MS:
+            raise ValueError(
+                f"TX cycle must be at least {MIN_CYCLE_MS} ms, "
+                f"got {cycle_ms}"
+            )
+        with self._lock:
+            self._cycle_ms = cycle_ms
+
+    def set_protocol(self, protocol: ChargerProtocol) -> None:
+        """Use the Message1/Message2 layout of another OBC variant.
+
+        Must be called before :meth:`run`.
+        """
+        with self._lock:
+            self._protocol = protocol
+            if not self._explicit_nodes:
+                node = next(iter(self._nodes.values()))
+                node.address = protocol.address
+                self._nodes = {protocol.address: node}
+
+    def set_nodes(self, addresses: Iterable[int]) -> None:
+        """Drive one charger per J1939 source address, the first being
+        the primary node.
+
+        Message1 / Message2 IDs are derived from the protocol's by
+        replacing the charger address.  Nodes already configured keep
+        their setpoints.  Must be called before :meth:`run`.
+        """
+        addresses = list(dict.fromkeys(addresses))
+        if not addresses:
+            raise ValueError("At least one charger address is required")
+        with self._lock:
+            for addr in addresses:
+                self._protocol.with_address(addr)  # validate
+            self._nodes = {
+                addr: self._nodes.get(addr) or _Node(addr)
+                for addr in addresses
+            }
+            self._explicit_nodes = True
+
+    def nodes(self) -> list[int]:
+        """Source addresses of the driven chargers, primary first."""
+        with self._lock:
+            return list(self._nodes)
+
+    def set_monitored_ids(self, ids: Iterable[int]) -> None:
+        """Accept these arbitration IDs in addition to Message2.
+
+        Frames with these IDs are passed through ``monitored_frame``.
+        Must be called before :meth:`run`.
+        """
+        with self._lock:
+            self._monitored_ids = tuple(ids)
+
+    def _targets(self, node: Optional[int]) -> Iterable[_Node]:
+        """Node at address *node*, or every node for None; call with the
+        lock held."""
+        if node is None:
+            return self._nodes.values()
+        try:
+            return (self._nodes[node],)
+        except KeyError:
+            raise ValueError(f"No charger at address 0x{node:02X}") from None
+
+    def configure(
+        self,
+        node: Optional[int] = None,
+        *,
+        reset_ramp: bool = False,
+        **changes,
+    ) -> None:
+        """Change several :class:`TargetConfig` fields at once.
+
+        The loop sees either none or all of *changes*, so e.g. new
+        setpoints and a new control mode go out in the same Message1.
+        """
+        with self._lock:
+            for n in self._targets(node):
+                old = n.config
+                generation = old.ramp_generation
+                ctrl = changes.get("control", old.control)
+                # Transition from STOP to active mode -> reset ramp
+                if reset_ramp or (
+                    ctrl != ChargerControl.STOP_OUTPUTTING
+                    and old.control == ChargerControl.STOP_OUTPUTTING
+                ):
+                    generation += 1
+                n.config = replace(
+                    old, ramp_generation=generation, **changes
+                )
+
+    def target_config(self, node: Optional[int] = None) -> TargetConfig:
+        """Current targets of *node* (default: the primary charger)."""
+        with self._lock:
+            if node is None:
+                return next(iter(self._nodes.values())).config
+            return next(iter(self._targets(node))).config
+
+    def set_setpoints(
+        self, voltage: float, current: float, node: Optional[int] = None
+    ) -> None:
+        self.configure(node, voltage=voltage, current=current)
+
+    def set_control(
+        self, ctrl: ChargerControl, node: Optional[int] = None
+    ) -> None:
+        self.configure(node, control=ctrl)
+
+    def set_ramp_config(
+        self,
+        enabled: bool,
+        rate_v: float,
+        rate_a: float,
+        node: Optional[int] = None,
+    ) -> None:
+        self.configure(
+            node, ramp_enabled=enabled, ramp_rate_v=rate_v, ramp_rate_a=rate_a
+        )
+
+    def reset_ramp(self, node: Optional[int] = None) -> None:
+        """Request ramp state machine to restart from 0."""
+        self.configure(node, reset_ramp=True)
+
+    # Single-reference flags: assignment is atomic, the loop reads them
+    # without the lock.
+
+    def enable_tx(self, enabled: bool) -> None:
+        self._tx_enabled = enabled
+
+    def request_stop(self) -> None:
+        self._running = False
+
+    def submit_job(self, job: TxJob) -> None:
+        """Queue a one-shot TX sequence; it runs once the bus is open and
+        earlier jobs are done (``job_progress`` / ``job_done``)."""
+        self._jobs.submit(job)
+        self._wake.set()
+
+    def cancel_jobs(self) -> None:
+        """Abort the running TX job and drop the queued ones."""
+        self._jobs.cancel()
+        self._wake.set()
+
+    # ---- engine loop -----------------------------------------------------
+
+    def run(self) -> None:  # noqa: C901
+        # --- connect ---
+        with self._lock:
+            iface = self._interface
+            chan = self._channel
+            brate = self._bitrate
+            periodic = self._periodic_tx
+            period = self._cycle_ms / 1000.0
+            monitored = frozenset(self._monitored_ids)
+            proto = self._protocol
+            nodes = list(self._nodes.values())
+            explicit = self._explicit_nodes
+        try:
+            if iface == "pcan":
+                self._publish(
+                    "log_message",
+                    f"Connecting PCAN channel={chan} "
+                    f"bitrate={brate} \u2026"
+                )
+            self._bus, reused = POOL.acquire(iface, chan, brate)
+            self._bus_key = (iface, chan, brate)
+            self._publish(
+                "log_message",
+                "CAN bus connected (open handle reused)." if reused
+                else "CAN bus connected."
+            )
+        except Exception as exc:
+            msg = f"CAN connect failed: {exc}"
+            if iface == "pcan" and "bitrate" in str(exc).lower():
+                msg += (
+                    "\nNote: Bitrate is configured in PCAN driver / PCAN-View."
+                )
+            self._publish("log_message", msg)
+            self._publish("error", msg)
+            self._abort_jobs("not connected")
+            self._publish("disconnected")
+            return
+
+        now = time.monotonic()
+        for node in nodes:
+            node.reset(
+                proto.with_address(node.address) if explicit else proto,
+                now,
+                period,
+            )
+        self._primary = nodes[0]
+        # Message2 ID -> node: one dict lookup per received frame
+        route = {node.protocol.msg2_id: node for node in nodes}
+        self._install_filters(route.keys() | monitored)
+        self._publish("connected")
+        if len(nodes) > 1:
+            self._publish(
+                "log_message",
+                f"Driving {len(nodes)} chargers: " + ", ".join(
+                    f"0x{node.address:02X}" for node in nodes
+                ),
+            )
+
+        self._running = True
+        # TX slot of node k is offset by k * period / N, spreading the
+        # Message1 frames evenly over the cycle.
+        slot = period / len(nodes)
+        tx_active = False
+        last_node = nodes[-1]
+
+        if periodic:
+            self._publish(
+                "log_message",
+                "TX engine: driver-cyclic Message1 (send_periodic)."
+            )
+        if period != CYCLE_MS / 1000.0:
+            self._publish(
+                "log_message", f"TX cycle: {period * 1000.0:g} ms."
+            )
+
+        # Reset health tracking for fresh connection
+        self._rx_traffic.reset()
+        self._rx_clock.reset()
+        self._rx_delay.reset()
+        self._txq.reset()
+        self._error_since = 0.0
+        self._link_fault = ""
+        self._tx_failing = False
+        for node in nodes:
+            node.rx_meter = self._rx_traffic.meter(node.protocol.msg2_id)
+
+        # Set once request_stop() is seen: STOP frames go out on the TX
+        # slots while RX carries on, then the loop ends
+        stopping = False
+        stopped = False
+        try:
+            while True:
+                tx_en = self._tx_enabled
+
+                now = time.monotonic()
+
+                # ---- TX --------------------------------------------------
+                if not self._running and not stopping:
+                    stopping = True
+                    self._begin_safe_stop(nodes, now, slot)
+                if stopping:
+                    if self._safe_stop_step(nodes, now):
+                        stopped = True
+                        break
+                elif not tx_en:
+                    if tx_active:
+                        tx_active = False
+                        for node in nodes:
+                            node.sched.stop()
+                            # a pause is not a TX period
+                            node.last_tx_time = 0.0
+                        self._stop_periodic()
+                elif not tx_active:
+                    tx_active = True
+                    for k, node in enumerate(nodes):
+                        node.sched.start(now + k * slot)
+
+                # One-shot jobs: one frame in the TX queue at a time
+                jobs = self._jobs
+                txq = self._txq
+                self._wake.clear()
+                if not stopping:
+                    cancelled = jobs.take_cancelled()
+                    if cancelled:
+                        txq.drop(PRIO_DIAG)
+                    for job in cancelled:
+                        self._job_done(job, False, "cancelled")
+                    if (
+                        jobs.deadline(now) <= now
+                        and not txq.pending(PRIO_DIAG)
+                    ):
+                        self._send_job_step()
+
+                # Not while stopping: a charger done with its STOP slots
+                # must not get a Message1 while the others finish theirs
+                if tx_en and not stopping:
+                    for node in nodes:
+                        if node.sched.due(now):
+                            periodic = self._transmit(node, now, periodic)
+                            if node is last_node:
+                                # Bus-wide stats once per cycle
+                                self._publish_bus_stats(now)
+
+                # STOP and job frames, and whatever a full buffer held
+                # back (Message1 goes out in _transmit)
+                if txq:
+                    self._flush_tx(now)
+
+                # ---- RX: block until the next TX / timeout deadline ------
+                deadline = now + IDLE_WAIT_S
+                if txq and txq.retry_at < deadline:
+                    deadline = txq.retry_at
+                if jobs.next_due < deadline and not txq.pending(PRIO_DIAG):
+                    deadline = jobs.next_due
+                if tx_en or stopping:
+                    for node in nodes:
+                        if node.sched.next_deadline < deadline:
+                            deadline = node.sched.next_deadline
+                        if not (node.alarm_active or stopping):
+                            t = node.last_rx_time + TIMEOUT_S
+                            if t < deadline:
+                                deadline = t
+                wait = max(0.0, deadline - time.monotonic())
+                try:
+                    frame = self._recv(wait)
+                except can.CanError as exc:
+                    if not self._error_since:
+                        self._publish("log_message", f"RX error: {exc}")
+                    self._link_error(time.monotonic())
+                    time.sleep(wait)  # a dead adapter fails at once
+                    frame = None
+                now = time.monotonic()
+
+                if frame is not None and frame.is_error_frame:
+                    if frame.arbitration_id & _CAN_ERR_BUSOFF:
+                        self._link_fault = "bus-off"
+                    frame = None
+                if frame is not None:
+                    self._error_since = 0.0
+                    can_id = frame.arbitration_id
+                    self._filter_stats.passed += 1
+                    # When the bus delivered it, not when we got to it
+                    rx_time = self._rx_clock.to_host(frame.timestamp, now)
+                    if rx_time != now:
+                        self._rx_delay.add(now - rx_time)
+                    self._rx_traffic.record(can_id, rx_time)
+                    if can_id in monitored:
+                        self._publish(
+                            "monitored_frame", can_id, bytes(frame.data)
+                        )
+                    node = route.get(can_id)
+                    if node is not None:
+                        self._receive(node, frame, rx_time)
+
+                # ---- timeout check ---------------------------------------
+                if tx_en and not stopping:
+                    for node in nodes:
+                        if (
+                            not node.alarm_active
+                            and (now - node.last_rx_time) > TIMEOUT_S
+                        ):
+                            node.alarm_active = True
+                            self._publish_node(node, "timeout_alarm")
+                            self._log_node(
+                                node, "ALARM: No Message2 for > 5 s!"
+                            )
+
+                # ---- link supervision ------------------------------------
+                if (
+                    self._error_since
+                    and now - self._error_since >= LINK_FAULT_S
+                ):
+                    self._link_fault = (
+                        f"CAN errors for > {LINK_FAULT_S:g} s"
+                    )
+                if self._link_fault:
+                    if stopping or not self._recover(
+                        nodes, route.keys() | monitored
+                    ):
+                        break
+                    tx_active = False
+
+        finally:
+            if not stopped:
+                # The loop died: no slots left to schedule STOP on
+                self._safe_stop(nodes, period)
+            self._close_bus(reuse=stopped)
+            self._abort_jobs("disconnected")
+            self._publish("disconnected")
+
+    def _transmit(self, node: _Node, now: float, periodic: bool) -> bool:
+        """Send *node*'s Message1 for the slot due at *now*.
+
+        Returns whether driver-cyclic TX is (still) in use.
+        """
+        cfg = node.config  # one consistent snapshot, no lock
+        ctrl = cfg.control
+        sched = node.sched
+        if cfg.ramp_generation != node.ramp_generation:
+            node.ramp_generation = cfg.ramp_generation
+            node.ramp.reset()
+
+        # Charge curve: (re)starts from its first segment when the
+        # charger is started or the curve is replaced
+        runner = node.curve
+        if ctrl == ChargerControl.STOP_OUTPUTTING:
+            runner.start(None, now)
+        elif runner.curve is not cfg.curve:
+            runner.start(cfg.curve, now)
+            if cfg.curve is not None:
+                self._curve_changed(node)
+        if runner.curve is None:
+            node.target_v, node.target_a = cfg.voltage, cfg.current
+        else:
+            if runner.observe(now):  # segment time limit
+                self._curve_changed(node)
+            if runner.done:
+                ctrl = ChargerControl.STOP_OUTPUTTING
+            else:
+                node.target_v, node.target_a = runner.setpoints(now)
+
+        last = node.last_tx_time
+        dt = now - last if last > 0 else sched.period
+        send_v, send_a, ramp_active = node.ramp.step(
+            ctrl, node.target_v, node.target_a, cfg.ramp_enabled,
+            cfg.ramp_rate_v, cfg.ramp_rate_a, dt
+        )
+        node.ramp_active = ramp_active
+        reg = node.regulator
+        closed_loop = (
+            cfg.regulator is not None
+            and ctrl != ChargerControl.STOP_OUTPUTTING
+        )
+        if closed_loop:
+            out_v = round(max(0.0, send_v + reg.trim_v), 1)
+            out_a = round(max(0.0, send_a + reg.trim_a), 1)
+        else:
+            reg.reset()
+            out_v, out_a = send_v, send_a
+
+        msg1, frame = node.tx_cache.lookup(out_v, out_a, ctrl)
+        self._publish_node(node, "ramp_state", ramp_active, send_v, send_a)
+        self._publish_node(
+            node, "regulator_state", closed_loop, reg.trim_v, reg.trim_a
+        )
+        if periodic:
+            try:
+                periodic = self._update_periodic(node, frame, sched.period)
+            except can.CanError as exc:
+                self._tx_error(node, f"TX error: {exc}")
+                self._link_error(now)
+            else:
+                if periodic:
+                    self._error_since = 0.0
+                    self._tx_failing = False
+                    self._message1_sent(node, msg1, now, None)
+        if not periodic:
+            # Sent right away, before any stats work below; if the
+            # buffer is full, retried or replaced by the next Message1
+            self._txq.put(
+                PRIO_CYCLIC, frame, partial(self._message1_sent, node, msg1)
+            )
+            self._flush_tx(now)
+        # The slot is used even on error so a failing adapter is not
+        # hammered in a tight loop.
+        sched.mark_sent(now)
+
+        # Emit health stats every TX cycle; the timing percentiles and
+        # histogram export only when due
+        txq = self._txq
+        timing = node.timing
+        if timing.due(now):
+            self._publish_node(node, "timing_histograms", timing.update(now, {
+                "tx_period": node.tx_period,
+                "rx_interval": node.rx_interval,
+                "rx_queue_delay": self._rx_delay,
+            }))
+        self._publish_node(node, "health_stats", HealthStats(
+            tx_rate=node.tx_meter.rate.rate(now),
+            rx_rate=node.rx_meter.rate.rate(now),
+            last_rx_age=now - node.last_rx_time,
+            tx_period=timing.summary("tx_period"),
+            rx_interval=timing.summary("rx_interval"),
+            rx_queue_delay=timing.summary("rx_queue_delay"),
+            tx_missed=sched.missed,
+            tx_queue_depth=txq.backlog,
+            tx_queue_peak=txq.peak,
+            tx_overflows=txq.overflows,
+            tx_dropped=txq.dropped,
+        ))
+        self._publish_node(node, "tx_jitter", *sched.jitter_ms())
+        cache = node.tx_cache
+        self._publish_node(node, "tx_cache_stats", cache.hits, cache.misses)
+        return periodic
+
+    def _publish_bus_stats(self, now: float) -> None:
+        self._publish("traffic_stats", self._rx_traffic.snapshot(now))
+        fs = self._filter_stats
+        self._publish(
+            "filter_stats", fs.passed, -1 if fs.hw_filtered else fs.dropped
+        )
+
+    def _receive(self, node: _Node, frame: can.Message, now: float) -> None:
+        """Handle a Message2 frame routed to *node*; *now* is its
+        reception time on the host clock."""
+        try:
+            msg2 = node.protocol.decode_message2(frame.data)
+        except Exception as exc:
+            self._log_node(node, f"Message2 decode error: {exc}")
+            return
+        msg2.timestamp = now
+        self._publish_node(node, "message2_received", msg2)
+        cfg = node.config
+        runner = node.curve
+        # The reading says nothing about the targets while the ramp is
+        # still moving them or a status bit (e.g. STARTING) is set
+        settling = node.ramp_active or msg2.status.to_byte() != 0
+        if (
+            runner.curve is not None
+            and cfg.control != ChargerControl.STOP_OUTPUTTING
+            and (
+                runner.observe(now) if settling else runner.observe(
+                    now, msg2.output_voltage, msg2.output_current
+                )
+            )
+        ):
+            self._curve_changed(node)
+        if (
+            cfg.regulator is not None
+            and cfg.control != ChargerControl.STOP_OUTPUTTING
+            and not runner.done
+        ):
+            # Closed loop: trim the next Message1 setpoints.  Hold the
+            # integrators while the output is settling.
+            node.regulator.update(
+                cfg.regulator,
+                node.target_v,
+                node.target_a,
+                msg2.output_voltage,
+                msg2.output_current,
+                now,
+                hold=settling,
+            )
+        if node.rx_seen:
+            node.rx_interval.add(now - node.last_rx_time)
+        node.rx_seen = True
+        node.last_rx_time = now
+        if node.alarm_active:
+            node.alarm_active = False
+            self._log_node(node, "Message2 received \u2014 timeout cleared.")
+
+        # Detect status bit changes
+        new_status = msg2.status.to_byte()
+        for edge in status_edges(node.prev_status_byte, new_status):
+            self._publish_node(node, "status_bit_changed", *edge)
+            if node is not self._primary:
+                _, name, is_fault = edge
+                self._log_node(
+                    node, f"Status {name} {'set' if is_fault else 'cleared'}"
+                )
+        node.prev_status_byte = new_status
+
+    def _curve_changed(self, node: _Node) -> None:
+        runner = node.curve
+        if runner.done:
+            self._log_node(node, "Charge curve complete \u2014 stopping.")
+        else:
+            self._log_node(
+                node,
+                f"Charge curve: segment {runner.index + 1}/"
+                f"{len(runner.curve)} ({runner.phase}).",
+            )
+        self._publish_node(
+            node, "curve_state", runner.index, runner.phase, runner.done
+        )
+
+    # ---- internal helpers ------------------------------------------------
+
+    def _publish(self, kind: str, *args) -> None:
+        self._sink(kind, *args)
+
+    def _publish_node(self, node: _Node, kind: str, *args) -> None:
+        """Publish a per-charger event (``node_event`` unless primary)."""
+        if node is self._primary:
+            self._sink(kind, *args)
+        else:
+            self._sink("node_event", node.address, kind, args)
+
+    def _log_node(self, node: _Node, text: str) -> None:
+        if node is not self._primary:
+            text = node.label(text)
+        self._sink("log_message", text)
+
+    def _install_filters(self, ids: Iterable[int]) -> None:
+        self._filter_stats = install_filters(self._bus, ids, self._publish)
+
+    def _update_periodic(
+        self, node: _Node, frame: can.Message, period: float
+    ) -> bool:
+        """Start or update *node*'s driver-cyclic Message1 task.
+
+        The task is only touched when the encoded payload changes.
+        Returns False if the backend cannot run a modifiable cyclic task,
+        in which case the caller falls back to software TX.
+        """
+        payload = bytes(frame.data)
+        if node.periodic_task is None:
+            try:
+                task = self._bus.send_periodic(frame, period)
+            except (NotImplementedError, can.CanError) as exc:
+                self._publish(
+                    "log_message",
+                    f"send_periodic unavailable ({exc}) \u2014 "
+                    "falling back to software TX."
+                )
+                self._stop_periodic()
+                return False
+            if not isinstance(task, ModifiableCyclicTaskABC):
+                task.stop()
+                self._publish(
+                    "log_message",
+                    "Cyclic task is not modifiable \u2014 "
+                    "falling back to software TX."
+                )
+                self._stop_periodic()
+                return False
+            node.periodic_task = task
+        elif payload != node.periodic_payload:
+            node.periodic_task.modify_data(frame)
+        node.periodic_payload = payload
+        return True
+
+    def _stop_periodic(self) -> None:
+        for node in self._nodes.values():
+            if node.periodic_task is not None:
+                try:
+                    node.periodic_task.stop()
+                except can.CanError:
+                    pass
+                node.periodic_task = None
+                node.periodic_payload = None
+
+    def _recv(self, timeout: float) -> Optional[can.Message]:
+        """``bus.recv()`` that returns None early once a job was
+        submitted or cancelled."""
+        bus = self._bus
+        end = time.monotonic() + timeout
+        while True:
+            left = end - time.monotonic()
+            frame = bus.recv(timeout=max(0.0, min(left, WAKE_POLL_S)))
+            if frame is not None or left <= WAKE_POLL_S or self._wake.is_set():
+                return frame
+
+    def _send_job_step(self) -> None:
+        """Queue the due frame of the running TX job."""
+        jobs = self._jobs
+        step = jobs.take()
+        self._txq.put(
+            PRIO_DIAG,
+            step.frame(),
+            partial(self._job_step_sent, jobs.job, step, jobs.step),
+        )
+
+    def _job_step_sent(
+        self, job: TxJob, step: TxStep, n: int, now: float,
+        error: Optional[str],
+    ) -> None:
+        jobs = self._jobs
+        if jobs.job is not job:
+            return  # aborted meanwhile
+        total = len(job.steps)
+        label = step.label or f"step {n}/{total}"
+        if error is not None:
+            jobs.finish()
+            self._job_done(job, False, f"{label} {error}")
+            return
+        self._publish(
+            "log_message",
+            f"{job.name}: sent {label} (ID=0x{step.arbitration_id:08X}, "
+            f"data={step.data.hex()})",
+        )
+        self._publish("job_progress", job.name, n, total)
+        if n == total:
+            jobs.finish()
+            self._job_done(job, True, "")
+
+    def _job_done(self, job: TxJob, ok: bool, detail: str) -> None:
+        if ok:
+            self._publish("log_message", f"{job.name} sequence completed.")
+        else:
+            self._publish("log_message", f"{job.name} aborted: {detail}")
+        self._publish("job_done", job.name, ok, detail)
+
+    def _abort_jobs(self, reason: str) -> None:
+        self._txq.drop(PRIO_DIAG)
+        for job in self._jobs.abort():
+            self._job_done(job, False, reason)
+
+    def _message1_sent(
+        self, node: _Node, msg1: Message1, now: float, error: Optional[str]
+    ) -> None:
+        if error is not None:
+            self._tx_error(node, error)
+            return
+        last = node.last_tx_time
+        if last > 0:
+            node.tx_period.add(now - last)
+        node.last_tx_time = now
+        node.tx_meter.record(now)
+        self._publish_node(node, "tx_message", msg1)
+
+    def _stop_sent(
+        self, node: _Node, now: float, error: Optional[str]
+    ) -> None:
+        if error is not None:
+            self._tx_error(node, error)
+
+    def _tx_error(self, node: _Node, text: str) -> None:
+        if not self._tx_failing:
+            self._tx_failing = True
+            self._log_node(node, text)
+
+    def _flush_tx(self, now: float) -> None:
+        """Send what the TX queue holds; a refused or failed send counts
+        towards a link fault like an RX error."""
+        sent, failed = self._txq.flush(self._bus, now)
+        if sent:
+            self._error_since = 0.0
+            if not failed:
+                self._tx_failing = False
+        if failed:
+            self._link_error(now)
+
+    def _link_error(self, now: float) -> None:
+        if not self._error_since:
+            self._error_since = now
+
+    def _recover(self, nodes: list[_Node], filter_ids: Iterable[int]) -> bool:
+        """Reopen the bus after a link fault, with exponential backoff.
+
+        Returns False (bus closed) if auto-reconnect is off or a stop was
+        requested before the bus came back.
+        """
+        reason, self._link_fault = self._link_fault, ""
+        self._error_since = 0.0
+        self._publish("log_message", f"CAN link lost ({reason}).")
+        self._abort_jobs("link lost")
+        self._publish("link_state", False)
+        # The link may still carry TX: tell the chargers to stop rather
+        # than leave them on their last command
+        txq = self._txq
+        for node in nodes:
+            txq.put(PRIO_SAFETY, stop_frame(node.protocol))
+        txq.flush(self._bus, time.monotonic())
+        txq.clear()
+        self._stop_periodic()
+        bus, self._bus = self._bus, None
+        try:
+            bus.shutdown()  # never back into the pool
+        except Exception:
+            pass
+        if not self._auto_reconnect:
+            self._publish("error", f"CAN link lost ({reason}).")
+            return False
+
+        iface, chan, brate = self._bus_key
+        delay = RECONNECT_MIN_S
+        attempt = 0
+        while self._running:
+            attempt += 1
+            self._publish(
+                "log_message",
+                f"Reconnecting in {delay:g} s (attempt {attempt}) \u2026",
+            )
+            until = time.monotonic() + delay
+            while self._running:
+                left = until - time.monotonic()
+                if left <= 0.0:
+                    break
+                time.sleep(min(IDLE_WAIT_S, left))
+            if not self._running:
+                break
+            try:
+                self._bus, _ = POOL.acquire(iface, chan, brate)
+            except Exception as exc:
+                self._publish("log_message", f"Reconnect failed: {exc}")
+                delay = min(delay * 2.0, RECONNECT_MAX_S)
+                continue
+            self._install_filters(filter_ids)
+            self._rx_clock.reset()
+            now = time.monotonic()
+            for node in nodes:
+                node.resume(now)
+            self._tx_failing = False
+            self._publish(
+                "log_message", f"CAN link restored (attempt {attempt})."
+            )
+            self._publish("link_state", True)
+            return True
+        self._publish("log_message", "Reconnect abandoned (stop requested).")
+        return False
+
+    def _begin_safe_stop(
+        self, nodes: list[_Node], now: float, slot: float
+    ) -> None:
+        """Enter the safe-stop phase: every charger gets Control=1
+        (stop) in its next SAFE_STOP_CYCLES TX slots, the first one
+        right away."""
+        self._abort_jobs("disconnect")
+        self._txq.drop(PRIO_CYCLIC)  # stale once STOP is decided
+        self._publish(
+            "log_message", "Safe-stop: sending Control=STOP \u2026"
+        )
+        for k, node in enumerate(nodes):
+            node.stop_frame = stop_frame(node.protocol)
+            task = node.periodic_task
+            if task is not None:
+                # The driver keeps the cycle going; just swap in the
+                # STOP frame and let it repeat it
+                try:
+                    task.modify_data(node.stop_frame)
+                    node.stop_frame = None
+                except can.CanError:
+                    pass
+            # One more slot: the last STOP gets a full period on the bus
+            # before the handle is released
+            node.stop_slots = SAFE_STOP_CYCLES + 1
+            node.sched.start(now + k * slot)
+
+    def _safe_stop_step(self, nodes: list[_Node], now: float) -> bool:
+        """Queue the STOP frames due at *now*; True when the phase is
+        over for every charger and no STOP is left in the TX queue."""
+        txq = self._txq
+        done = not txq.pending(PRIO_SAFETY)
+        for node in nodes:
+            if node.stop_slots and node.sched.due(now):
+                node.stop_slots -= 1
+                if node.stop_slots and node.stop_frame is not None:
+                    txq.put(
+                        PRIO_SAFETY,
+                        node.stop_frame,
+                        partial(self._stop_sent, node),
+                    )
+                node.sched.mark_sent(now)
+            if node.stop_slots:
+                done = False
+        if done:
+            self._stop_periodic()
+            self._publish("log_message", "Safe-stop complete.")
+        return done
+
+    def _safe_stop(self, nodes: Iterable[_Node], period: float) -> None:
+        """Send Control=1 (stop) to every charger for several cycles,
+        blocking; fallback when the loop ended on an exception."""
+        if self._bus is None:
+            return
+        self._publish("log_message", "Safe-stop: sending Control=STOP \u2026")
+        software: list[can.Message] = []
+        for node in nodes:
+            frame = stop_frame(node.protocol)
+            task = node.periodic_task
+            if task is None:
+                software.append(frame)
+                continue
+            # The driver keeps the cycle going; just swap in STOP frames
+            # and let it repeat them for SAFE_STOP_CYCLES periods.
+            try:
+                task.modify_data(frame)
+            except can.CanError:
+                software.append(frame)
+        try:
+            for _ in range(SAFE_STOP_CYCLES):
+                for frame in software:
+                    self._bus.send(frame)
+                time.sleep(period)
+        except can.CanError:
+            pass
+        finally:
+            self._stop_periodic()
+        self._publish("log_message", "Safe-stop complete.")
+
+    def _close_bus(self, reuse: bool = False) -> None:
+        """Release the bus; with *reuse* it stays open in the pool for a
+        reconnect to the same channel."""
+        self._stop_periodic()
+        self._txq.clear()
+        bus, self._bus = self._bus, None
+        if bus is None:
+            return
+        if reuse and POOL.release(bus, *self._bus_key):
+            self._publish("log_message", "CAN bus released (kept open).")
+            return
+        try:
+            bus.shutdown()
+        except Exception:
+            pass
+        self._publish("log_message", "CAN bus closed.")
+
+    def get_bus(self) -> Optional[can.Bus]:
+        """Return the underlying CAN bus object (or None if not connected).
+
+        Only for inspection: frames go through the engine (TX jobs).
+        """
+        return self._bus
+
+    def is_bus_connected(self) -> bool:
+        """Return True if the CAN bus is currently open."""
+        return self._bus is not None
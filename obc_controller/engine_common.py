@@ -0,0 +1,231 @@
+"""
+Building blocks shared by the charger engines.
+
+:class:`~obc_controller.engine.ChargerEngine` (thread / process) and
+:class:`~obc_controller.async_engine.AsyncChargerEngine` run the same
+Message1 / Message2 cycle; the pieces of it that do not depend on how
+the loop is driven live here: RX acceptance filters, the Message1
+frame cache, the soft-start ramp, status-bit edges and the safe-stop
+frame.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Iterable, Iterator
+
+import can
+
+from obc_controller.can_protocol import (
+    ChargerControl,
+    ChargerProtocol,
+    Message1,
+)
+
+# publish(kind, *args) callback of the engines
+Publisher = Callable[..., None]
+
+# Status bit names for change detection
+STATUS_BIT_NAMES = {
+    0: "HW_FAIL",
+    1: "OVER_TEMP",
+    2: "INPUT_V_ERR",
+    3: "STARTING",
+    4: "COMM_TIMEOUT",
+}
+
+
+def build_filters(ids: Iterable[int]) -> list[dict]:
+    """Exact-match extended-ID acceptance filters for python-can."""
+    return [
+        {"can_id": can_id, "can_mask": 0x1FFFFFFF, "extended": True}
+        for can_id in sorted(set(ids))
+    ]
+
+
+class FilterStats:
+    """Frames passed vs. dropped by the RX acceptance filter.
+
+    *dropped* is only counted when python-can filters in software.
+    With kernel / adapter filtering *hw_filtered* is set instead: the
+    rejected frames never reach Python, *dropped* stays 0 and the
+    ``filter_stats`` event reports it as -1.
+    """
+
+    __slots__ = ("passed", "dropped", "hw_filtered")
+
+    def __init__(self) -> None:
+        self.passed = 0
+        self.dropped = 0
+        self.hw_filtered = False
+
+
+class TxFrameCache:
+    """Last encoded Message1 frame, keyed by its quantized wire values.
+
+    During steady-state charging the setpoint and control stay constant
+    for minutes, so the Message1 object, payload and ``can.Message`` are
+    only rebuilt when (v_raw, i_raw, control) actually changes.
+    """
+
+    __slots__ = ("_protocol", "_key", "msg1", "frame", "hits", "misses")
+
+    def __init__(self, protocol: ChargerProtocol) -> None:
+        self._protocol = protocol
+        self._key: tuple[int, ...] | None = None
+        self.msg1: Message1 | None = None
+        self.frame: can.Message | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(
+        self, voltage: float, current: float, ctrl: ChargerControl
+    ) -> tuple[Message1, can.Message]:
+        proto = self._protocol
+        key = proto.message1_raw(voltage, current, ctrl)
+        if key == self._key:
+            self.hits += 1
+            return self.msg1, self.frame
+        self.misses += 1
+        msg1 = proto.quantize_message1(voltage, current, ctrl)
+        self._key = key
+        self.msg1 = msg1
+        self.frame = can.Message(
+            arbitration_id=proto.msg1_id,
+            data=proto.encode_message1(msg1),
+            is_extended_id=True,
+        )
+        return msg1, self.frame
+
+
+def move_towards(current: float, target: float, max_step: float) -> float:
+    """Move *current* towards *target* by at most *max_step*."""
+    diff = target - current
+    if abs(diff) <= max_step:
+        return target
+    return current + (max_step if diff > 0 else -max_step)
+
+
+class RampState:
+    """Soft-start setpoints, advanced once per TX slot."""
+
+    __slots__ = ("voltage", "current", "_prev_control")
+
+    def __init__(self) -> None:
+        self.voltage = 0.0
+        self.current = 0.0
+        self._prev_control = ChargerControl.STOP_OUTPUTTING
+
+    def reset(self) -> None:
+        self.voltage = 0.0
+        self.current = 0.0
+
+    def observe(self, ctrl: ChargerControl) -> None:
+        """Restart the ramp on a STOP -> active mode transition."""
+        if (
+            ctrl != ChargerControl.STOP_OUTPUTTING
+            and self._prev_control == ChargerControl.STOP_OUTPUTTING
+        ):
+            self.reset()
+        self._prev_control = ctrl
+
+    def step(
+        self,
+        ctrl: ChargerControl,
+        tgt_v: float,
+        tgt_a: float,
+        enabled: bool,
+        rate_v: float,
+        rate_a: float,
+        dt: float,
+    ) -> tuple[float, float, bool]:
+        """Setpoints to send now: ``(voltage, current, ramp_active)``."""
+        if ctrl == ChargerControl.STOP_OUTPUTTING or not enabled:
+            # No ramp: send target directly
+            return tgt_v, tgt_a, False
+        self.voltage = move_towards(self.voltage, tgt_v, rate_v * dt)
+        self.current = move_towards(self.current, tgt_a, rate_a * dt)
+        # Round to 0.1 (CAN resolution)
+        send_v = round(self.voltage, 1)
+        send_a = round(self.current, 1)
+        active = send_v != round(tgt_v, 1) or send_a != round(tgt_a, 1)
+        return send_v, send_a, active
+
+
+def status_edges(
+    prev: int | None, new: int
+) -> Iterator[tuple[int, str, bool]]:
+    """``(bit_idx, name, is_fault)`` for every status bit that changed."""
+    if prev is None:
+        return
+    xor = new ^ prev
+    for bit in range(5):
+        if xor & (1 << bit):
+            yield (
+                bit,
+                STATUS_BIT_NAMES.get(bit, f"bit{bit}"),
+                bool(new & (1 << bit)),
+            )
+
+
+def install_filters(
+    bus: can.BusABC, ids: Iterable[int], publish: Publisher
+) -> FilterStats:
+    """Restrict RX to *ids* at the lowest level the backend supports
+    (SocketCAN: kernel, Kvaser/Vector: adapter).
+
+    Backends without native filtering fall back to python-can's
+    software filter; drops are counted there.
+    """
+    stats = FilterStats()
+    ids = set(ids)
+    try:
+        bus.set_filters(build_filters(ids))
+    except Exception as exc:
+        publish("log_message", f"RX filter setup failed: {exc}")
+        return stats
+
+    stats.hw_filtered = bool(getattr(bus, "_is_filtered", False))
+    if stats.hw_filtered:
+        publish(
+            "log_message",
+            f"RX filter: {len(ids)} ID(s) filtered in driver/hardware."
+        )
+        return stats
+
+    # Software filtering: count what python-can discards.  A pooled bus
+    # comes back with our wrapper installed; always wrap the original.
+    match = getattr(bus, "_obc_plain_match", None)
+    if match is None:
+        match = bus._obc_plain_match = bus._matches_filters
+
+    def counting_match(msg: can.Message) -> bool:
+        ok = match(msg)
+        if not ok:
+            stats.dropped += 1
+        return ok
+
+    bus._matches_filters = counting_match
+    publish(
+        "log_message",
+        f"RX filter: {len(ids)} ID(s) filtered in software "
+        "(backend has no native filter)."
+    )
+    return stats
+
+
+def stop_frame(protocol: ChargerProtocol) -> can.Message:
+    """Message1 with zero setpoints and Control=STOP, for safe-stop."""
+    msg1 = Message1(
+        voltage_setpoint=0,
+        current_setpoint=0,
+        control=ChargerControl.STOP_OUTPUTTING,
+    )
+    return can.Message(
+        arbitration_id=protocol.msg1_id,
+        data=protocol.encode_message1(msg1),
+        is_extended_id=True,
+    )
+
+
+def discard(kind: str, *args) -> None:
+    pass
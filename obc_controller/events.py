@@ -0,0 +1,91 @@
+"""
+Batched worker -> UI event delivery.
+
+Instead of one queued Qt signal per event, the CAN worker appends
+``(kind, args)`` tuples to an :class:`EventBuffer` and the UI drains it
+once per frame on a timer (see ``MainWindow``).  ``deque.append`` and
+``deque.popleft`` are atomic in CPython, so with one producer (the worker
+thread) and one consumer (the GUI thread) neither side takes a lock.
+
+State-like events (health, ramp, counters) are coalesced on drain: only
+the newest one of each kind in a batch is delivered.  Stream events
+(telemetry, log lines, status-bit edges) are always delivered in order.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Iterable
+
+Event = tuple[str, tuple[Any, ...]]
+
+# Kinds where only the latest value matters
+COALESCED_KINDS = frozenset({
+    "health_stats",
+    "ramp_state",
+    "tx_jitter",
+    "filter_stats",
+    "tx_cache_stats",
+    "traffic_stats",
+})
+
+DEFAULT_MAX_LATENCY_MS = 33  # ~30 Hz UI batches
+
+
+def coalesce(
+    events: list[Event], kinds: Iterable[str] = COALESCED_KINDS
+) -> list[Event]:
+    """Drop all but the last event of each *kinds* kind, keeping order."""
+    kinds = frozenset(kinds)
+    seen: set[str] = set()
+    out: list[Event] = []
+    for ev in reversed(events):
+        kind = ev[0]
+        if kind in kinds:
+            if kind in seen:
+                continue
+            seen.add(kind)
+        out.append(ev)
+    out.reverse()
+    return out
+
+
+class EventBuffer:
+    """Single-producer / single-consumer event queue.
+
+    *pushed* and *delivered* count events before and after coalescing,
+    so their ratio shows how much cross-thread traffic batching saved.
+    """
+
+    __slots__ = ("_q", "pushed", "delivered", "batches")
+
+    def __init__(self) -> None:
+        self._q: deque[Event] = deque()
+        self.pushed = 0
+        self.delivered = 0
+        self.batches = 0
+
+    def __len__(self) -> int:
+        return len(self._q)
+
+    def push(self, kind: str, *args: Any) -> None:
+        """Producer side (worker thread)."""
+        self._q.append((kind, args))
+        self.pushed += 1
+
+    def drain(self) -> list[Event]:
+        """Consumer side (UI thread): everything queued so far, coalesced."""
+        q = self._q
+        events: list[Event] = []
+        pop = q.popleft
+        for _ in range(len(q)):
+            events.append(pop())
+        if not events:
+            return events
+        events = coalesce(events)
+        self.delivered += len(events)
+        self.batches += 1
+        return events
+
+    def clear(self) -> None:
+        self._q.clear()
@@ -0,0 +1,262 @@
+"""
+Charger engine in a separate process.
+
+The child process owns the CAN bus and runs :class:`ChargerEngine`, so
+UI work (pyqtgraph rendering, Qt layout) in the parent never holds the
+GIL the TX scheduler needs.  Traffic between the two:
+
+  - Message2 telemetry: :class:`~obc_controller.telemetry_ring.TelemetryRing`
+    in shared memory (no pickling per frame)
+  - every other engine event: a ``multiprocessing`` queue (a few per
+    TX cycle: health, logs, TX echo)
+  - commands (setpoints, control, ramp, stop): a second queue, applied
+    in the child by a small listener thread
+
+:class:`ProcessEngine` mirrors the ``CANWorker`` setter API; instead of
+emitting signals its :meth:`ProcessEngine.poll` moves pending events
+into an :class:`~obc_controller.events.EventBuffer` for the UI to
+dispatch.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing as mp
+import queue
+import threading
+from typing import Iterable, Optional
+
+from obc_controller.can_protocol import ChargerControl, ChargerProtocol
+from obc_controller.events import EventBuffer
+from obc_controller.telemetry_ring import TelemetryRing
+from obc_controller.tx_jobs import TxJob
+
+log = logging.getLogger(__name__)
+
+# Engine methods the parent may invoke in the child
+_COMMANDS = frozenset({
+    "set_connection_params",
+    "set_periodic_tx",
+    "set_cycle_ms",
+    "set_auto_reconnect",
+    "set_protocol",
+    "set_monitored_ids",
+    "set_nodes",
+    "configure",
+    "set_setpoints",
+    "set_control",
+    "set_ramp_config",
+    "reset_ramp",
+    "enable_tx",
+    "request_stop",
+    "submit_job",
+    "cancel_jobs",
+})
+_RUN = "__run__"
+
+
+def _child_main(
+    cmd_q: mp.Queue, evt_q: mp.Queue, ring_name: str, capacity: int
+) -> None:
+    """Child process entry point: apply setup commands, then run the
+    engine with a listener thread for live commands."""
+    from obc_controller.bus_pool import POOL
+    from obc_controller.engine import ChargerEngine
+
+    ring = TelemetryRing(capacity, name=ring_name)
+
+    def publish(kind: str, *args) -> None:
+        if kind == "message2_received":
+            ring.push(args[0])
+        else:
+            evt_q.put((kind, args))
+
+    engine = ChargerEngine(publish)
+
+    def apply(cmd: tuple) -> bool:
+        name, args, kwargs = cmd
+        if name == _RUN:
+            return False
+        if name in _COMMANDS:
+            try:
+                getattr(engine, name)(*args, **kwargs)
+            except ValueError as exc:
+                evt_q.put(("log_message", (f"{name} failed: {exc}",)))
+        return True
+
+    # Setup phase: connection parameters, protocol, initial setpoints
+    while apply(cmd_q.get()):
+        pass
+
+    def listen() -> None:
+        while True:
+            cmd = cmd_q.get()
+            if cmd is None:
+                return
+            apply(cmd)
+
+    listener = threading.Thread(target=listen, daemon=True)
+    listener.start()
+    try:
+        engine.run()
+    finally:
+        POOL.close_all()  # the process ends; nothing to reconnect
+        ring.close()
+        evt_q.close()
+        evt_q.join_thread()
+
+
+class ProcessEngine:
+    """Parent-side handle of a charger engine running in a child process.
+
+    Setters may be called before :meth:`start` (they configure the
+    engine) or while it runs.  Call :meth:`poll` periodically from the UI
+    thread to collect events into *events*.
+    """
+
+    def __init__(self, events: EventBuffer, ring_capacity: int = 4096):
+        self._events = events
+        ctx = mp.get_context("spawn")
+        self._cmd_q = ctx.Queue()
+        self._evt_q = ctx.Queue()
+        self._ring = TelemetryRing(ring_capacity)
+        self._proc = ctx.Process(
+            target=_child_main,
+            args=(self._cmd_q, self._evt_q, self._ring.name, ring_capacity),
+            name="obc-can-engine",
+            daemon=True,
+        )
+        self._closed = False
+
+    def _send(self, name: str, *args, **kwargs) -> None:
+        if not self._closed:
+            self._cmd_q.put((name, args, kwargs))
+
+    # ---- CANWorker-compatible API -----------------------------------------
+
+    def set_connection_params(
+        self, interface: str, channel: str, bitrate: int
+    ) -> None:
+        self._send("set_connection_params", interface, channel, bitrate)
+
+    def set_periodic_tx(self, enabled: bool) -> None:
+        self._send("set_periodic_tx", enabled)
+
+    def set_cycle_ms(self, cycle_ms: int) -> None:
+        self._send("set_cycle_ms", cycle_ms)
+
+    def set_auto_reconnect(self, enabled: bool) -> None:
+        self._send("set_auto_reconnect", enabled)
+
+    def set_protocol(self, protocol: ChargerProtocol) -> None:
+        self._send("set_protocol", protocol)
+
+    def set_monitored_ids(self, ids: Iterable[int]) -> None:
+        self._send("set_monitored_ids", tuple(ids))
+
+    def set_nodes(self, addresses: Iterable[int]) -> None:
+        self._send("set_nodes", tuple(addresses))
+
+    def configure(
+        self, node: Optional[int] = None, *, reset_ramp: bool = False,
+        **changes,
+    ) -> None:
+        self._send("configure", node, reset_ramp=reset_ramp, **changes)
+
+    def set_setpoints(
+        self, voltage: float, current: float, node: Optional[int] = None
+    ) -> None:
+        self._send("set_setpoints", voltage, current, node)
+
+    def set_control(
+        self, ctrl: ChargerControl, node: Optional[int] = None
+    ) -> None:
+        self._send("set_control", ctrl, node)
+
+    def set_ramp_config(
+        self,
+        enabled: bool,
+        rate_v: float,
+        rate_a: float,
+        node: Optional[int] = None,
+    ) -> None:
+        self._send("set_ramp_config", enabled, rate_v, rate_a, node)
+
+    def reset_ramp(self, node: Optional[int] = None) -> None:
+        self._send("reset_ramp", node)
+
+    def enable_tx(self, enabled: bool) -> None:
+        self._send("enable_tx", enabled)
+
+    def start(self) -> None:
+        self._send(_RUN)
+        self._proc.start()
+
+    def request_stop(self) -> None:
+        self._send("request_stop")
+
+    def submit_job(self, job: TxJob) -> None:
+        self._send("submit_job", job)
+
+    def cancel_jobs(self) -> None:
+        self._send("cancel_jobs")
+
+    def wait(self, timeout_ms: int = 10000) -> bool:
+        """Join the child, collect its last events and free the ring.
+
+        Returns False if the child had to be terminated (the UI then
+        gets ``error`` + ``disconnected`` from :meth:`poll`).
+        """
+        self._proc.join(timeout_ms / 1000.0)
+        ok = not self._proc.is_alive()
+        if not ok:
+            log.warning("CAN engine process did not exit; terminating")
+            self._proc.terminate()
+            self._proc.join(1.0)
+        self.poll()
+        self.close()
+        return ok
+
+    def is_alive(self) -> bool:
+        """True while the child process runs."""
+        return not self._closed and self._proc.is_alive()
+
+    def is_bus_connected(self) -> bool:
+        """The bus lives in the child process and is not shared."""
+        return False
+
+    # ---- event transfer ---------------------------------------------------
+
+    @property
+    def ring_overruns(self) -> int:
+        return self._ring.overruns if not self._closed else 0
+
+    def poll(self) -> None:
+        """Move pending telemetry and events into the event buffer."""
+        if self._closed:
+            return
+        push = self._events.push
+        for msg in self._ring.read_messages():
+            push("message2_received", msg)
+        get = self._evt_q.get_nowait
+        while True:
+            try:
+                kind, args = get()
+            except queue.Empty:
+                break
+            push(kind, *args)
+        code = self._proc.exitcode
+        if code not in (None, 0):
+            # Crashed without reporting; tell the UI it is gone.
+            push("error", f"CAN engine process exited (code {code})")
+            push("disconnected")
+            self.close()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._cmd_q.put(None)  # release the child's listener, if alive
+        self._cmd_q.close()
+        self._evt_q.close()
+        self._ring.close()
@@ -12,9 +12,9 @@ import json
 import logging
 import os
 import platform
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 log = logging.getLogger(__name__)
 
@@ -28,6 +28,9 @@ class Profile:
     ramp_enabled: bool = False
     ramp_rate_v_per_s: float = 5.0
     ramp_rate_a_per_s: float = 0.5
+    # Charge curve segments (see obc_controller.charge_curve); empty =
+    # fixed setpoints
+    curve: List[Dict[str, Any]] = field(default_factory=list)
 
 
 def _config_dir() -> Path:
@@ -0,0 +1,133 @@
+"""
+Closed-loop trim of the Message1 setpoints.
+
+The OBC regulates its output itself but often settles a little off the
+commanded value (e.g. 9.6 A for 10 A).  In closed-loop mode the engine
+compares every Message2 reading with the target and adds a PI trim to
+the setpoints of the following Message1 frames, so the measured output
+converges on the target instead of being corrected by hand.
+
+A charger is either current-limited (CC) or voltage-limited (CV), so
+only one loop is in control at a time: the one whose measured value is
+relatively closer to its target.  The other loop holds its integrator
+and drops its proportional term -- otherwise, in CV, the current loop
+would see a large error and push the current command up.
+
+Anti-windup: the trim is clamped to ``max_trim`` x target, and the
+integrator stops integrating while the output is saturated in the
+direction of the error (conditional integration).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+# Gap between two readings beyond which the integrator is not advanced
+# (first reading, RX timeout, ramp in between)
+MAX_DT_S = 2.0
+
+
+@dataclass(frozen=True)
+class RegulatorConfig:
+    """PI gains, shared by the voltage and the current loop.
+
+    The trim has the unit of the error (V or A), so the gains are
+    dimensionless (*kp*) and per second (*ki*).
+    """
+
+    kp: float = 0.3
+    ki: float = 0.6          # 1/s
+    max_trim: float = 0.05   # |trim| <= max_trim * target
+
+
+class PIRegulator:
+    """Discrete PI controller with clamping anti-windup."""
+
+    __slots__ = ("integral",)
+
+    def __init__(self) -> None:
+        self.integral = 0.0
+
+    def reset(self) -> None:
+        self.integral = 0.0
+
+    def update(
+        self,
+        cfg: RegulatorConfig,
+        error: float,
+        dt: float,
+        limit: float,
+        hold: bool = False,
+    ) -> float:
+        """Correction for *error*, clamped to +-*limit*.
+
+        With *hold* the loop is not in control: the integrator is frozen
+        and only its (clamped) value is returned.
+        """
+        if limit <= 0.0:
+            self.integral = 0.0
+            return 0.0
+        if hold:
+            self.integral = min(max(self.integral, -limit), limit)
+            return self.integral
+        p = cfg.kp * error
+        integral = self.integral + cfg.ki * error * dt
+        out = p + integral
+        # Integrate only while that does not drive the output further
+        # into saturation
+        if -limit <= out <= limit or (out > 0.0) != (error > 0.0):
+            self.integral = min(max(integral, -limit), limit)
+        return min(max(p + self.integral, -limit), limit)
+
+
+class SetpointRegulator:
+    """Voltage and current loop of one charger, fed with Message2
+    readings; :attr:`trim_v` / :attr:`trim_a` are added to the next
+    Message1 setpoints."""
+
+    __slots__ = ("voltage", "current", "trim_v", "trim_a", "_last")
+
+    def __init__(self) -> None:
+        self.voltage = PIRegulator()
+        self.current = PIRegulator()
+        self.trim_v = 0.0
+        self.trim_a = 0.0
+        self._last = 0.0
+
+    def reset(self) -> None:
+        self.voltage.reset()
+        self.current.reset()
+        self.trim_v = 0.0
+        self.trim_a = 0.0
+        self._last = 0.0
+
+    def update(
+        self,
+        cfg: RegulatorConfig,
+        tgt_v: float,
+        tgt_a: float,
+        meas_v: float,
+        meas_a: float,
+        now: float,
+        hold: bool = False,
+    ) -> None:
+        """Advance both loops with a reading taken at *now*.
+
+        *hold* freezes both integrators (ramp running, fault bits set).
+        """
+        dt = now - self._last if self._last else 0.0
+        self._last = now
+        if not 0.0 < dt <= MAX_DT_S:
+            dt = 0.0
+        err_v = tgt_v - meas_v
+        err_a = tgt_a - meas_a
+        # The limiting loop is the one relatively closer to its target
+        rel_v = err_v / tgt_v if tgt_v > 0.0 else float("inf")
+        rel_a = err_a / tgt_a if tgt_a > 0.0 else float("inf")
+        cv = rel_v <= rel_a
+        self.trim_v = self.voltage.update(
+            cfg, err_v, dt, cfg.max_trim * tgt_v, hold or not cv
+        )
+        self.trim_a = self.current.update(
+            cfg, err_a, dt, cfg.max_trim * tgt_a, hold or cv
+        )
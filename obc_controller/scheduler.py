@@ -0,0 +1,117 @@
+"""
+Drift-free deadline scheduler for the periodic Message1 TX.
+
+TX deadlines are computed from a fixed epoch (``epoch + n * period``)
+instead of "last send + period", so small delays never accumulate into
+a drifting schedule.  The worker blocks in ``bus.recv`` until the next
+deadline and reports the achieved jitter (actual send time minus the
+scheduled deadline).
+
+When the sender slips by more than a period (GC pause, slow driver
+call) the overdue slots are still sent, back-to-back, so the long-run
+average period stays exact.  Only slots older than *catchup_s* are
+given up -- after a long stall a burst of stale frames would just flood
+the bus -- and counted in :attr:`TxScheduler.missed`.
+"""
+
+from __future__ import annotations
+
+import math
+
+# Overdue slots are caught up for this long; older ones are skipped
+CATCHUP_S = 0.1
+
+
+class TxScheduler:
+    """Fixed-epoch periodic deadline generator with jitter statistics."""
+
+    def __init__(self, period_s: float, catchup_s: float = CATCHUP_S):
+        if period_s <= 0:
+            raise ValueError(f"TX period must be positive, got {period_s}")
+        self._period = period_s
+        # At least the one slot that is due right now
+        self._catchup = max(1, int(catchup_s / period_s))
+        self._epoch: float | None = None
+        self._n = 0
+
+        # Jitter statistics (seconds)
+        self._count = 0
+        self._sum_abs = 0.0
+        self._max_abs = 0.0
+        self._last = 0.0
+        self.missed = 0  # deadlines skipped after a long stall
+
+    # ---- state -------------------------------------------------------------
+
+    @property
+    def period(self) -> float:
+        return self._period
+
+    @property
+    def active(self) -> bool:
+        return self._epoch is not None
+
+    @property
+    def next_deadline(self) -> float:
+        """Absolute monotonic time of the next TX slot."""
+        if self._epoch is None:
+            return math.inf
+        return self._epoch + self._n * self._period
+
+    def start(self, now: float) -> None:
+        """Anchor the schedule at *now*; the first slot is due immediately."""
+        self._epoch = now
+        self._n = 0
+        self.reset_stats()
+
+    def stop(self) -> None:
+        self._epoch = None
+        self._n = 0
+
+    # ---- scheduling --------------------------------------------------------
+
+    def due(self, now: float) -> bool:
+        return now >= self.next_deadline
+
+    def time_until(self, now: float) -> float:
+        """Seconds until the next slot (0 if already due)."""
+        return max(0.0, self.next_deadline - now)
+
+    def mark_sent(self, now: float) -> None:
+        """Record a transmission for the current slot and advance."""
+        if self._epoch is None:
+            return
+        jitter = now - self.next_deadline
+        self._last = jitter
+        self._count += 1
+        self._sum_abs += abs(jitter)
+        if abs(jitter) > self._max_abs:
+            self._max_abs = abs(jitter)
+
+        self._n += 1
+        # Behind schedule: the overdue slots stay due (caught up on the
+        # next calls), except those beyond the catch-up window.
+        if now >= self.next_deadline:
+            n_now = int((now - self._epoch) // self._period) + 1
+            oldest = n_now - self._catchup
+            if self._n < oldest:
+                self.missed += oldest - self._n
+                self._n = oldest
+
+    # ---- statistics --------------------------------------------------------
+
+    def reset_stats(self) -> None:
+        self._count = 0
+        self._sum_abs = 0.0
+        self._max_abs = 0.0
+        self._last = 0.0
+        self.missed = 0
+
+    def jitter_ms(self) -> tuple[float, float]:
+        """Return (mean |jitter|, max |jitter|) in milliseconds."""
+        if self._count == 0:
+            return 0.0, 0.0
+        return (
+            self._sum_abs / self._count * 1000.0,
+            self._max_abs * 1000.0,
+        )
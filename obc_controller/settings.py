@@ -9,7 +9,10 @@ import json
 import logging
 from pathlib import Path
 
+from obc_controller.can_protocol import ChargerProtocol
 from obc_controller.profiles import _config_dir
+from obc_controller.regulator import RegulatorConfig
+from obc_controller.signal_db import load_signal_db
 
 log = logging.getLogger(__name__)
 
@@ -37,3 +40,72 @@ def save_setting(key: str, value: object) -> None:
     path = _settings_path()
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(json.dumps(settings, indent=2), encoding="utf-8")
+
+
+def _int_list_setting(key: str) -> list[int]:
+    """Integer list setting; entries may be ints or hex strings."""
+    values: list[int] = []
+    for entry in load_settings().get(key, []):
+        try:
+            values.append(
+                int(entry, 0) if isinstance(entry, str) else int(entry)
+            )
+        except (TypeError, ValueError):
+            continue
+    return values
+
+
+def monitored_ids_setting() -> list[int]:
+    """Extra RX IDs from settings.json ``"monitored_ids"``.
+
+    Entries may be ints or hex strings such as ``"0x18FF51E5"``.
+    """
+    return _int_list_setting("monitored_ids")
+
+
+def charger_addresses_setting() -> list[int]:
+    """J1939 source addresses from settings.json ``"charger_addresses"``
+    (e.g. ``["0xE5", "0xE6"]``); empty means the protocol's single
+    charger."""
+    return _int_list_setting("charger_addresses")
+
+
+def regulator_setting() -> RegulatorConfig:
+    """Closed-loop gains from settings.json ``"regulator"``, e.g.
+    ``{"kp": 0.3, "ki": 0.6, "max_trim": 0.05}``; missing or invalid
+    keys keep their defaults."""
+    entry = load_settings().get("regulator")
+    if not isinstance(entry, dict):
+        return RegulatorConfig()
+    values: dict[str, float] = {}
+    for key in ("kp", "ki", "max_trim"):
+        try:
+            value = float(entry[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if value >= 0.0:
+            values[key] = value
+    return RegulatorConfig(**values)
+
+
+def protocol_from_setting(entry) -> ChargerProtocol:
+    """Build the charger protocol from settings.json ``"signal_db"``.
+
+    The entry is either a path (JSON table or ``.dbc``) or a dict with
+    ``"path"`` plus optional ``"message1"`` / ``"message2"`` (name or
+    ``"0x..."`` ID) and ``"signals"`` (field -> DBC signal name).
+    """
+    if isinstance(entry, str):
+        entry = {"path": entry}
+    messages = {}
+    for key in ("message1", "message2"):
+        value = entry.get(key)
+        if isinstance(value, str) and value.lower().startswith("0x"):
+            value = int(value, 16)
+        if value is not None:
+            messages[key] = value
+    return ChargerProtocol(
+        load_signal_db(entry["path"]),
+        signal_map=entry.get("signals"),
+        **messages,
+    )
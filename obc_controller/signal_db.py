@@ -0,0 +1,560 @@
+"""
+Declarative CAN signal database with compiled codecs.
+
+A database is a list of messages, each with a list of signals described the
+way a DBC file does it:
+
+  - ``start_bit``  DBC bit numbering (``byte * 8 + bit``): the LSB for
+                   little-endian (Intel) signals, the MSB for big-endian
+                   (Motorola) signals
+  - ``length``     bits
+  - ``factor``, ``offset``  physical = raw * factor + offset
+  - ``byte_order`` ``"big_endian"`` or ``"little_endian"``
+  - ``signed``     two's complement raw value
+
+At load time every message is compiled into plain Python functions (source
+generated once, then ``exec``'d).  Byte-aligned layouts compile down to a
+single precompiled ``struct.Struct``; anything else uses one
+``int.from_bytes`` and shift/mask per signal.  Scaling by ``0.1``-style
+factors is emitted as a division by the integer reciprocal so the results
+are bit-identical to hand-written ``raw / 10.0`` code.
+
+The database can be built from a Python dict or a JSON file::
+
+    {
+      "messages": [
+        {"name": "Message2", "frame_id": "0x18FF50E5", "length": 8,
+         "signals": [
+           {"name": "output_voltage", "start_bit": 7, "length": 16,
+            "factor": 0.1, "unit": "V"},
+           ...
+         ]}
+      ]
+    }
+
+DBC files are read and written by :mod:`obc_controller.dbc`.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Sequence
+
+BIG_ENDIAN = "big_endian"
+LITTLE_ENDIAN = "little_endian"
+
+_STRUCT_CODES = {8: "b", 16: "h", 32: "i", 64: "q"}
+
+
+@dataclass(frozen=True)
+class SignalDef:
+    name: str
+    start_bit: int
+    length: int
+    factor: float = 1.0
+    offset: float = 0.0
+    byte_order: str = BIG_ENDIAN
+    signed: bool = False
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    unit: str = ""
+
+    @property
+    def raw_min(self) -> int:
+        return -(1 << (self.length - 1)) if self.signed else 0
+
+    @property
+    def raw_max(self) -> int:
+        if self.signed:
+            return (1 << (self.length - 1)) - 1
+        return (1 << self.length) - 1
+
+    def bit_shift(self, frame_bytes: int) -> int:
+        """Shift of this signal's LSB inside ``int.from_bytes(data, order)``
+        where *order* is the signal's byte order."""
+        if self.byte_order == LITTLE_ENDIAN:
+            shift = self.start_bit
+            end = shift + self.length
+        else:
+            msb_index = (self.start_bit // 8) * 8 + (7 - self.start_bit % 8)
+            end = msb_index + self.length
+            shift = frame_bytes * 8 - end
+        if shift < 0 or end > frame_bytes * 8:
+            raise ValueError(
+                f"Signal {self.name!r} does not fit in {frame_bytes} bytes"
+            )
+        return shift
+
+    def byte_offset(self) -> Optional[int]:
+        """Byte offset if the signal is a whole 8/16/32/64-bit field."""
+        if self.length not in _STRUCT_CODES:
+            return None
+        # Whole-byte fields start at bit 0 (Intel) or bit 7 (Motorola)
+        want = 0 if self.byte_order == LITTLE_ENDIAN else 7
+        if self.start_bit % 8 != want:
+            return None
+        return self.start_bit // 8
+
+
+@dataclass(frozen=True)
+class MessageDef:
+    name: str
+    frame_id: int
+    length: int = 8
+    signals: tuple[SignalDef, ...] = ()
+    is_extended: bool = True
+    cycle_ms: Optional[int] = None
+    senders: tuple[str, ...] = ()
+    comment: str = ""
+
+    def signal_names(self) -> tuple[str, ...]:
+        return tuple(s.name for s in self.signals)
+
+
+# ---------------------------------------------------------------------------
+# Code generation
+# ---------------------------------------------------------------------------
+def _num(value: float) -> str:
+    """Literal for *value*; integral values become int literals."""
+    if float(value).is_integer():
+        return repr(int(value))
+    return repr(float(value))
+
+
+def _reciprocal(factor: float) -> Optional[int]:
+    inv = 1.0 / factor
+    if abs(inv - round(inv)) < 1e-9 and round(inv) > 1:
+        return int(round(inv))
+    return None
+
+
+def _phys_expr(var: str, sig: SignalDef) -> str:
+    f, o = sig.factor, sig.offset
+    if f == 1:
+        expr = var
+    elif _reciprocal(f) is not None:
+        expr = f"{var} / {float(_reciprocal(f))!r}"
+    else:
+        expr = f"{var} * {f!r}"
+    if f != 1 and o:
+        o_lit = repr(float(o))
+    else:
+        o_lit = _num(o)
+    if o > 0:
+        expr = f"{expr} + {o_lit}"
+    elif o < 0:
+        expr = f"{expr} - {o_lit.lstrip('-')}"
+    return expr
+
+
+def _raw_expr(var: str, sig: SignalDef) -> str:
+    f, o = sig.factor, sig.offset
+    x = var
+    if o > 0:
+        x = f"{var} - {_num(o)}"
+    elif o < 0:
+        x = f"{var} + {_num(-o)}"
+    if f == 1:
+        return f"int(round({x}))"
+    if o:
+        x = f"({x})"
+    if _reciprocal(f) is not None:
+        return f"int(round({x} * {_reciprocal(f)}))"
+    return f"int(round({x} / {f!r}))"
+
+
+def _clamp_lines(var: str, sig: SignalDef) -> list[str]:
+    lo, hi = sig.raw_min, sig.raw_max
+    return [
+        f"    {var} = {lo} if {var} < {lo} else "
+        f"{hi} if {var} > {hi} else {var}"
+    ]
+
+
+class MessageCodec:
+    """Compiled encoder / decoder for one :class:`MessageDef`."""
+
+    def __init__(self, message: MessageDef):
+        self.message = message
+        self.names = message.signal_names()
+        self._struct_plan = self._plan_struct()
+        if self._struct_plan is None:
+            # Validate geometry once for the generic path
+            for sig in message.signals:
+                sig.bit_shift(message.length)
+        self.min_length = self._min_length()
+
+        self.decode_values: Callable[[bytes], tuple] = self.make_decoder(
+            factory=False
+        )
+        self.encode_values: Callable[..., bytes] = self.make_encoder()
+        self.raw_values: Callable[..., tuple] = self.make_encoder(pack=False)
+
+    # ---- layout planning ---------------------------------------------------
+
+    def _plan_struct(self) -> Optional[tuple[str, list[int]]]:
+        """Return (format, signal indices in field order) if every signal
+        is a byte-aligned 8/16/32/64-bit field with a common byte order."""
+        orders = {
+            s.byte_order for s in self.message.signals if s.length > 8
+        }
+        if len(orders) > 1 or not self.message.signals:
+            return None
+        fields = []
+        for idx, sig in enumerate(self.message.signals):
+            off = sig.byte_offset()
+            if off is None:
+                return None
+            fields.append((off, sig.length // 8, idx))
+        fields.sort()
+        fmt = ">" if orders != {LITTLE_ENDIAN} else "<"
+        pos = 0
+        order = []
+        for off, size, idx in fields:
+            if off < pos:
+                return None  # overlapping signals
+            if off > pos:
+                fmt += f"{off - pos}x"
+            sig = self.message.signals[idx]
+            code = _STRUCT_CODES[sig.length]
+            fmt += code if sig.signed else code.upper()
+            pos = off + size
+            order.append(idx)
+        if pos > self.message.length:
+            return None
+        return fmt, order
+
+    def _min_length(self) -> int:
+        if self._struct_plan is not None:
+            return struct.calcsize(self._struct_plan[0])
+        return self.message.length
+
+    # ---- generated functions -----------------------------------------------
+
+    def make_decoder(
+        self,
+        factory: bool = True,
+        transforms: Optional[Mapping[str, Any]] = None,
+        signals: Optional[Sequence[str]] = None,
+    ) -> Callable:
+        """Generate a decoder.
+
+        With ``factory=True`` the function is ``decode(factory, data)`` and
+        returns ``factory(*values)`` (so it can be used directly as a
+        ``classmethod``); otherwise ``decode(data)`` returns a tuple.
+        *transforms* maps signal names to a lookup table (indexed) or a
+        callable applied to the physical value.  *signals* selects and
+        orders the returned values (default: all, in signal order).
+        """
+        msg = self.message
+        selected = self._indices(signals)
+        transforms = dict(transforms or {})
+        env: Dict[str, Any] = {}
+        args = "factory, data" if factory else "data"
+        lines = [
+            f"def decode({args}):",
+            f"    if len(data) < {self.min_length}:",
+            f"        raise ValueError(f\"{msg.name} requires >= "
+            f"{self.min_length} bytes, got {{len(data)}}\")",
+        ]
+        n = len(msg.signals)
+        if self._struct_plan is not None:
+            fmt, order = self._struct_plan
+            env["_unpack"] = struct.Struct(fmt).unpack_from
+            targets = ", ".join(f"a{i}" for i in order)
+            lines.append(f"    {targets}{',' if n == 1 else ''} = "
+                         f"_unpack(data, 0)")
+        else:
+            orders = {s.byte_order for s in msg.signals}
+            if BIG_ENDIAN in orders:
+                lines.append(
+                    f"    rb = int.from_bytes(data[:{msg.length}], 'big')"
+                )
+            if LITTLE_ENDIAN in orders:
+                lines.append(
+                    f"    rl = int.from_bytes(data[:{msg.length}], 'little')"
+                )
+            for i, sig in enumerate(msg.signals):
+                src = "rl" if sig.byte_order == LITTLE_ENDIAN else "rb"
+                shift = sig.bit_shift(msg.length)
+                mask = (1 << sig.length) - 1
+                shifted = f"({src} >> {shift})" if shift else src
+                lines.append(f"    a{i} = {shifted} & {mask:#x}")
+                if sig.signed:
+                    lines.append(
+                        f"    if a{i} & {1 << (sig.length - 1):#x}: "
+                        f"a{i} -= {1 << sig.length:#x}"
+                    )
+        values = []
+        for i in selected:
+            sig = msg.signals[i]
+            expr = _phys_expr(f"a{i}", sig)
+            t = transforms.pop(sig.name, None)
+            if t is not None:
+                env[f"_t{i}"] = t
+                if isinstance(t, Sequence):
+                    expr = f"_t{i}[{expr}]"
+                else:
+                    expr = f"_t{i}({expr})"
+            values.append(expr)
+        if transforms:
+            raise KeyError(f"Unknown signal(s): {sorted(transforms)}")
+        if factory:
+            lines.append(f"    return factory({', '.join(values)})")
+        else:
+            comma = "," if len(values) == 1 else ""
+            lines.append(f"    return ({', '.join(values)}{comma})")
+        fn = self._compile(lines, env, "decode")
+        fn.__doc__ = f"Decode a {msg.name} payload (compiled)."
+        return fn
+
+    def make_encoder(
+        self,
+        attrs: Optional[Sequence[str]] = None,
+        transforms: Optional[Mapping[str, Callable]] = None,
+        pack: bool = True,
+        signals: Optional[Sequence[str]] = None,
+    ) -> Callable:
+        """Generate an encoder.
+
+        Without *attrs* the function is ``encode(v0, v1, ...)`` taking the
+        physical values in *signals* order (default: all signals, in
+        signal order); signals not listed encode as raw 0.  With *attrs*
+        it is ``encode(obj)`` reading ``obj.<attr>`` for each of
+        *signals*, so it can be used directly as a method.  *transforms*
+        maps signal names to a callable that returns the signal's raw
+        integer directly (no scaling or clamping; it must fit the field).
+        With ``pack=False`` the clamped raw integers of *signals* are
+        returned as a tuple instead of bytes.
+        """
+        msg = self.message
+        selected = self._indices(signals)
+        transforms = dict(transforms or {})
+        env: Dict[str, Any] = {}
+        if attrs is not None:
+            if len(attrs) != len(selected):
+                raise ValueError(
+                    f"{msg.name}: expected {len(selected)} attribute names"
+                )
+            lines = ["def encode(obj):"]
+            for i, attr in zip(selected, attrs):
+                lines.append(f"    v{i} = obj.{attr}")
+        else:
+            params = ", ".join(f"v{i}" for i in selected)
+            lines = [f"def encode({params}):"]
+        for i, sig in enumerate(msg.signals):
+            t = transforms.pop(sig.name, None)
+            if i not in selected:
+                lines.append(f"    r{i} = 0")
+                continue
+            if t is not None:
+                env[f"_t{i}"] = t
+                lines.append(f"    r{i} = _t{i}(v{i})")
+                continue
+            lines.append(f"    r{i} = {_raw_expr(f'v{i}', sig)}")
+            lines += _clamp_lines(f"r{i}", sig)
+        if transforms:
+            raise KeyError(f"Unknown signal(s): {sorted(transforms)}")
+
+        if not pack:
+            raws = ", ".join(f"r{i}" for i in selected)
+            comma = "," if len(selected) == 1 else ""
+            lines.append(f"    return ({raws}{comma})")
+        elif self._struct_plan is not None:
+            fmt, order = self._struct_plan
+            pad = msg.length - struct.calcsize(fmt)
+            if pad:
+                fmt += f"{pad}x"
+            env["_pack"] = struct.Struct(fmt).pack
+            lines.append(
+                f"    return _pack({', '.join(f'r{i}' for i in order)})"
+            )
+        else:
+            big = []
+            little = []
+            for i, sig in enumerate(msg.signals):
+                shift = sig.bit_shift(msg.length)
+                mask = (1 << sig.length) - 1
+                term = f"(r{i} & {mask:#x})"
+                if shift:
+                    term = f"({term} << {shift})"
+                (little if sig.byte_order == LITTLE_ENDIAN else big).append(
+                    term
+                )
+            length = msg.length
+            if little:
+                lines.append(f"    rl = {' | '.join(little)}")
+                lines.append(
+                    "    rb = int.from_bytes("
+                    f"rl.to_bytes({length}, 'little'), 'big')"
+                )
+                if big:
+                    lines.append(f"    rb |= {' | '.join(big)}")
+            else:
+                lines.append(f"    rb = {' | '.join(big)}")
+            lines.append(f"    return rb.to_bytes({length}, 'big')")
+
+        fn = self._compile(lines, env, "encode")
+        fn.__doc__ = f"Encode a {msg.name} payload (compiled)."
+        return fn
+
+    def _indices(self, signals: Optional[Sequence[str]]) -> list[int]:
+        if signals is None:
+            return list(range(len(self.names)))
+        index = {name: i for i, name in enumerate(self.names)}
+        missing = [name for name in signals if name not in index]
+        if missing:
+            raise KeyError(f"{self.message.name}: unknown signal(s) {missing}")
+        return [index[name] for name in signals]
+
+    @staticmethod
+    def _compile(lines: list[str], env: Dict[str, Any], name: str):
+        source = "\n".join(lines) + "\n"
+        exec(compile(source, f"<signal_db {name}>", "exec"), env)
+        fn = env[name]
+        fn.__source__ = source
+        return fn
+
+    # ---- convenience (dict based, not for hot paths) -----------------------
+
+    def decode(self, data: bytes) -> Dict[str, float]:
+        """Decode *data* into a ``{signal_name: physical_value}`` dict."""
+        return dict(zip(self.names, self.decode_values(data)))
+
+    def encode(self, values: Mapping[str, float]) -> bytes:
+        """Encode a ``{signal_name: physical_value}`` mapping (missing
+        signals encode as 0)."""
+        return self.encode_values(*(values.get(n, 0) for n in self.names))
+
+
+# ---------------------------------------------------------------------------
+# Database
+# ---------------------------------------------------------------------------
+class SignalDatabase:
+    """Messages indexed by frame ID and name; codecs are compiled lazily
+    on first use, so loading a large database stays cheap."""
+
+    def __init__(self, messages: Iterable[MessageDef] = (), name: str = ""):
+        self.name = name
+        self._by_id: Dict[int, MessageDef] = {}
+        self._by_name: Dict[str, MessageDef] = {}
+        self._codecs: Dict[int, MessageCodec] = {}
+        for msg in messages:
+            self.add_message(msg)
+
+    def __reduce__(self):
+        # Compiled codecs cannot be pickled; rebuild from the table (used
+        # to hand a variant to the process engine).
+        return (SignalDatabase.from_dict, (self.to_dict(),))
+
+    def add_message(self, msg: MessageDef) -> None:
+        self._by_id[msg.frame_id] = msg
+        self._by_name[msg.name] = msg
+        self._codecs.pop(msg.frame_id, None)
+
+    @property
+    def messages(self) -> list[MessageDef]:
+        return list(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, frame_id: int) -> bool:
+        return frame_id in self._by_id
+
+    def get_message(self, key: int | str) -> MessageDef:
+        if isinstance(key, str):
+            return self._by_name[key]
+        return self._by_id[key]
+
+    def codec(self, key: int | str) -> MessageCodec:
+        """Return the compiled codec for a frame ID or message name."""
+        frame_id = self.get_message(key).frame_id
+        codec = self._codecs.get(frame_id)
+        if codec is None:
+            codec = MessageCodec(self._by_id[frame_id])
+            self._codecs[frame_id] = codec
+        return codec
+
+    def decode(self, frame_id: int, data: bytes) -> Dict[str, float]:
+        return self.codec(frame_id).decode(data)
+
+    # ---- dict / JSON -------------------------------------------------------
+
+    @classmethod
+    def from_dict(cls, spec: Mapping[str, Any]) -> "SignalDatabase":
+        messages = []
+        for m in spec.get("messages", []):
+            frame_id = m["frame_id"]
+            if isinstance(frame_id, str):
+                frame_id = int(frame_id, 0)
+            order = m.get("byte_order", BIG_ENDIAN)
+            signals = tuple(
+                SignalDef(**{"byte_order": order, **s})
+                for s in m.get("signals", [])
+            )
+            messages.append(
+                MessageDef(
+                    name=m["name"],
+                    frame_id=frame_id,
+                    length=m.get("length", 8),
+                    signals=signals,
+                    is_extended=m.get("extended", frame_id > 0x7FF),
+                    cycle_ms=m.get("cycle_ms"),
+                    senders=tuple(m.get("senders", ())),
+                    comment=m.get("comment", ""),
+                )
+            )
+        return cls(messages, name=spec.get("name", ""))
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"name": self.name, "messages": []}
+        for msg in self._by_id.values():
+            sigs = []
+            for s in msg.signals:
+                d = {"name": s.name, "start_bit": s.start_bit,
+                     "length": s.length, "byte_order": s.byte_order}
+                for key, default in (("factor", 1.0), ("offset", 0.0),
+                                     ("signed", False), ("minimum", None),
+                                     ("maximum", None), ("unit", "")):
+                    value = getattr(s, key)
+                    if value != default:
+                        d[key] = value
+                sigs.append(d)
+            m: Dict[str, Any] = {
+                "name": msg.name,
+                "frame_id": f"0x{msg.frame_id:X}",
+                "length": msg.length,
+                "extended": msg.is_extended,
+                "signals": sigs,
+            }
+            if msg.cycle_ms is not None:
+                m["cycle_ms"] = msg.cycle_ms
+            if msg.senders:
+                m["senders"] = list(msg.senders)
+            if msg.comment:
+                m["comment"] = msg.comment
+            out["messages"].append(m)
+        return out
+
+
+def load_signal_db(path: str | Path) -> SignalDatabase:
+    """Load a JSON signal table (see module docstring for the format) or,
+    for a ``.dbc`` suffix, a DBC file via :mod:`obc_controller.dbc`."""
+    if Path(path).suffix.lower() == ".dbc":
+        from obc_controller.dbc import load_dbc
+
+        return load_dbc(path)
+    spec = json.loads(Path(path).read_text(encoding="utf-8"))
+    db = SignalDatabase.from_dict(spec)
+    if not db.name:
+        db.name = Path(path).stem
+    return db
+
+
+def save_signal_db(db: SignalDatabase, path: str | Path) -> None:
+    Path(path).write_text(json.dumps(db.to_dict(), indent=2),
+                          encoding="utf-8")
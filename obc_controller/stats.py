@@ -0,0 +1,345 @@
+"""
+Constant-time frame rate and inter-arrival statistics.
+
+  - :class:`RateMeter`      sliding-window rate from a ring of time buckets
+  - :class:`LogHistogram`   fixed log-spaced buckets for percentiles
+  - :class:`TrafficMeter`   rate + inter-arrival min / max / p99 of one flow
+  - :class:`TrafficStats`   one :class:`TrafficMeter` per arbitration ID
+  - :class:`HealthStats`    worker timing snapshot (TX period, RX
+    inter-arrival and queueing delay percentiles) published to the UI
+
+Recording a frame is O(1) and allocation-free regardless of the frame
+rate, so the same meters work for the 2 Hz Message1/Message2 cycle and
+for kHz bus traffic.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Mapping
+
+
+class RateMeter:
+    """Events per second over a sliding window.
+
+    The window is split into *buckets* slots indexed by absolute time, so
+    adding an event only increments one counter; stale slots are cleared
+    lazily as time advances.  The rate is exact to one bucket width.
+    """
+
+    __slots__ = ("_width", "_n", "_counts", "_head")
+
+    def __init__(self, window_s: float = 2.0, buckets: int = 20):
+        self._width = window_s / buckets
+        self._n = buckets
+        self._counts = [0] * buckets
+        self._head: int | None = None  # absolute index of newest bucket
+
+    def reset(self) -> None:
+        self._counts = [0] * self._n
+        self._head = None
+
+    def _advance(self, idx: int) -> None:
+        head = self._head
+        if head is None or idx - head >= self._n:
+            self._counts = [0] * self._n
+        else:
+            counts = self._counts
+            n = self._n
+            for k in range(head + 1, idx + 1):
+                counts[k % n] = 0
+        self._head = idx
+
+    def add(self, now: float, count: int = 1) -> None:
+        idx = int(now / self._width)
+        head = self._head
+        if head is None or idx > head:
+            self._advance(idx)
+        elif idx <= head - self._n:
+            return  # older than the window
+        self._counts[idx % self._n] += count
+
+    def rate(self, now: float) -> float:
+        """Events per second in the window ending at *now*."""
+        if self._head is None:
+            return 0.0
+        idx = int(now / self._width)
+        if idx > self._head:
+            self._advance(idx)
+        span = (self._n - 1) * self._width + (now - idx * self._width)
+        return sum(self._counts) / span
+
+
+# Bucket density for the TX period / RX interval / latency histograms:
+# ~1.2 % wide buckets (about 6 ms at the 500 ms cycle).
+TIMING_PER_DECADE = 200
+
+# Percentiles / JSON export of the timing histograms are recomputed at
+# most this often; the health stats in between reuse them
+TIMING_REFRESH_S = 1.0
+
+
+class LogHistogram:
+    """Counts of positive values in log-spaced buckets.
+
+    Buckets cover *lo* .. *hi* with *per_decade* buckets per factor of 10
+    (50 per decade gives ~5 % bucket width); values outside are clamped
+    into the first / last bucket.  Min and max are tracked exactly.
+    """
+
+    __slots__ = ("_lo", "_scale", "_counts", "count", "total", "min", "max")
+
+    def __init__(
+        self, lo: float = 1e-6, hi: float = 1e3, per_decade: int = 50
+    ):
+        self._lo = lo
+        self._scale = per_decade
+        n = int(math.ceil(math.log10(hi / lo) * per_decade)) + 1
+        self._counts = array("Q", bytes(8 * n))
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def reset(self) -> None:
+        self._counts = array("Q", bytes(8 * len(self._counts)))
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        if value > self._lo:
+            idx = int(math.log10(value / self._lo) * self._scale) + 1
+            if idx >= len(self._counts):
+                idx = len(self._counts) - 1
+        else:
+            idx = 0
+        self._counts[idx] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def _edge(self, idx: int) -> float:
+        return self._lo * 10.0 ** (idx / self._scale)
+
+    def percentiles(self, qs: Iterable[float]) -> list[float]:
+        """Upper edges of the buckets holding the *qs* percentiles (0..100,
+        ascending), clamped to the observed min / max; one pass."""
+        qs = list(qs)
+        if self.count == 0:
+            return [0.0] * len(qs)
+        ranks = [max(1, int(math.ceil(self.count * q / 100.0))) for q in qs]
+        out: list[float] = []
+        seen = 0
+        for idx, c in enumerate(self._counts):
+            if not c:
+                continue
+            seen += c
+            while len(out) < len(ranks) and seen >= ranks[len(out)]:
+                out.append(min(max(self._edge(idx), self.min), self.max))
+            if len(out) == len(ranks):
+                break
+        return out
+
+    def percentile(self, q: float) -> float:
+        return self.percentiles((q,))[0]
+
+    def summary_ms(self) -> "TimingSummary":
+        if self.count == 0:
+            return TimingSummary()
+        p50, p95, p99 = self.percentiles((50, 95, 99))
+        return TimingSummary(
+            count=self.count,
+            min_ms=self.min * 1000.0,
+            mean_ms=self.mean * 1000.0,
+            p50_ms=p50 * 1000.0,
+            p95_ms=p95 * 1000.0,
+            p99_ms=p99 * 1000.0,
+            max_ms=self.max * 1000.0,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready summary plus the non-empty buckets as
+        ``[upper_edge_ms, count]`` pairs."""
+        d: Dict[str, Any] = self.summary_ms().to_dict()
+        d["buckets"] = [
+            [round(self._edge(idx) * 1000.0, 6), c]
+            for idx, c in enumerate(self._counts)
+            if c
+        ]
+        return d
+
+
+@dataclass(frozen=True)
+class TimingSummary:
+    """Percentiles of one timing histogram (milliseconds)."""
+
+    count: int = 0
+    min_ms: float = 0.0
+    mean_ms: float = 0.0
+    p50_ms: float = 0.0
+    p95_ms: float = 0.0
+    p99_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "min_ms": round(self.min_ms, 3),
+            "mean_ms": round(self.mean_ms, 3),
+            "p50_ms": round(self.p50_ms, 3),
+            "p95_ms": round(self.p95_ms, 3),
+            "p99_ms": round(self.p99_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class TimingCache:
+    """Last :class:`TimingSummary` of a set of histograms, refreshed
+    every :data:`TIMING_REFRESH_S`.
+
+    Scanning the buckets takes ~0.15 ms per summary and ~0.8 ms per
+    :meth:`LogHistogram.to_dict`, too much for every TX cycle.
+    """
+
+    __slots__ = ("_due", "_summaries")
+
+    def __init__(self) -> None:
+        self._due = 0.0
+        self._summaries: Dict[str, TimingSummary] = {}
+
+    def reset(self) -> None:
+        self._due = 0.0
+        self._summaries = {}
+
+    def due(self, now: float) -> bool:
+        return now >= self._due
+
+    def update(
+        self, now: float, histograms: Mapping[str, LogHistogram]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Recompute the summaries; returns the ``to_dict()`` exports
+        for the ``timing_histograms`` event."""
+        self._due = now + TIMING_REFRESH_S
+        self._summaries = {
+            name: h.summary_ms() for name, h in histograms.items()
+        }
+        return {name: h.to_dict() for name, h in histograms.items()}
+
+    def summary(self, name: str) -> TimingSummary:
+        return self._summaries.get(name, TimingSummary())
+
+
+@dataclass(frozen=True)
+class TrafficSnapshot:
+    """Rate and inter-arrival statistics of one flow (times in ms)."""
+
+    rate_hz: float
+    count: int
+    min_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class TrafficMeter:
+    """Sliding-window rate plus inter-arrival histogram of one flow."""
+
+    __slots__ = ("rate", "intervals", "_last")
+
+    def __init__(self, window_s: float = 2.0):
+        self.rate = RateMeter(window_s)
+        self.intervals = LogHistogram()
+        self._last: float | None = None
+
+    def reset(self) -> None:
+        self.rate.reset()
+        self.intervals.reset()
+        self._last = None
+
+    def record(self, now: float) -> None:
+        self.rate.add(now)
+        if self._last is not None:
+            self.intervals.add(now - self._last)
+        self._last = now
+
+    def snapshot(self, now: float) -> TrafficSnapshot:
+        h = self.intervals
+        if h.count == 0:
+            return TrafficSnapshot(self.rate.rate(now), 0, 0.0, 0.0, 0.0)
+        return TrafficSnapshot(
+            rate_hz=self.rate.rate(now),
+            count=h.count + 1,
+            min_ms=h.min * 1000.0,
+            p99_ms=h.percentile(99) * 1000.0,
+            max_ms=h.max * 1000.0,
+        )
+
+
+class TrafficStats:
+    """A :class:`TrafficMeter` per arbitration ID, created on first use."""
+
+    __slots__ = ("_window", "_meters")
+
+    def __init__(self, window_s: float = 2.0):
+        self._window = window_s
+        self._meters: Dict[int, TrafficMeter] = {}
+
+    def reset(self) -> None:
+        self._meters.clear()
+
+    def meter(self, can_id: int) -> TrafficMeter:
+        m = self._meters.get(can_id)
+        if m is None:
+            m = self._meters[can_id] = TrafficMeter(self._window)
+        return m
+
+    def record(self, can_id: int, now: float) -> None:
+        m = self._meters.get(can_id)
+        if m is None:
+            m = self._meters[can_id] = TrafficMeter(self._window)
+        m.record(now)
+
+    def rate(self, can_id: int, now: float) -> float:
+        m = self._meters.get(can_id)
+        return m.rate.rate(now) if m is not None else 0.0
+
+    def snapshot(self, now: float) -> Dict[int, TrafficSnapshot]:
+        return {cid: m.snapshot(now) for cid, m in self._meters.items()}
+
+
+@dataclass(frozen=True)
+class HealthStats:
+    """Worker health snapshot, published once per TX cycle.
+
+    *rx_queue_delay* is the time between the adapter receiving a frame
+    (its hardware timestamp, see :mod:`obc_controller.clock`) and the
+    engine dequeuing it.  The three timing summaries are refreshed every
+    :data:`TIMING_REFRESH_S`; the full histograms for the JSON timing
+    report are published with them as a separate ``timing_histograms``
+    event, which the UI batching never coalesces away.
+    """
+
+    tx_rate: float = 0.0
+    rx_rate: float = 0.0
+    last_rx_age: float = 0.0
+    tx_period: TimingSummary = TimingSummary()
+    rx_interval: TimingSummary = TimingSummary()
+    rx_queue_delay: TimingSummary = TimingSummary()
+    tx_missed: int = 0  # TX slots given up after a stall
+    # Priority TX queue (see obc_controller.tx_queue): frames left
+    # waiting by the last send, highest depth, sends refused with the
+    # driver buffer full, queued Message1 replaced by a newer one
+    tx_queue_depth: int = 0
+    tx_queue_peak: int = 0
+    tx_overflows: int = 0
+    tx_dropped: int = 0
@@ -0,0 +1,121 @@
+"""
+Shared-memory ring buffer for decoded Message2 telemetry.
+
+One producer (the engine process) appends records, one consumer (the UI
+process) reads everything new since its last read.  The block holds a
+64-byte header with the monotonically increasing write count followed
+by ``capacity`` fixed-size records (:data:`RING_DTYPE`).
+
+The producer writes the record first and publishes it by bumping the
+write count; the consumer re-reads the count after copying and discards
+any records the producer may have overwritten meanwhile, so a slow
+reader loses the oldest records (counted in ``overruns``) but never
+sees torn ones.
+"""
+
+from __future__ import annotations
+
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from obc_controller.can_protocol import Message2, StatusFlags
+
+RING_DTYPE = np.dtype(
+    [
+        ("timestamp", "f8"),   # time.monotonic() at reception
+        ("vout", "f8"),
+        ("iout", "f8"),
+        ("vin", "f8"),
+        ("temp", "f8"),
+        ("status", "u1"),
+    ],
+    align=True,
+)
+
+_HEADER = 64  # bytes; write count lives in the first 8
+
+
+class TelemetryRing:
+    """Fixed-capacity SPSC ring of Message2 records in shared memory."""
+
+    def __init__(
+        self,
+        capacity: int = 4096,
+        name: Optional[str] = None,
+    ):
+        size = _HEADER + capacity * RING_DTYPE.itemsize
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            self._owner = True
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self.capacity = capacity
+        buf = self._shm.buf
+        self._count = np.ndarray((1,), dtype="u8", buffer=buf)
+        self._rec = np.ndarray(
+            (capacity,), dtype=RING_DTYPE, buffer=buf, offset=_HEADER
+        )
+        if self._owner:
+            self._count[0] = 0
+        self._read = int(self._count[0])
+        self.overruns = 0
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    # ---- producer ----------------------------------------------------------
+
+    def push(self, msg: Message2) -> None:
+        n = int(self._count[0])
+        self._rec[n % self.capacity] = (
+            msg.timestamp,
+            msg.output_voltage,
+            msg.output_current,
+            msg.input_voltage,
+            msg.temperature,
+            msg.status.to_byte(),
+        )
+        self._count[0] = n + 1
+
+    # ---- consumer ----------------------------------------------------------
+
+    def read(self) -> np.ndarray:
+        """Copy of all records written since the previous call."""
+        head = int(self._count[0])
+        start = self._read
+        if head - start > self.capacity:
+            self.overruns += head - start - self.capacity
+            start = head - self.capacity
+        if head == start:
+            return self._rec[:0].copy()
+        idx = np.arange(start, head) % self.capacity
+        out = self._rec[idx]
+        # Records older than (new head - capacity) may have been
+        # overwritten while copying: drop them.
+        lapped = int(self._count[0]) - self.capacity - start
+        if lapped > 0:
+            self.overruns += lapped
+            out = out[lapped:]
+        self._read = head
+        return out
+
+    def read_messages(self) -> list[Message2]:
+        from_byte = StatusFlags.from_byte
+        return [
+            Message2(vout, iout, from_byte(status), vin, temp, ts)
+            for ts, vout, iout, vin, temp, status in self.read().tolist()
+        ]
+
+    # ---- lifetime ----------------------------------------------------------
+
+    def close(self) -> None:
+        """Detach; the creating side also frees the block."""
+        self._count = None
+        self._rec = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
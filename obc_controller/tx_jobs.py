@@ -0,0 +1,145 @@
+"""
+One-shot TX sequences run by the engine loop.
+
+A :class:`TxJob` is a list of frames with the delay before each one.
+``ChargerEngine.submit_job()`` queues it; the engine sends its frames
+from its own loop, between the cyclic Message1 slots, so nothing else
+writes to the bus and the cyclic TX keeps its schedule.  A job frame
+that falls due together with a Message1 goes out first.  Jobs run one
+at a time in submission order; progress is published as
+``job_progress`` / ``job_done`` events.
+
+Step deadlines count from the job's start (like the Message1
+schedule), so a late frame does not delay the rest of the sequence.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+import can
+
+# ---------------------------------------------------------------------------
+# Baudrate-switch CAN sequence constants
+# ---------------------------------------------------------------------------
+BAUD_SWITCH_ID = 0x01002100  # Extended CAN ID for baudrate commands
+BAUD_FRAME1 = bytes([0x07, 0x01, 0x00, 0x00, 0x3D, 0x8A, 0x09, 0x00])
+BAUD_FRAME2 = bytes([0x07, 0x02, 0x0E, 0x00, 0x71, 0xB7, 0x0F, 0x00])
+BAUD_FRAME2_COUNT = 7
+BAUD_FRAME2_INTERVAL_S = 0.5
+
+BAUD_SWITCH_JOB = "Baudrate switch"
+
+
+@dataclass(frozen=True)
+class TxStep:
+    """One frame of a job, sent *delay_s* after the previous one."""
+
+    delay_s: float
+    arbitration_id: int
+    data: bytes
+    label: str = ""          # for the log line, e.g. "frame #1"
+    is_extended_id: bool = True
+
+    def frame(self) -> can.Message:
+        return can.Message(
+            arbitration_id=self.arbitration_id,
+            data=self.data,
+            is_extended_id=self.is_extended_id,
+        )
+
+
+@dataclass(frozen=True)
+class TxJob:
+    """Named one-shot frame sequence."""
+
+    name: str
+    steps: tuple[TxStep, ...]
+
+    def __post_init__(self) -> None:
+        if not self.steps:
+            raise ValueError(f"{self.name}: a TX job needs a step")
+
+
+def baudrate_switch_job() -> TxJob:
+    """The OBC baudrate-switch sequence: BAUD_FRAME1 once, then
+    BAUD_FRAME2 seven times at 500 ms intervals."""
+    steps = [TxStep(0.0, BAUD_SWITCH_ID, BAUD_FRAME1, "frame #1")]
+    steps += [
+        TxStep(
+            BAUD_FRAME2_INTERVAL_S,
+            BAUD_SWITCH_ID,
+            BAUD_FRAME2,
+            f"frame #2 ({i + 1}/{BAUD_FRAME2_COUNT})",
+        )
+        for i in range(BAUD_FRAME2_COUNT)
+    ]
+    return TxJob(BAUD_SWITCH_JOB, tuple(steps))
+
+
+class JobRunner:
+    """Queue and progress of the engine's TX jobs.
+
+    :meth:`submit` and :meth:`cancel` may be called from any thread;
+    everything else belongs to the engine loop.
+    """
+
+    __slots__ = ("_queue", "_cancel", "job", "step", "next_due")
+
+    def __init__(self) -> None:
+        self._queue: deque[TxJob] = deque()
+        self._cancel = False
+        self.job: Optional[TxJob] = None
+        self.step = 0              # index of the next step to send
+        self.next_due = math.inf   # deadline of that step
+
+    def submit(self, job: TxJob) -> None:
+        self._queue.append(job)
+
+    def cancel(self) -> None:
+        """Drop the running job and everything queued."""
+        self._cancel = True
+
+    def deadline(self, now: float) -> float:
+        """When the next job frame is due (``math.inf``: none), starting
+        the next queued job if none is running."""
+        if self.job is None and self._queue:
+            self.job = self._queue.popleft()
+            self.step = 0
+            self.next_due = now + self.job.steps[0].delay_s
+        return self.next_due
+
+    def take(self) -> TxStep:
+        """The due step; advances to the next one."""
+        step = self.job.steps[self.step]
+        self.step += 1
+        if self.step < len(self.job.steps):
+            self.next_due += self.job.steps[self.step].delay_s
+        else:
+            self.next_due = math.inf
+        return step
+
+    def finish(self) -> Optional[TxJob]:
+        """Close the running job (done or failed) and return it."""
+        job, self.job = self.job, None
+        self.next_due = math.inf
+        return job
+
+    def take_cancelled(self) -> list[TxJob]:
+        """Jobs dropped by :meth:`cancel` (empty if not requested)."""
+        if not self._cancel:
+            return []
+        self._cancel = False
+        return self.abort()
+
+    def abort(self) -> list[TxJob]:
+        """Drop the running and the queued jobs; returns them."""
+        jobs = [self.job] if self.job is not None else []
+        self.job = None
+        self.next_due = math.inf
+        while self._queue:
+            jobs.append(self._queue.popleft())
+        return jobs
@@ -0,0 +1,165 @@
+"""
+Priority TX queue in front of ``bus.send()``.
+
+Every frame the engine loop sends from Python goes through a
+:class:`TxQueue`, in one of three lanes:
+
+  - :data:`PRIO_SAFETY` -- Control=STOP frames (safe-stop, link loss)
+  - :data:`PRIO_DIAG`   -- frames of one-shot TX jobs (baud switch, ...)
+  - :data:`PRIO_CYCLIC` -- the cyclic Message1
+
+:meth:`TxQueue.flush` sends highest lane first.  When the driver's
+transmit buffer is full (``CanError`` "buffer full", ``ENOBUFS``, a send
+timeout) the refused frame stays at the head of its lane and the queue
+backs off -- :data:`TX_RETRY_MIN_S`, doubling up to
+:data:`TX_RETRY_MAX_S` while the buffer stays full -- instead of
+dropping the frame or spinning on the driver.  Each retry starts again
+from the safety lane, and queueing a STOP cancels the back-off, so a
+STOP never waits behind Message1 or job frames.  A job frame due
+together with a Message1 goes out first; with one job frame queued at a
+time it delays the Message1 by one frame at most.
+
+A Message1 replaces the one still queued for the same ID (the charger
+only needs the latest command); a STOP drops it, so a stale START can
+never follow a STOP.  With at most one queued Message1 per charger and
+one job frame at a time (the engine waits for it) the queue stays
+short; :attr:`TxQueue.backlog` and :attr:`TxQueue.peak` show how
+short.
+"""
+
+from __future__ import annotations
+
+import errno
+import re
+from collections import deque
+from typing import Callable, Optional
+
+import can
+
+PRIO_SAFETY = 0
+PRIO_DIAG = 1
+PRIO_CYCLIC = 2
+
+# Back-off while the driver TX buffer is full
+TX_RETRY_MIN_S = 0.002
+TX_RETRY_MAX_S = 0.05
+
+# Called with (time, None) once the frame is sent, or (time, reason)
+# when it failed; not called for a Message1 replaced in the queue
+OnDone = Callable[[float, Optional[str]], None]
+
+# Backends without an errno say so in the text: PCAN "Transmit queue
+# is full" (QXMTFULL), SocketCAN "Transmit buffer full"
+_FULL_TEXT = re.compile(
+    r"\b(?:buffer|queue)(?: is)? full\b|\bqxmtfull\b|\bno buffer space\b"
+)
+
+
+def _buffer_full(exc: can.CanError) -> bool:
+    """Whether *exc* means "try again later" rather than a TX fault."""
+    if isinstance(exc, can.CanTimeoutError):
+        return True
+    if not isinstance(exc, can.CanOperationError):
+        return False
+    if exc.error_code in (errno.ENOBUFS, errno.EAGAIN):
+        return True
+    return _FULL_TEXT.search(str(exc).lower()) is not None
+
+
+class TxQueue:
+    """Frames waiting for the bus, by priority.  Engine loop only."""
+
+    __slots__ = (
+        "_lanes", "retry_at", "_backoff",
+        "backlog", "peak", "overflows", "dropped",
+    )
+
+    def __init__(self) -> None:
+        self._lanes: tuple[deque, ...] = (deque(), deque(), deque())
+        self.retry_at = 0.0  # no send attempt before this time
+        self._backoff = TX_RETRY_MIN_S
+        self.backlog = 0     # frames left by the last flush()
+        self.peak = 0        # highest depth since reset()
+        self.overflows = 0   # sends refused with the buffer full
+        self.dropped = 0     # queued Message1 replaced before sending
+
+    def reset(self) -> None:
+        """Empty queue and zero counters, for a new connection."""
+        self.clear()
+        self.peak = self.overflows = self.dropped = 0
+
+    def clear(self) -> None:
+        """Drop every queued frame (bus closed); no callbacks."""
+        for lane in self._lanes:
+            lane.clear()
+        self.retry_at = 0.0
+        self._backoff = TX_RETRY_MIN_S
+        self.backlog = 0
+
+    def drop(self, prio: int) -> None:
+        """Drop the frames queued at *prio*; no callbacks."""
+        self._lanes[prio].clear()
+
+    def __len__(self) -> int:
+        return sum(len(lane) for lane in self._lanes)
+
+    def pending(self, prio: int) -> bool:
+        return bool(self._lanes[prio])
+
+    def put(
+        self,
+        prio: int,
+        frame: can.Message,
+        on_done: Optional[OnDone] = None,
+    ) -> None:
+        if prio != PRIO_DIAG:
+            cyclic = self._lanes[PRIO_CYCLIC]
+            can_id = frame.arbitration_id
+            for entry in cyclic:
+                if entry[0].arbitration_id == can_id:
+                    cyclic.remove(entry)
+                    self.dropped += 1
+                    break
+            if prio == PRIO_SAFETY:
+                self.retry_at = 0.0  # try now, even if backing off
+        self._lanes[prio].append((frame, on_done))
+        depth = len(self)
+        if depth > self.peak:
+            self.peak = depth
+
+    def flush(self, bus: can.BusABC, now: float) -> tuple[int, bool]:
+        """Send queued frames, highest priority first, until the queue
+        is empty or the bus refuses one.
+
+        Returns the number sent and whether a send failed.  A frame
+        refused with the buffer full is kept for the retry; one that
+        failed otherwise is dropped and its callback gets the error.
+        """
+        if now < self.retry_at:
+            return 0, False
+        sent = 0
+        for lane in self._lanes:
+            while lane:
+                frame, on_done = lane[0]
+                try:
+                    bus.send(frame)
+                except can.CanError as exc:
+                    if _buffer_full(exc):
+                        self.overflows += 1
+                    else:
+                        lane.popleft()
+                        if on_done is not None:
+                            on_done(now, f"TX error: {exc}")
+                    if sent:  # the buffer drains, only slower than we fill
+                        self._backoff = TX_RETRY_MIN_S
+                    self.retry_at = now + self._backoff
+                    self._backoff = min(self._backoff * 2.0, TX_RETRY_MAX_S)
+                    self.backlog = len(self)
+                    return sent, True
+                lane.popleft()
+                sent += 1
+                if on_done is not None:
+                    on_done(now, None)
+        self._backoff = TX_RETRY_MIN_S
+        self.backlog = 0
+        return sent, False
@@ -15,13 +15,28 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
 )
 
+from obc_controller.can_protocol import CYCLE_MS
+from obc_controller.stats import HealthStats, TimingSummary
 from obc_controller.ui.theme import GREEN, RED, TEXT_DIM
 
+_PCT_TIP = "p50 / p95 / p99 / max (ms)"
+
+# Message1 cycles offered; the spec default first
+_CYCLE_OPTIONS_MS = (CYCLE_MS, 100, 50, 20, 10)
+
+
+def _pct(s: TimingSummary, digits: int = 0) -> str:
+    if s.count == 0:
+        return "\u2014 ms"
+    values = (s.p50_ms, s.p95_ms, s.p99_ms, s.max_ms)
+    return "/".join(f"{v:.{digits}f}" for v in values) + " ms"
+
 
 class ConnectionPanel(QGroupBox):
     connect_requested = Signal(str, str, int, bool)  # iface, channel, bitrate, sim
     disconnect_requested = Signal()
     baudrate_switch_requested = Signal()
+    timing_export_requested = Signal()
 
     def __init__(self, parent=None):
         super().__init__("Connection", parent)
@@ -52,10 +67,38 @@ class ConnectionPanel(QGroupBox):
         row3.addWidget(self._bitrate_combo, stretch=1)
         layout.addLayout(row3)
 
+        # Row 3b: Message1 cycle
+        row3b = QHBoxLayout()
+        row3b.addWidget(QLabel("TX cycle [ms]:"))
+        self._cycle_combo = QComboBox()
+        self._cycle_combo.addItems([str(ms) for ms in _CYCLE_OPTIONS_MS])
+        self._cycle_combo.setToolTip(
+            f"Message1 period; the spec default is {CYCLE_MS} ms, some "
+            "firmware accepts shorter cycles for tighter ramp control"
+        )
+        row3b.addWidget(self._cycle_combo, stretch=1)
+        layout.addLayout(row3b)
+
         # Row 4: simulate checkbox
         self._sim_check = QCheckBox("Simulate (no HW)")
         layout.addWidget(self._sim_check)
 
+        # Row 4b: driver-cyclic TX engine
+        self._periodic_check = QCheckBox("Driver-cyclic TX")
+        self._periodic_check.setToolTip(
+            "Let the CAN driver / adapter repeat Message1 "
+            "(immune to UI stalls)"
+        )
+        layout.addWidget(self._periodic_check)
+
+        # Row 4c: run the CAN engine in its own process
+        self._process_check = QCheckBox("Isolated I/O process")
+        self._process_check.setToolTip(
+            "Run CAN TX/RX in a separate process so UI load cannot "
+            "delay Message1"
+        )
+        layout.addWidget(self._process_check)
+
         # Row 5: connect / disconnect
         btn_row = QHBoxLayout()
         self._connect_btn = QPushButton("Connect")
@@ -97,6 +140,14 @@ class ConnectionPanel(QGroupBox):
         self._tx_rate_lbl = QLabel("TX: \u2014 /s")
         self._rx_rate_lbl = QLabel("RX: \u2014 /s")
         self._rx_age_lbl = QLabel("Last RX: \u2014 s")
+        self._tx_period_lbl = QLabel("TX period: \u2014 ms")
+        self._interval_lbl = QLabel("RX interval: \u2014 ms")
+        self._queue_lbl = QLabel("RX queue: \u2014 ms")
+        self._latency_lbl = QLabel("RX\u2192UI: \u2014 ms")
+        self._jitter_lbl = QLabel("TX jitter: \u2014 ms")
+        self._filter_lbl = QLabel("RX filter: \u2014")
+        self._cache_lbl = QLabel("TX cache: \u2014")
+        self._txq_lbl = QLabel("TX queue: \u2014")
         self._comm_lbl = QLabel("Comm: \u2014")
         self._bitrate_lbl = QLabel("Bitrate: \u2014")
 
@@ -104,11 +155,35 @@ class ConnectionPanel(QGroupBox):
             self._tx_rate_lbl,
             self._rx_rate_lbl,
             self._rx_age_lbl,
+            self._tx_period_lbl,
+            self._interval_lbl,
+            self._queue_lbl,
+            self._latency_lbl,
+            self._jitter_lbl,
+            self._filter_lbl,
+            self._cache_lbl,
+            self._txq_lbl,
             self._comm_lbl,
             self._bitrate_lbl,
         ):
             lbl.setStyleSheet(_mono)
             health_lay.addWidget(lbl)
+        for lbl in (self._tx_period_lbl, self._interval_lbl,
+                    self._latency_lbl):
+            lbl.setToolTip(_PCT_TIP)
+        self._queue_lbl.setToolTip(
+            "Adapter RX timestamp \u2192 engine dequeue\n" + _PCT_TIP
+        )
+        self._txq_lbl.setToolTip(
+            "Frames waiting (peak) / sends refused with the driver TX "
+            "buffer full / Message1 replaced before it went out"
+        )
+
+        self._export_timing_btn = QPushButton("Export Timing\u2026")
+        self._export_timing_btn.setToolTip(
+            "Save TX period / RX interval / latency histograms as JSON"
+        )
+        health_lay.addWidget(self._export_timing_btn)
 
         layout.addWidget(health_group)
 
@@ -116,6 +191,9 @@ class ConnectionPanel(QGroupBox):
         self._connect_btn.clicked.connect(self._on_connect)
         self._disconnect_btn.clicked.connect(self._on_disconnect)
         self._baud_switch_btn.clicked.connect(self._on_baud_switch)
+        self._export_timing_btn.clicked.connect(
+            self.timing_export_requested.emit
+        )
         self._backend_combo.currentTextChanged.connect(
             self._on_backend_changed
         )
@@ -139,6 +217,17 @@ class ConnectionPanel(QGroupBox):
     def _on_baud_switch(self) -> None:
         self.baudrate_switch_requested.emit()
 
+    # ---- public getters ----
+
+    def get_periodic_tx(self) -> bool:
+        return self._periodic_check.isChecked()
+
+    def get_process_engine(self) -> bool:
+        return self._process_check.isChecked()
+
+    def get_cycle_ms(self) -> int:
+        return int(self._cycle_combo.currentText())
+
     # ---- public state setters ----
 
     def set_connected(self, connected: bool) -> None:
@@ -147,7 +236,10 @@ class ConnectionPanel(QGroupBox):
         self._backend_combo.setEnabled(not connected)
         self._channel_edit.setEnabled(not connected)
         self._bitrate_combo.setEnabled(not connected)
+        self._cycle_combo.setEnabled(not connected)
         self._sim_check.setEnabled(not connected)
+        self._periodic_check.setEnabled(not connected)
+        self._process_check.setEnabled(not connected)
         # Baudrate switch only makes sense with real CAN hardware
         is_sim = self._sim_check.isChecked()
         self._baud_switch_btn.setEnabled(connected and not is_sim)
@@ -165,13 +257,44 @@ class ConnectionPanel(QGroupBox):
         self._status_label.style().polish(self._status_label)
         self._baud_status.setText("")
 
+    def set_link_up(self, up: bool) -> None:
+        """Connected, or bus lost and being reopened by the engine."""
+        self._status_label.setText(
+            "\u25cf  Connected" if up else "\u25cc  Reconnecting\u2026"
+        )
+        self._status_label.setObjectName(
+            "status_connected" if up else "status_disconnected"
+        )
+        self._status_label.style().unpolish(self._status_label)
+        self._status_label.style().polish(self._status_label)
+
+    def set_disconnecting(self) -> None:
+        """Safe-stop running: no connect / disconnect until it is over."""
+        self._connect_btn.setEnabled(False)
+        self._disconnect_btn.setEnabled(False)
+        self._baud_switch_btn.setEnabled(False)
+        self._status_label.setText("\u25cc  Disconnecting\u2026")
+
     def update_health(
-        self, tx_rate: float, rx_rate: float, last_rx_age: float
+        self,
+        stats: HealthStats,
+        ui_latency: TimingSummary | None = None,
     ) -> None:
-        """Update the health panel with live CAN bus stats."""
-        self._tx_rate_lbl.setText(f"TX: {tx_rate:.1f} /s")
-        self._rx_rate_lbl.setText(f"RX: {rx_rate:.1f} /s")
+        """Update the health panel with live CAN bus stats and timing
+        percentiles (*ui_latency*: RX-to-UI delivery, measured here)."""
+        last_rx_age = stats.last_rx_age
+        self._tx_rate_lbl.setText(f"TX: {stats.tx_rate:.1f} /s")
+        self._rx_rate_lbl.setText(f"RX: {stats.rx_rate:.1f} /s")
         self._rx_age_lbl.setText(f"Last RX: {last_rx_age:.1f} s")
+        self._tx_period_lbl.setText(f"TX period: {_pct(stats.tx_period)}")
+        self._interval_lbl.setText(f"RX interval: {_pct(stats.rx_interval)}")
+        self._queue_lbl.setText(f"RX queue: {_pct(stats.rx_queue_delay, 2)}")
+        self._txq_lbl.setText(
+            f"TX queue: {stats.tx_queue_depth} ({stats.tx_queue_peak}) / "
+            f"{stats.tx_overflows} full / {stats.tx_dropped} dropped"
+        )
+        if ui_latency is not None:
+            self._latency_lbl.setText(f"RX\u2192UI: {_pct(ui_latency, 2)}")
         if last_rx_age > 5.0:
             self._comm_lbl.setText("Comm: TIMEOUT")
             self._comm_lbl.setStyleSheet(
@@ -187,6 +310,41 @@ class ConnectionPanel(QGroupBox):
                 "font-size: 12px;"
             )
 
+    def update_traffic(self, stats: dict) -> None:
+        """Per-ID RX rate and inter-arrival stats, shown as the RX tooltip.
+
+        *stats* maps arbitration ID to a ``TrafficSnapshot``.
+        """
+        lines = ["ID          rate/s   min/p99/max ms"]
+        for can_id in sorted(stats):
+            s = stats[can_id]
+            lines.append(
+                f"0x{can_id:08X} {s.rate_hz:7.1f}   "
+                f"{s.min_ms:.1f}/{s.p99_ms:.1f}/{s.max_ms:.1f}"
+            )
+        self._rx_rate_lbl.setToolTip("\n".join(lines))
+
+    def update_jitter(self, mean_ms: float, max_ms: float) -> None:
+        """Show achieved Message1 period jitter (mean / max, ms)."""
+        self._jitter_lbl.setText(
+            f"TX jitter: {mean_ms:.1f} ms (max {max_ms:.1f})"
+        )
+
+    def update_filter_stats(self, passed: int, dropped: int) -> None:
+        """Show RX acceptance-filter counters (*dropped* < 0: in hardware)."""
+        if dropped < 0:
+            self._filter_lbl.setText(f"RX filter: {passed} pass (HW)")
+        else:
+            self._filter_lbl.setText(
+                f"RX filter: {passed} pass / {dropped} drop"
+            )
+
+    def update_tx_cache(self, hits: int, misses: int) -> None:
+        """Show the Message1 frame-cache hit rate."""
+        total = hits + misses
+        rate = 100.0 * hits / total if total else 0.0
+        self._cache_lbl.setText(f"TX cache: {rate:.0f}% hit ({misses} built)")
+
     def _reset_health(self) -> None:
         _mono = (
             "font-family: 'Cascadia Code','Fira Code','Consolas',monospace; "
@@ -195,6 +353,15 @@ class ConnectionPanel(QGroupBox):
         self._tx_rate_lbl.setText("TX: \u2014 /s")
         self._rx_rate_lbl.setText("RX: \u2014 /s")
         self._rx_age_lbl.setText("Last RX: \u2014 s")
+        self._tx_period_lbl.setText("TX period: \u2014 ms")
+        self._interval_lbl.setText("RX interval: \u2014 ms")
+        self._queue_lbl.setText("RX queue: \u2014 ms")
+        self._latency_lbl.setText("RX\u2192UI: \u2014 ms")
+        self._rx_rate_lbl.setToolTip("")
+        self._jitter_lbl.setText("TX jitter: \u2014 ms")
+        self._filter_lbl.setText("RX filter: \u2014")
+        self._cache_lbl.setText("TX cache: \u2014")
+        self._txq_lbl.setText("TX queue: \u2014")
         self._comm_lbl.setText("Comm: \u2014")
         self._comm_lbl.setStyleSheet(_mono)
         self._bitrate_lbl.setText("Bitrate: \u2014")
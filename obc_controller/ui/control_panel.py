@@ -42,8 +42,8 @@ _BADGE = {
 
 
 class ControlPanel(QGroupBox):
-    # voltage, current, control, ramp_enabled, ramp_v, ramp_a
-    control_changed = Signal(float, float, int, bool, float, float)
+    # voltage, current, control, ramp_enabled, ramp_v, ramp_a, closed_loop
+    control_changed = Signal(float, float, int, bool, float, float, bool)
     instant_360v_requested = Signal()  # one-touch 360V/9A
     profile_loaded = Signal(object)  # Profile dataclass
     log_message = Signal(str)
@@ -175,6 +175,22 @@ class ControlPanel(QGroupBox):
 
         layout.addWidget(ramp_group)
 
+        # ---- Closed-loop regulation ----
+        reg_group = QGroupBox("Regulation")
+        reg_layout = QVBoxLayout(reg_group)
+
+        self._closed_loop_check = QCheckBox("Closed loop (PI)")
+        self._closed_loop_check.setToolTip(
+            "Trim the sent setpoints from the measured Message2 output so "
+            "the OBC settles on the target"
+        )
+        reg_layout.addWidget(self._closed_loop_check)
+
+        self._trim_label = QLabel("Trim: \u2014")
+        reg_layout.addWidget(self._trim_label)
+
+        layout.addWidget(reg_group)
+
         # ---- Wire signals ----
         self._start_btn.clicked.connect(
             lambda: self._set_control(ChargerControl.START_CHARGING)
@@ -190,6 +206,7 @@ class ControlPanel(QGroupBox):
         self._ramp_check.toggled.connect(self._emit_state)
         self._ramp_v_spin.valueChanged.connect(self._emit_state)
         self._ramp_a_spin.valueChanged.connect(self._emit_state)
+        self._closed_loop_check.toggled.connect(self._emit_state)
 
         self._instant_btn.clicked.connect(self._on_instant_360v)
 
@@ -281,6 +298,8 @@ class ControlPanel(QGroupBox):
         if self._current_control == ChargerControl.HEATING_DC_SUPPLY:
             mode = "heating"
 
+        # The curve is edited in profiles.json; keep it on re-save
+        existing = load_profiles().get(name)
         profile = Profile(
             name=name,
             voltage_set_v=self._voltage_spin.value(),
@@ -289,6 +308,7 @@ class ControlPanel(QGroupBox):
             ramp_enabled=self._ramp_check.isChecked(),
             ramp_rate_v_per_s=self._ramp_v_spin.value(),
             ramp_rate_a_per_s=self._ramp_a_spin.value(),
+            curve=existing.curve if existing is not None else [],
         )
         save_profile(profile)
         self._refresh_profiles()
@@ -311,16 +331,18 @@ class ControlPanel(QGroupBox):
         self._ramp_v_spin.setValue(p.ramp_rate_v_per_s)
         self._ramp_a_spin.setValue(p.ramp_rate_a_per_s)
 
+        # Before starting, so the first frames already follow the curve
+        self.profile_loaded.emit(p)
         if p.mode == "heating":
             self._set_control(ChargerControl.HEATING_DC_SUPPLY)
         else:
             self._set_control(ChargerControl.START_CHARGING)
 
-        self.profile_loaded.emit(p)
+        curve = f" / curve: {len(p.curve)} segment(s)" if p.curve else ""
         self.log_message.emit(
             f"Profile '{name}' loaded: {p.voltage_set_v:.1f}V / "
             f"{p.current_set_a:.1f}A / {p.mode} / "
-            f"ramp={'ON' if p.ramp_enabled else 'OFF'}"
+            f"ramp={'ON' if p.ramp_enabled else 'OFF'}{curve}"
         )
 
     def _on_delete_profile(self) -> None:
@@ -359,8 +381,13 @@ class ControlPanel(QGroupBox):
             self._ramp_check.isChecked(),
             self._ramp_v_spin.value(),
             self._ramp_a_spin.value(),
+            self._closed_loop_check.isChecked(),
         )
 
+    def set_control(self, ctrl: ChargerControl) -> None:
+        """Switch mode as if the button was pressed (e.g. curve done)."""
+        self._set_control(ctrl)
+
     # ---- Ramp display (called from main window) ----
 
     def update_ramp_display(
@@ -375,6 +402,16 @@ class ControlPanel(QGroupBox):
             self._ramp_v_actual.setText("V: \u2014")
             self._ramp_a_actual.setText("A: \u2014")
 
+    def update_regulator_display(
+        self, closed_loop: bool, trim_v: float, trim_a: float
+    ) -> None:
+        if closed_loop:
+            self._trim_label.setText(
+                f"Trim: {trim_v:+.1f} V / {trim_a:+.1f} A"
+            )
+        else:
+            self._trim_label.setText("Trim: \u2014")
+
     # ---- Public getters ----
 
     def get_voltage(self) -> float:
@@ -391,3 +428,6 @@ class ControlPanel(QGroupBox):
 
     def get_ramp_rates(self) -> tuple[float, float]:
         return self._ramp_v_spin.value(), self._ramp_a_spin.value()
+
+    def get_closed_loop(self) -> bool:
+        return self._closed_loop_check.isChecked()
@@ -177,7 +177,8 @@ class GraphPanel(QGroupBox):
     # ---- public API -------------------------------------------------------
 
     def add_point(self, msg: Message2) -> None:
-        t = time.monotonic() - self._t0
+        # Bus reception time; queueing / batching delay is not plotted
+        t = (msg.timestamp or time.monotonic()) - self._t0
         self._ts.append(t)
         self._vout.append(msg.output_voltage)
         self._vin.append(msg.input_voltage)
@@ -2,12 +2,15 @@
 
 from __future__ import annotations
 
+import json
+import time
 from pathlib import Path
 
-from PySide6.QtCore import Qt, Slot
+from PySide6.QtCore import Qt, QTimer, Slot
 from PySide6.QtGui import QPixmap
 from PySide6.QtWidgets import (
     QDialog,
+    QFileDialog,
     QFrame,
     QHBoxLayout,
     QLabel,
@@ -20,9 +23,26 @@ from PySide6.QtWidgets import (
 )
 
 from obc_controller.__version__ import __version__
-from obc_controller.can_protocol import ChargerControl
-from obc_controller.can_worker import BaudrateSwitchWorker, CANWorker
+from obc_controller.can_protocol import (
+    CYCLE_MS,
+    TIMEOUT_S,
+    ChargerControl,
+)
+from obc_controller.can_worker import CANWorker
+from obc_controller.charge_curve import ChargeCurve, compile_curve
+from obc_controller.events import DEFAULT_MAX_LATENCY_MS, EventBuffer
+from obc_controller.process_engine import ProcessEngine
+from obc_controller.regulator import RegulatorConfig
+from obc_controller.settings import (
+    charger_addresses_setting,
+    load_settings,
+    monitored_ids_setting,
+    protocol_from_setting,
+    regulator_setting,
+)
 from obc_controller.simulator import Simulator
+from obc_controller.stats import TIMING_PER_DECADE, HealthStats, LogHistogram
+from obc_controller.tx_jobs import BAUD_SWITCH_JOB, baudrate_switch_job
 from obc_controller.ui.connection_panel import ConnectionPanel
 from obc_controller.ui.control_panel import ControlPanel
 from obc_controller.ui.graph_panel import GraphPanel
@@ -33,18 +53,43 @@ from obc_controller.ui.theme import COMPANY, ADDRESS, MADE_BY, CYAN, TEXT_DIM
 _ASSETS = Path(__file__).parent / "assets"
 
 
+def _batch_latency_setting() -> int:
+    """Max worker -> UI event latency from settings.json ``"ui_batch_ms"``
+    (0 disables batching: one queued signal per event)."""
+    try:
+        ms = int(load_settings().get("ui_batch_ms", DEFAULT_MAX_LATENCY_MS))
+    except (TypeError, ValueError):
+        return DEFAULT_MAX_LATENCY_MS
+    return 0 if ms <= 0 else max(ms, 10)
+
+
 class MainWindow(QMainWindow):
     def __init__(self) -> None:
         super().__init__()
         self.setWindowTitle(f"OBC Charger Controller \u2014 {COMPANY}")
         self.resize(1280, 860)
 
-        self._worker: CANWorker | None = None
+        self._worker: CANWorker | ProcessEngine | None = None
         self._simulator: Simulator | None = None
-        self._baud_worker: BaudrateSwitchWorker | None = None
+        self._baud_busy = False  # baudrate-switch job submitted
+        self._disconnecting = False  # safe-stop of the worker running
         self._sim_mode = False
         self._prev_control = ChargerControl.STOP_OUTPUTTING
 
+        # Timing report: worker histograms + RX-to-UI delivery latency
+        self._last_health: HealthStats | None = None
+        self._last_histograms: dict = {}  # refreshed at 1 Hz
+        self._ui_latency = LogHistogram(per_decade=TIMING_PER_DECADE)
+        self._cycle_ms = CYCLE_MS  # Message1 cycle of the connection
+        self._curve: ChargeCurve | None = None  # of the loaded profile
+        # Closed-loop gains, read from settings.json at connect
+        self._regulator_cfg = RegulatorConfig()
+
+        # Batched worker events, drained once per UI frame
+        self._events = EventBuffer()
+        self._events_timer = QTimer(self)
+        self._events_timer.timeout.connect(self._drain_events)
+
         # --- central widget ---
         central = QWidget()
         central.setObjectName("central")
@@ -174,6 +219,34 @@ class MainWindow(QMainWindow):
         self._conn_panel.baudrate_switch_requested.connect(
             self._on_baudrate_switch
         )
+        self._conn_panel.timing_export_requested.connect(
+            self._on_export_timing
+        )
+
+        # Batched worker event kind -> handler (same as the signal slots)
+        self._event_handlers = {
+            "connected": self._on_worker_connected,
+            "disconnected": self._on_worker_disconnected,
+            "error": self._on_worker_error,
+            "log_message": self._log_panel.append,
+            "message2_received": self._on_message2,
+            "timeout_alarm": self._on_timeout_alarm,
+            "tx_message": self._on_tx_message,
+            "ramp_state": self._on_ramp_state,
+            "regulator_state": self._on_regulator_state,
+            "curve_state": self._on_curve_state,
+            "link_state": self._on_link_state,
+            "job_progress": self._on_job_progress,
+            "job_done": self._on_job_done,
+            "health_stats": self._on_health_stats,
+            "timing_histograms": self._on_timing_histograms,
+            "traffic_stats": self._on_traffic_stats,
+            "tx_jitter": self._on_tx_jitter,
+            "filter_stats": self._on_filter_stats,
+            "tx_cache_stats": self._on_tx_cache_stats,
+            "monitored_frame": self._on_monitored_frame,
+            "status_bit_changed": self._on_status_bit_changed,
+        }
         self._ctrl_panel.control_changed.connect(self._on_control_changed)
         self._ctrl_panel.instant_360v_requested.connect(
             self._on_instant_360v
@@ -250,21 +323,71 @@ class MainWindow(QMainWindow):
             return
 
         # Real CAN connection
-        self._worker = CANWorker()
+        self._last_health = None
+        self._last_histograms = {}
+        self._ui_latency.reset()
+        self._events.clear()
+        if self._conn_panel.get_process_engine():
+            self._worker = ProcessEngine(self._events)
+            self._log_panel.append("CAN engine: separate process.")
+        else:
+            self._worker = CANWorker()
         self._worker.set_connection_params(interface, channel, bitrate)
+        self._worker.set_periodic_tx(self._conn_panel.get_periodic_tx())
+        self._cycle_ms = self._conn_panel.get_cycle_ms()
+        self._worker.set_cycle_ms(self._cycle_ms)
+        self._worker.set_monitored_ids(monitored_ids_setting())
+        db_entry = load_settings().get("signal_db")
+        if db_entry:
+            try:
+                protocol = protocol_from_setting(db_entry)
+                self._worker.set_protocol(protocol)
+                self._log_panel.append(
+                    f"Protocol: {protocol.name} (Message1 "
+                    f"0x{protocol.msg1_id:08X}, Message2 "
+                    f"0x{protocol.msg2_id:08X})"
+                )
+            except Exception as exc:
+                self._log_panel.append(
+                    f"ERROR: signal_db {db_entry!r} not usable, "
+                    f"using spec v1.3: {exc}"
+                )
+        addresses = charger_addresses_setting()
+        if addresses:
+            # The control panel drives all chargers; the telemetry and
+            # health panels show the first one.
+            try:
+                self._worker.set_nodes(addresses)
+            except ValueError as exc:
+                self._log_panel.append(
+                    f"ERROR: charger_addresses not usable: {exc}"
+                )
 
         # Apply initial setpoints + ramp config
-        self._worker.set_setpoints(
-            self._ctrl_panel.get_voltage(),
-            self._ctrl_panel.get_current(),
-        )
-        self._worker.set_control(self._ctrl_panel.get_control())
+        self._regulator_cfg = regulator_setting()
         ramp_v, ramp_a = self._ctrl_panel.get_ramp_rates()
-        self._worker.set_ramp_config(
-            self._ctrl_panel.get_ramp_enabled(), ramp_v, ramp_a
+        self._worker.configure(
+            voltage=self._ctrl_panel.get_voltage(),
+            current=self._ctrl_panel.get_current(),
+            control=self._ctrl_panel.get_control(),
+            ramp_enabled=self._ctrl_panel.get_ramp_enabled(),
+            ramp_rate_v=ramp_v,
+            ramp_rate_a=ramp_a,
+            regulator=self._regulator(self._ctrl_panel.get_closed_loop()),
+            curve=self._curve,
         )
         self._worker.enable_tx(True)
 
+        batch_ms = _batch_latency_setting()
+        if isinstance(self._worker, ProcessEngine):
+            # Events always arrive through the buffer
+            self._events_timer.start(batch_ms or DEFAULT_MAX_LATENCY_MS)
+            self._worker.start()
+            return
+        if batch_ms:
+            self._worker.set_event_buffer(self._events)
+            self._events_timer.start(batch_ms)
+
         # Wire worker signals
         self._worker.connected.connect(self._on_worker_connected)
         self._worker.disconnected.connect(self._on_worker_disconnected)
@@ -274,7 +397,18 @@ class MainWindow(QMainWindow):
         self._worker.timeout_alarm.connect(self._on_timeout_alarm)
         self._worker.tx_message.connect(self._on_tx_message)
         self._worker.ramp_state.connect(self._on_ramp_state)
+        self._worker.regulator_state.connect(self._on_regulator_state)
+        self._worker.curve_state.connect(self._on_curve_state)
+        self._worker.link_state.connect(self._on_link_state)
+        self._worker.job_progress.connect(self._on_job_progress)
+        self._worker.job_done.connect(self._on_job_done)
         self._worker.health_stats.connect(self._on_health_stats)
+        self._worker.timing_histograms.connect(self._on_timing_histograms)
+        self._worker.traffic_stats.connect(self._on_traffic_stats)
+        self._worker.tx_jitter.connect(self._on_tx_jitter)
+        self._worker.filter_stats.connect(self._on_filter_stats)
+        self._worker.tx_cache_stats.connect(self._on_tx_cache_stats)
+        self._worker.monitored_frame.connect(self._on_monitored_frame)
         self._worker.status_bit_changed.connect(self._on_status_bit_changed)
 
         self._worker.start()
@@ -292,10 +426,13 @@ class MainWindow(QMainWindow):
             return
 
         if self._worker is not None:
+            # Safe-stop runs in the engine loop; _on_worker_disconnected
+            # finishes up when it is over
             self._log_panel.append("Disconnecting \u2026")
+            self._disconnecting = True
+            self._conn_panel.set_disconnecting()
+            self._ctrl_panel.setEnabled(False)
             self._worker.request_stop()
-            self._worker.wait(10000)
-            self._worker = None
 
     # ---- worker signal handlers ------------------------------------------
 
@@ -304,12 +441,33 @@ class MainWindow(QMainWindow):
         self._conn_panel.set_connected(True)
         self._ctrl_panel.setEnabled(True)
 
+    @Slot()
+    def _drain_events(self) -> None:
+        if isinstance(self._worker, ProcessEngine):
+            self._worker.poll()
+        handlers = self._event_handlers
+        for kind, args in self._events.drain():
+            handler = handlers.get(kind)
+            if handler is not None:  # e.g. node_event: log lines only
+                handler(*args)
+
     @Slot()
     def _on_worker_disconnected(self) -> None:
+        """Engine done: safe-stopped and bus released, or connect
+        failed."""
+        worker, self._worker = self._worker, None
+        self._disconnecting = False
+        if worker is not None:
+            # Already returning from run(); for a process engine this
+            # also collects its last events
+            worker.wait(10000)
+        self._events_timer.stop()
+        self._drain_events()
         self._conn_panel.set_connected(False)
         self._ctrl_panel.setEnabled(False)
         self._tele_panel.clear()
         self._ctrl_panel.update_ramp_display(False, 0, 0)
+        self._ctrl_panel.update_regulator_display(False, 0, 0)
 
     @Slot(str)
     def _on_worker_error(self, msg: str) -> None:
@@ -317,6 +475,8 @@ class MainWindow(QMainWindow):
 
     @Slot(object)
     def _on_message2(self, msg) -> None:
+        if msg.timestamp:
+            self._ui_latency.add(time.monotonic() - msg.timestamp)
         self._tele_panel.update_telemetry(msg)
         self._graph_panel.add_point(msg)
 
@@ -342,11 +502,60 @@ class MainWindow(QMainWindow):
     ) -> None:
         self._ctrl_panel.update_ramp_display(active, ramped_v, ramped_a)
 
-    @Slot(float, float, float)
-    def _on_health_stats(
-        self, tx_rate: float, rx_rate: float, last_rx_age: float
+    @Slot(bool, float, float)
+    def _on_regulator_state(
+        self, closed_loop: bool, trim_v: float, trim_a: float
     ) -> None:
-        self._conn_panel.update_health(tx_rate, rx_rate, last_rx_age)
+        self._ctrl_panel.update_regulator_display(closed_loop, trim_v, trim_a)
+
+    @Slot(int, str, bool)
+    def _on_curve_state(self, index: int, phase: str, done: bool) -> None:
+        if done:
+            self._graph_panel.add_event_marker("CURVE DONE", "info")
+            # The engine already sends STOP; keep the UI in line
+            self._ctrl_panel.set_control(ChargerControl.STOP_OUTPUTTING)
+        else:
+            self._graph_panel.add_event_marker(
+                f"{phase.upper()} #{index + 1}", "info"
+            )
+
+    @Slot(bool)
+    def _on_link_state(self, up: bool) -> None:
+        self._conn_panel.set_link_up(up)
+        if up:
+            self._graph_panel.add_event_marker("LINK RESTORED", "info")
+        else:
+            self._graph_panel.add_event_marker("LINK LOST", "error")
+            self._tele_panel.set_alarm("CAN link lost \u2014 reconnecting")
+
+    @Slot(object)
+    def _on_health_stats(self, stats: HealthStats) -> None:
+        self._last_health = stats
+        self._conn_panel.update_health(stats, self._ui_latency.summary_ms())
+
+    @Slot(object)
+    def _on_timing_histograms(self, histograms: dict) -> None:
+        self._last_histograms = histograms
+
+    @Slot(object)
+    def _on_traffic_stats(self, stats: dict) -> None:
+        self._conn_panel.update_traffic(stats)
+
+    @Slot(float, float)
+    def _on_tx_jitter(self, mean_ms: float, max_ms: float) -> None:
+        self._conn_panel.update_jitter(mean_ms, max_ms)
+
+    @Slot(int, int)
+    def _on_filter_stats(self, passed: int, dropped: int) -> None:
+        self._conn_panel.update_filter_stats(passed, dropped)
+
+    @Slot(int, int)
+    def _on_tx_cache_stats(self, hits: int, misses: int) -> None:
+        self._conn_panel.update_tx_cache(hits, misses)
+
+    @Slot(int, bytes)
+    def _on_monitored_frame(self, can_id: int, data: bytes) -> None:
+        self._log_panel.append(f"RX 0x{can_id:08X}: {data.hex(' ')}")
 
     @Slot(int, str, bool)
     def _on_status_bit_changed(
@@ -359,9 +568,42 @@ class MainWindow(QMainWindow):
         )
         self._log_panel.append(f"Status bit {bit} ({name}): {state}")
 
+    @Slot()
+    def _on_export_timing(self) -> None:
+        stats = self._last_health
+        if stats is None:
+            self._log_panel.append("No timing data yet (connect first).")
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export Timing",
+            f"obc_timing_{time.strftime('%Y%m%d_%H%M%S')}.json",
+            "JSON files (*.json);;All files (*)",
+        )
+        if not path:
+            return
+        report = {
+            "generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "spec": {
+                "cycle_ms": self._cycle_ms,
+                "timeout_ms": TIMEOUT_S * 1000,
+            },
+            "tx_rate_hz": round(stats.tx_rate, 3),
+            "rx_rate_hz": round(stats.rx_rate, 3),
+            "histograms": {
+                **self._last_histograms,
+                "rx_to_ui": self._ui_latency.to_dict(),
+            },
+        }
+        Path(path).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        self._log_panel.append(f"Timing report saved: {path}")
+
     # ---- control panel -> worker -----------------------------------------
 
-    @Slot(float, float, int, bool, float, float)
+    def _regulator(self, closed_loop: bool) -> RegulatorConfig | None:
+        return self._regulator_cfg if closed_loop else None
+
+    @Slot(float, float, int, bool, float, float, bool)
     def _on_control_changed(
         self,
         voltage: float,
@@ -370,6 +612,7 @@ class MainWindow(QMainWindow):
         ramp_enabled: bool,
         ramp_v: float,
         ramp_a: float,
+        closed_loop: bool,
     ) -> None:
         ctrl = ChargerControl(control)
 
@@ -388,15 +631,31 @@ class MainWindow(QMainWindow):
             self._tele_panel.update_setpoints(voltage, current)
 
         if self._worker is not None:
-            self._worker.set_setpoints(voltage, current)
-            self._worker.set_control(ctrl)
-            self._worker.set_ramp_config(ramp_enabled, ramp_v, ramp_a)
+            # One snapshot, so the next Message1 carries all of it
+            self._worker.configure(
+                voltage=voltage,
+                current=current,
+                control=ctrl,
+                ramp_enabled=ramp_enabled,
+                ramp_rate_v=ramp_v,
+                ramp_rate_a=ramp_a,
+                regulator=self._regulator(closed_loop),
+            )
 
     @Slot(object)
     def _on_profile_loaded(self, profile) -> None:
-        """Reset ramp when a profile is loaded."""
+        """Apply the profile's charge curve and reset the ramp."""
+        curve = None
+        try:
+            if profile.curve:
+                curve = compile_curve(profile.curve)
+        except ValueError as exc:
+            self._log_panel.append(
+                f"ERROR: Profile '{profile.name}' curve ignored: {exc}"
+            )
+        self._curve = curve
         if self._worker is not None:
-            self._worker.reset_ramp()
+            self._worker.configure(curve=self._curve, reset_ramp=True)
 
     # ---- instant 360V / 9A -----------------------------------------------
 
@@ -407,61 +666,67 @@ class MainWindow(QMainWindow):
             "\u26a1 360V/9A INSTANT", "warning"
         )
         if self._worker is not None:
-            self._worker.set_setpoints(360.0, 9.0)
-            self._worker.set_control(ChargerControl.HEATING_DC_SUPPLY)
-            self._worker.set_ramp_config(False, 5.0, 0.5)
-            self._worker.reset_ramp()
+            self._worker.configure(
+                voltage=360.0,
+                current=9.0,
+                control=ChargerControl.HEATING_DC_SUPPLY,
+                ramp_enabled=False,
+                ramp_rate_v=5.0,
+                ramp_rate_a=0.5,
+                reset_ramp=True,
+            )
 
     # ---- baudrate switch sequence ----------------------------------------
 
     @Slot()
     def _on_baudrate_switch(self) -> None:
-        if self._worker is None or not self._worker.is_bus_connected():
+        if self._worker is None:
             self._log_panel.append(
                 "Cannot switch baudrate: CAN not connected."
             )
             return
-        if self._baud_worker is not None and self._baud_worker.isRunning():
+        if self._baud_busy:
             self._log_panel.append(
                 "Baudrate switch already in progress."
             )
             return
 
+        self._baud_busy = True
         self._conn_panel.set_baud_switch_busy(True)
         self._ctrl_panel.setEnabled(False)
         self._graph_panel.add_event_marker("Baud switch START", "info")
+        # Sent by the engine between its Message1 slots
+        self._worker.submit_job(baudrate_switch_job())
 
-        self._baud_worker = BaudrateSwitchWorker(self._worker.get_bus())
-        self._baud_worker.progress.connect(self._on_baud_progress)
-        self._baud_worker.finished_ok.connect(self._on_baud_done)
-        self._baud_worker.error.connect(self._on_baud_error)
-        self._baud_worker.log_message.connect(self._log_panel.append)
-        self._baud_worker.start()
-
-    @Slot(int, int)
-    def _on_baud_progress(self, step: int, total: int) -> None:
-        self._conn_panel.set_baud_switch_progress(step, total)
-
-    @Slot()
-    def _on_baud_done(self) -> None:
-        self._conn_panel.set_baud_switch_done()
-        self._ctrl_panel.setEnabled(True)
-        self._baud_worker = None
-        self._graph_panel.add_event_marker("Baud switch DONE", "info")
+    @Slot(str, int, int)
+    def _on_job_progress(self, name: str, step: int, total: int) -> None:
+        if name == BAUD_SWITCH_JOB:
+            self._conn_panel.set_baud_switch_progress(step, total)
 
-    @Slot(str)
-    def _on_baud_error(self, msg: str) -> None:
-        self._log_panel.append(f"ERROR: {msg}")
-        self._conn_panel.set_baud_switch_busy(False)
-        self._ctrl_panel.setEnabled(True)
-        self._baud_worker = None
+    @Slot(str, bool, str)
+    def _on_job_done(self, name: str, ok: bool, detail: str) -> None:
+        if name != BAUD_SWITCH_JOB:
+            return
+        self._baud_busy = False
+        # While disconnecting (the usual reason for an abort) the panels
+        # stay as the disconnect left them
+        active = self._worker is not None and not self._disconnecting
+        self._ctrl_panel.setEnabled(active)
+        if ok:
+            self._conn_panel.set_baud_switch_done()
+            self._graph_panel.add_event_marker("Baud switch DONE", "info")
+        else:
+            self._log_panel.append(f"ERROR: Baudrate switch: {detail}")
+            if active:
+                self._conn_panel.set_baud_switch_busy(False)
 
     # ---- window close ----------------------------------------------------
 
     def closeEvent(self, event) -> None:
-        if self._baud_worker is not None and self._baud_worker.isRunning():
-            self._baud_worker.request_stop()
-            self._baud_worker.wait(5000)
-            self._baud_worker = None
+        # Disconnecting also aborts a running baudrate switch
         self._on_disconnect()
+        if self._worker is not None:
+            # Closing: wait for the safe-stop here
+            self._worker.wait(10000)
+            self._on_worker_disconnected()
         super().closeEvent(event)
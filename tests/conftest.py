@@ -0,0 +1,32 @@
+"""Engines on python-can's ``virtual`` bus, run in a thread."""
+
+import threading
+
+import pytest
+
+from obc_controller.bus_pool import POOL
+
+
+@pytest.fixture
+def channel(request):
+    """Virtual channel of its own for each test."""
+    yield f"test-{request.node.name}"
+    POOL.close_all()
+
+
+@pytest.fixture
+def run_engine():
+    """``start(engine)`` runs ``engine.run()`` in a thread; every engine
+    started is stopped and joined at teardown."""
+    started = []
+
+    def start(engine):
+        thread = threading.Thread(target=engine.run, daemon=True)
+        thread.start()
+        started.append((engine, thread))
+        return thread
+
+    yield start
+    for engine, thread in started:
+        engine.request_stop()
+        thread.join(10.0)
@@ -0,0 +1,120 @@
+"""Parked bus handles: reuse, drain, filters and eviction."""
+
+import inspect
+import time
+
+import can
+import pytest
+
+from obc_controller.bus_pool import BusPool
+from obc_controller.engine_common import install_filters
+
+
+class _FakeBus:
+    """Stands in for an adapter handle the pool parks and closes."""
+
+    def __init__(self, state=can.BusState.ACTIVE):
+        self.state = state
+        self.closed = False
+
+    def shutdown(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool():
+    pool = BusPool()
+    yield pool
+    pool.close_all()
+
+
+def _log(*args):
+    pass
+
+
+def _wrapped(bus) -> object:
+    """The filter method the engine's counting wrapper calls."""
+    return inspect.getclosurevars(bus._matches_filters).nonlocals["match"]
+
+
+def test_reconnect_keeps_a_single_filter_wrapper(pool, channel):
+    for _ in range(20):
+        bus, _ = pool.acquire("virtual", channel, 500000)
+        stats = install_filters(bus, [0x100], _log)
+        pool.release(bus, "virtual", channel, 500000)
+    bus, reused = pool.acquire("virtual", channel, 500000)
+    assert reused
+    stats = install_filters(bus, [0x100], _log)
+    # The wrapper wraps python-can's own method, not a previous wrapper
+    assert _wrapped(bus) == can.BusABC._matches_filters.__get__(bus)
+    assert not bus._matches_filters(
+        can.Message(arbitration_id=0x200, is_extended_id=True)
+    )
+    assert stats.dropped == 1
+    bus.shutdown()
+
+
+def test_reused_bus_is_drained(pool, channel):
+    bus, _ = pool.acquire("virtual", channel, 500000)
+    install_filters(bus, [0x100], _log)
+    pool.release(bus, "virtual", channel, 500000)
+    peer = can.Bus(interface="virtual", channel=channel)
+    try:
+        # A filtered frame first: recv(0) returns None for it
+        for can_id in (0x200, 0x100, 0x300, 0x100):
+            peer.send(can.Message(arbitration_id=can_id, is_extended_id=True))
+        again, reused = pool.acquire("virtual", channel, 500000)
+        assert reused and again is bus
+        install_filters(again, [0x100], _log)
+        assert again.recv(0.05) is None
+    finally:
+        peer.shutdown()
+
+
+def test_bitrate_change_closes_the_handle(pool, channel):
+    parked = _FakeBus()
+    assert pool.release(parked, "virtual", channel, 500000)
+    bus, reused = pool.acquire("virtual", channel, 250000)
+    assert not reused
+    assert parked.closed
+    assert bus is not parked
+    bus.shutdown()
+    assert len(pool) == 0
+
+
+def test_same_channel_replaces_parked_handle(pool):
+    first, second = _FakeBus(), _FakeBus()
+    pool.release(first, "pcan", "PCAN_USBBUS1", 500000)
+    pool.release(second, "pcan", "PCAN_USBBUS1", 500000)
+    assert first.closed and not second.closed
+    assert len(pool) == 1
+
+
+def test_max_idle_evicts_the_oldest():
+    pool = BusPool(max_idle=2)
+    buses = [_FakeBus() for _ in range(3)]
+    for k, bus in enumerate(buses):
+        pool.release(bus, "pcan", f"PCAN_USBBUS{k + 1}", 500000)
+    assert [bus.closed for bus in buses] == [True, False, False]
+    assert len(pool) == 2
+    pool.close_all()
+    assert all(bus.closed for bus in buses)
+    assert len(pool) == 0
+
+
+def test_idle_handle_expires():
+    pool = BusPool(idle_s=0.05)
+    bus = _FakeBus()
+    pool.release(bus, "pcan", "PCAN_USBBUS1", 500000)
+    end = time.monotonic() + 2.0
+    while not bus.closed and time.monotonic() < end:
+        time.sleep(0.01)
+    assert bus.closed
+    assert len(pool) == 0
+
+
+def test_bus_in_error_state_is_not_parked(pool):
+    bus = _FakeBus(can.BusState.ERROR)
+    assert not pool.release(bus, "pcan", "PCAN_USBBUS1", 500000)
+    assert bus.closed
+    assert len(pool) == 0
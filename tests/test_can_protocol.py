@@ -0,0 +1,73 @@
+"""Batched decode_many / encode_many against the scalar codec."""
+
+import numpy as np
+import pytest
+
+from obc_controller.can_protocol import (
+    MESSAGE1_DTYPE,
+    MESSAGE2_DTYPE,
+    ChargerControl,
+    Message1,
+    Message2,
+    decode_many,
+    encode_many,
+)
+
+
+def _payloads(n: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, n * 8, dtype=np.uint8).tobytes()
+
+
+def test_decode_many_matches_scalar_decode():
+    buf = _payloads(500) + bytes([0, 1, 0, 2, 0xFF, 0, 3, 0xFF])
+    arr = decode_many(buf)
+    assert len(arr) == 501
+    for k, rec in enumerate(arr):
+        msg = Message2.decode(buf[8 * k:8 * k + 8])
+        assert rec["vout"] == msg.output_voltage
+        assert rec["iout"] == msg.output_current
+        assert rec["status"] == msg.status.to_byte()
+        assert rec["vin"] == msg.input_voltage
+        assert rec["temp"] == msg.temperature
+
+
+def test_decode_many_masks_status_byte():
+    frame = bytes([0, 0, 0, 0, 0xFF, 0, 0, 0])
+    assert decode_many(frame)["status"][0] == 31
+    assert Message2.decode(frame).status.to_byte() == 31
+
+
+def test_decode_many_rejects_partial_frame():
+    with pytest.raises(ValueError):
+        decode_many(bytes(12))
+
+
+def test_encode_many_round_trip_message2():
+    rng = np.random.default_rng(1)
+    rec = np.empty(300, dtype=MESSAGE2_DTYPE)
+    rec["vout"] = rng.integers(0, 0x10000, 300) / 10.0
+    rec["iout"] = rng.integers(0, 0x10000, 300) / 10.0
+    rec["status"] = rng.integers(0, 32, 300)
+    rec["vin"] = rng.integers(0, 0x10000, 300) / 10.0
+    rec["temp"] = rng.integers(-40, 216, 300)
+    buf = encode_many(rec)
+    assert buf == b"".join(
+        Message2.decode(buf[k:k + 8]).encode()
+        for k in range(0, len(buf), 8)
+    )
+    np.testing.assert_array_equal(decode_many(buf), rec)
+
+
+def test_encode_many_matches_scalar_encode_message1():
+    rec = np.zeros(5, dtype=MESSAGE1_DTYPE)
+    rec["voltage"] = [0.0, 320.05, -1.0, 7000.0, 6553.5]
+    rec["current"] = [0.04, 10.15, 0.0, 12.0, -3.0]
+    rec["control"] = [0, 1, 2, 0, 1]
+    buf = encode_many(rec, Message1)
+    for k, (v, i, ctrl) in enumerate(rec.tolist()):
+        msg = Message1(v, i, ChargerControl(ctrl))
+        assert buf[8 * k:8 * k + 8] == msg.encode()
+    again = decode_many(buf, Message1)
+    assert again["control"].tolist() == [0, 1, 2, 0, 1]
+    assert again["voltage"].tolist() == [0.0, 320.0, 0.0, 6553.5, 6553.5]
@@ -0,0 +1,151 @@
+"""Charge curve end criteria: dwell time and settling readings."""
+
+import time
+
+import can
+import pytest
+
+from obc_controller import charge_curve
+from obc_controller.can_protocol import (
+    DEFAULT_PROTOCOL,
+    ChargerControl,
+    Message2,
+    StatusFlags,
+)
+from obc_controller.charge_curve import MIN_DWELL_S, CurveRunner, compile_curve
+from obc_controller.engine import ChargerEngine
+
+CURVE = [
+    {"phase": "cv", "voltage_v": 400, "current_a": 10,
+     "end_current_a": 1, "duration_s": 60, "until_current_a": 1},
+    {"phase": "hold", "voltage_v": 400, "current_a": 1, "duration_s": 600},
+]
+
+# Shortened for the tests on the bus
+DWELL_S = 0.3
+
+
+def test_measured_criterion_waits_for_dwell():
+    runner = CurveRunner()
+    runner.start(compile_curve(CURVE), 0.0)
+    assert not runner.observe(0.1, 400.0, 0.0)
+    assert runner.index == 0
+    assert runner.observe(MIN_DWELL_S, 400.0, 0.5)
+    assert runner.index == 1
+
+
+def test_time_limit_applies_before_dwell():
+    runner = CurveRunner()
+    runner.start(compile_curve([
+        {"phase": "hold", "voltage_v": 400, "current_a": 1,
+         "duration_s": 0.5},
+    ]), 0.0)
+    assert runner.observe(0.5)
+    assert runner.done
+
+
+def test_taper_table():
+    curve = compile_curve(CURVE)
+    assert curve.setpoints(0, 0.0) == (400.0, 10.0)
+    assert curve.setpoints(0, 30.0) == (400.0, 5.5)
+    assert curve.setpoints(0, 1e6) == (400.0, 1.0)
+    assert curve.setpoints(1, 0.0) == curve.setpoints(1, 1e6) == (400.0, 1.0)
+
+
+class _Bench:
+    """Engine on a virtual bus, with a second node playing the charger."""
+
+    def __init__(self, channel, run_engine, **config):
+        self.segments: list[tuple[float, int]] = []
+        self.engine = ChargerEngine(self._publish)
+        self.engine.set_connection_params("virtual", channel, 500000)
+        self.engine.set_cycle_ms(20)
+        self.engine.configure(
+            control=ChargerControl.START_CHARGING,
+            curve=compile_curve(CURVE),
+            **config,
+        )
+        self.engine.enable_tx(True)
+        self.peer = can.Bus(interface="virtual", channel=channel)
+        run_engine(self.engine)
+        self._wait(lambda: self.segments, 2.0)
+
+    def _publish(self, kind, *args):
+        if kind == "curve_state":
+            self.segments.append((time.monotonic(), args[0]))
+
+    def _wait(self, predicate, timeout):
+        end = time.monotonic() + timeout
+        while not predicate() and time.monotonic() < end:
+            time.sleep(0.01)
+        return predicate()
+
+    def reply(self, seconds: float, current: float, starting=False) -> None:
+        """Send Message2 readings every 20 ms for *seconds*."""
+        msg2 = Message2(
+            output_voltage=400.0,
+            output_current=current,
+            status=StatusFlags(starting_state=starting),
+        )
+        frame = can.Message(
+            arbitration_id=DEFAULT_PROTOCOL.msg2_id,
+            data=msg2.encode(),
+            is_extended_id=True,
+        )
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            self.peer.send(frame)
+            time.sleep(0.02)
+
+    def segment(self) -> int:
+        return self.segments[-1][1]
+
+    def wait_segment(self, index: int, timeout: float = 1.0) -> bool:
+        return self._wait(lambda: self.segment() == index, timeout)
+
+    def close(self):
+        self.peer.shutdown()
+
+
+@pytest.fixture
+def bench(monkeypatch, channel, run_engine):
+    monkeypatch.setattr(charge_curve, "MIN_DWELL_S", DWELL_S)
+    benches = []
+
+    def make(**config):
+        b = _Bench(channel, run_engine, **config)
+        benches.append(b)
+        return b
+
+    yield make
+    for b in benches:
+        b.close()
+
+
+def test_segment_ends_after_dwell(bench):
+    b = bench()
+    started = b.segments[0][0]
+    b.reply(DWELL_S / 2, 0.5)
+    assert b.segment() == 0
+    b.reply(DWELL_S, 0.5)
+    assert b.wait_segment(1)
+    assert b.segments[-1][0] - started >= DWELL_S
+
+
+def test_starting_status_does_not_end_segment(bench):
+    b = bench()
+    # Charger still starting and reporting 0 A, well past the dwell
+    b.reply(3 * DWELL_S, 0.0, starting=True)
+    assert b.segment() == 0
+    b.reply(0.1, 0.5)
+    assert b.wait_segment(1)
+
+
+def test_active_ramp_does_not_end_segment(bench):
+    # 400 V at 5 V/s: the ramp runs for the whole test
+    b = bench(ramp_enabled=True, ramp_rate_v=5.0)
+    b.reply(3 * DWELL_S, 0.5)
+    assert b.segment() == 0
+    b.engine.configure(ramp_enabled=False)
+    b.reply(0.1, 0.5)
+    assert b.wait_segment(1)
@@ -0,0 +1,80 @@
+"""DBC export / import round trip."""
+
+from obc_controller.can_protocol import OBC_V13
+from obc_controller.dbc import dumps_dbc, load_dbc, loads_dbc, save_dbc
+from obc_controller.signal_db import SignalDatabase
+
+VARIANT = SignalDatabase.from_dict({
+    "name": "variant",
+    "messages": [
+        {
+            "name": "Command", "frame_id": "0x1806E5F4", "cycle_ms": 100,
+            "senders": ["BMS"], "comment": 'Setpoints, "v2" layout',
+            "signals": [
+                {"name": "voltage", "start_bit": 7, "length": 16,
+                 "factor": 0.1, "unit": "V"},
+                {"name": "enable", "start_bit": 23, "length": 1},
+            ],
+        },
+        {
+            "name": "Status", "frame_id": "0x351", "length": 6,
+            "byte_order": "little_endian", "senders": ["OBC"],
+            "signals": [
+                {"name": "current", "start_bit": 0, "length": 16,
+                 "factor": 0.05, "offset": -1600, "signed": True,
+                 "unit": "A"},
+                {"name": "temperature", "start_bit": 16, "length": 8,
+                 "offset": -40, "minimum": -40, "maximum": 215,
+                 "unit": "degC"},
+                {"name": "flags", "start_bit": 27, "length": 5},
+            ],
+        },
+    ],
+})
+
+_SIGNAL_FIELDS = ("name", "start_bit", "length", "factor", "offset",
+                  "byte_order", "signed", "unit")
+
+
+def _layout(db: SignalDatabase) -> dict:
+    return {
+        msg.frame_id: (
+            msg.name, msg.length, msg.is_extended, msg.cycle_ms,
+            msg.senders, msg.comment,
+            [tuple(getattr(s, f) for f in _SIGNAL_FIELDS)
+             for s in msg.signals],
+        )
+        for msg in db.messages
+    }
+
+
+def test_round_trip_keeps_layout():
+    again = loads_dbc(dumps_dbc(VARIANT))
+    assert _layout(again) == _layout(VARIANT)
+    status = again.get_message("Status")
+    assert status.is_extended is False
+    assert status.signals[0].signed
+    assert status.signals[1].minimum == -40
+    assert status.signals[1].maximum == 215
+
+
+def test_round_trip_is_stable():
+    text = dumps_dbc(VARIANT)
+    assert dumps_dbc(loads_dbc(text)) == text
+
+
+def test_round_trip_codecs_agree():
+    again = loads_dbc(dumps_dbc(VARIANT))
+    values = {"current": -12.35, "temperature": 61, "flags": 21}
+    codec = VARIANT.codec("Status")
+    data = codec.encode(values)
+    assert again.codec("Status").encode(values) == data
+    assert again.codec("Status").decode(data) == codec.decode(data)
+
+
+def test_builtin_table_file_round_trip(tmp_path):
+    path = tmp_path / "obc_v13.dbc"
+    save_dbc(OBC_V13, path)
+    again = load_dbc(path)
+    assert again.name == "obc_v13"
+    assert _layout(again) == _layout(OBC_V13)
@@ -0,0 +1,90 @@
+"""Batched worker -> UI event delivery."""
+
+import time
+
+from obc_controller.engine import ChargerEngine
+from obc_controller.events import EventBuffer, coalesce
+from obc_controller.stats import HealthStats
+
+
+def test_coalesce_keeps_newest_of_each_kind_in_order():
+    events = [
+        ("health_stats", (1,)),
+        ("log_message", ("a",)),
+        ("ramp_state", (True, 1.0, 1.0)),
+        ("health_stats", (2,)),
+        ("message2_received", ("m1",)),
+        ("ramp_state", (False, 2.0, 2.0)),
+        ("log_message", ("b",)),
+        ("health_stats", (3,)),
+        ("message2_received", ("m2",)),
+    ]
+    assert coalesce(events) == [
+        ("log_message", ("a",)),
+        ("message2_received", ("m1",)),
+        ("ramp_state", (False, 2.0, 2.0)),
+        ("log_message", ("b",)),
+        ("health_stats", (3,)),
+        ("message2_received", ("m2",)),
+    ]
+
+
+def test_coalesce_custom_kinds():
+    events = [("a", (1,)), ("b", (1,)), ("a", (2,)), ("b", (2,))]
+    assert coalesce(events, kinds=("b",)) == [
+        ("a", (1,)), ("a", (2,)), ("b", (2,))
+    ]
+    assert coalesce([]) == []
+
+
+def test_buffer_counts_and_drains_everything():
+    events = EventBuffer()
+    assert events.drain() == []
+    for k in range(5):
+        events.push("tx_jitter", float(k), 0.0)
+        events.push("log_message", str(k))
+    assert len(events) == 10
+    batch = events.drain()
+    assert len(events) == 0
+    assert [kind for kind, _ in batch] == ["log_message"] * 4 + [
+        "tx_jitter", "log_message"
+    ]
+    assert (events.pushed, events.delivered, events.batches) == (10, 6, 1)
+    events.push("log_message", "x")
+    events.clear()
+    assert events.drain() == []
+
+
+def test_histograms_survive_coalescing():
+    events = EventBuffer()
+    export = {"tx_period": {"count": 3}}
+    for k in range(6):
+        if k == 2:
+            events.push("timing_histograms", export)
+        events.push("health_stats", HealthStats(tx_missed=k))
+    batch = events.drain()
+    assert [kind for kind, _ in batch] == [
+        "timing_histograms", "health_stats"
+    ]
+    assert batch[0][1] == (export,)
+    assert batch[1][1][0].tx_missed == 5
+
+
+def test_engine_publishes_histograms_once_a_second(channel, run_engine):
+    events = EventBuffer()
+    engine = ChargerEngine(events.push)
+    engine.set_connection_params("virtual", channel, 250000)
+    engine.set_cycle_ms(20)
+    engine.enable_tx(True)
+    thread = run_engine(engine)
+    time.sleep(1.3)
+    engine.request_stop()
+    thread.join(5.0)
+    batch = events.drain()
+    kinds = [kind for kind, _ in batch]
+    assert kinds.count("health_stats") == 1
+    exports = [args[0] for kind, args in batch
+               if kind == "timing_histograms"]
+    assert len(exports) == 2
+    assert set(exports[-1]) == {"tx_period", "rx_interval", "rx_queue_delay"}
+    assert exports[-1]["tx_period"]["count"] > 20
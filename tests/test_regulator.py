@@ -0,0 +1,76 @@
+"""PI trim of the Message1 setpoints."""
+
+import pytest
+
+from obc_controller.regulator import (
+    MAX_DT_S,
+    PIRegulator,
+    RegulatorConfig,
+    SetpointRegulator,
+)
+
+CFG = RegulatorConfig(kp=0.3, ki=0.6, max_trim=0.05)
+
+
+def test_integrates_small_error():
+    pi = PIRegulator()
+    out = [pi.update(CFG, 0.1, 0.5, limit=1.0) for _ in range(4)]
+    assert pi.integral == pytest.approx(4 * 0.6 * 0.1 * 0.5)
+    assert out[-1] == pytest.approx(0.3 * 0.1 + pi.integral)
+    assert out == sorted(out)
+
+
+def test_integrator_frozen_while_saturated():
+    pi = PIRegulator()
+    for _ in range(50):
+        # Proportional term alone saturates: nothing to integrate
+        assert pi.update(CFG, 10.0, 0.5, limit=1.0) == 1.0
+    assert pi.integral == 0.0
+    # No wind-up to unwind: the output follows the error at once
+    assert pi.update(CFG, -0.1, 0.5, limit=1.0) < 0.0
+
+
+def test_integrator_stops_short_of_the_limit():
+    pi = PIRegulator()
+    # Each step adds 0.3; the one that would take the output past the
+    # limit is not taken
+    outs = [pi.update(CFG, 1.0, 0.5, limit=1.0) for _ in range(20)]
+    assert outs[:3] == pytest.approx([0.6, 0.9, 0.9])
+    frozen = pi.integral
+    assert frozen == pytest.approx(0.6)
+    # A reversed error integrates again
+    pi.update(CFG, -1.0, 0.5, limit=1.0)
+    assert pi.integral < frozen
+
+
+def test_hold_freezes_and_clamps():
+    pi = PIRegulator()
+    pi.integral = 0.8
+    assert pi.update(CFG, 5.0, 0.5, limit=1.0, hold=True) == 0.8
+    assert pi.integral == 0.8
+    assert pi.update(CFG, 5.0, 0.5, limit=0.5, hold=True) == 0.5
+    assert pi.update(CFG, 5.0, 0.5, limit=0.0) == 0.0
+    assert pi.integral == 0.0
+
+
+def test_only_the_limiting_loop_acts():
+    reg = SetpointRegulator()
+    reg.update(CFG, 400.0, 10.0, 399.0, 5.0, now=1.0)
+    reg.update(CFG, 400.0, 10.0, 399.0, 5.0, now=1.5)
+    # Voltage-limited (CV): the current loop must not push up
+    assert reg.trim_v > 0.0
+    assert reg.trim_a == 0.0
+    assert reg.current.integral == 0.0
+    reg.reset()
+    reg.update(CFG, 400.0, 10.0, 300.0, 9.8, now=1.0)
+    reg.update(CFG, 400.0, 10.0, 300.0, 9.8, now=1.5)
+    assert reg.trim_v == 0.0
+    assert reg.trim_a == pytest.approx(0.3 * 0.2 + 0.6 * 0.2 * 0.5)
+
+
+def test_no_integration_across_a_gap():
+    reg = SetpointRegulator()
+    reg.update(CFG, 400.0, 10.0, 399.0, 5.0, now=1.0)
+    first = reg.voltage.integral
+    reg.update(CFG, 400.0, 10.0, 399.0, 5.0, now=1.0 + MAX_DT_S + 0.1)
+    assert reg.voltage.integral == first
@@ -0,0 +1,93 @@
+"""Sliding-window rate meter and log-spaced histogram."""
+
+import numpy as np
+import pytest
+
+from obc_controller.stats import LogHistogram, RateMeter, TrafficMeter
+
+
+def _feed(meter: RateMeter, start: float, stop: float, hz: float) -> float:
+    n = int(round((stop - start) * hz))
+    for k in range(n):
+        meter.add(start + k / hz)
+    return start + (n - 1) / hz
+
+
+def test_rate_at_khz():
+    meter = RateMeter(window_s=2.0, buckets=20)
+    now = _feed(meter, 10.0, 15.0, 1000.0)
+    assert meter.rate(now) == pytest.approx(1000.0, rel=0.01)
+
+
+def test_rate_follows_a_step():
+    meter = RateMeter(window_s=2.0, buckets=20)
+    now = _feed(meter, 0.0, 3.0, 2000.0)
+    now = _feed(meter, now + 0.001, now + 3.0, 500.0)
+    # The 2000 Hz part has rolled out of the window
+    assert meter.rate(now) == pytest.approx(500.0, rel=0.01)
+
+
+def test_buckets_clear_as_time_advances():
+    meter = RateMeter(window_s=2.0, buckets=20)
+    now = _feed(meter, 0.0, 1.0, 1000.0)
+    # Half the window later, only the newer half is left
+    assert meter.rate(now + 1.0) == pytest.approx(500.0, rel=0.06)
+    assert meter.rate(now + 2.1) == 0.0
+    meter.add(now + 2.2)
+    assert meter.rate(now + 2.2) == pytest.approx(1 / 2.0, rel=0.06)
+
+
+def test_late_event_outside_window_is_ignored():
+    meter = RateMeter(window_s=2.0, buckets=20)
+    meter.add(10.0)
+    meter.add(5.0)
+    assert meter.rate(10.0) == pytest.approx(1 / 1.9, rel=0.06)
+
+
+def test_empty_meter_rate_is_zero():
+    assert RateMeter().rate(1.0) == 0.0
+
+
+@pytest.mark.parametrize("per_decade", [50, 200])
+def test_percentiles_match_numpy(per_decade):
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(np.log(0.5), 0.05, 20_001)
+    values[:50] = rng.uniform(0.1, 2.0, 50)  # stalls and bursts
+    h = LogHistogram(per_decade=per_decade)
+    for v in values:
+        h.add(float(v))
+    width = 10.0 ** (1.0 / per_decade)
+    qs = (1, 50, 90, 95, 99, 99.9)
+    for q, got in zip(qs, h.percentiles(qs)):
+        want = np.percentile(values, q, method="inverted_cdf")
+        # Upper edge of the bucket holding the exact value
+        assert want <= got <= want * width, q
+    assert values.min() <= h.percentile(0) <= values.min() * width
+    assert h.percentile(100) == h.max == values.max()
+    assert h.mean == pytest.approx(values.mean())
+
+
+def test_percentiles_clamped_to_range():
+    h = LogHistogram()
+    h.add(0.5)
+    assert h.percentiles((0, 50, 100)) == [0.5, 0.5, 0.5]
+    assert LogHistogram().percentiles((50, 99)) == [0.0, 0.0]
+
+
+def test_out_of_range_values_keep_exact_min_max():
+    h = LogHistogram(lo=1e-3, hi=1.0)
+    h.add(5.0)
+    h.add(1e-5)
+    assert (h.count, h.min, h.max) == (2, 1e-5, 5.0)
+    assert h.percentiles((0, 100)) == [1e-3, 1.0]
+
+
+def test_traffic_meter_snapshot():
+    m = TrafficMeter()
+    for k in range(2001):
+        m.record(k * 0.001)
+    snap = m.snapshot(2.0)
+    assert snap.count == 2001
+    assert snap.rate_hz == pytest.approx(1000.0, rel=0.01)
+    assert snap.min_ms == pytest.approx(1.0)
+    assert snap.max_ms == pytest.approx(1.0)
@@ -0,0 +1,75 @@
+"""Shared-memory telemetry ring, producer and consumer side."""
+
+import pytest
+
+from obc_controller.can_protocol import Message2, StatusFlags
+from obc_controller.telemetry_ring import TelemetryRing
+
+
+@pytest.fixture
+def ring():
+    producer = TelemetryRing(capacity=8)
+    consumer = TelemetryRing(capacity=8, name=producer.name)
+    yield producer, consumer
+    consumer.close()
+    producer.close()
+
+
+def _msg(k: int) -> Message2:
+    return Message2(
+        output_voltage=300.0 + k,
+        output_current=k / 10.0,
+        status=StatusFlags.from_byte(k),
+        input_voltage=230.0,
+        temperature=25.0,
+        timestamp=float(k),
+    )
+
+
+def test_wraps_around_in_order(ring):
+    producer, consumer = ring
+    for k in range(5):
+        producer.push(_msg(k))
+    assert consumer.read()["timestamp"].tolist() == [0, 1, 2, 3, 4]
+    for k in range(5, 11):  # slots 5..7, then 0..2 again
+        producer.push(_msg(k))
+    out = consumer.read()
+    assert out["timestamp"].tolist() == [5, 6, 7, 8, 9, 10]
+    assert out["vout"].tolist() == [305, 306, 307, 308, 309, 310]
+    assert consumer.overruns == 0
+    assert len(consumer.read()) == 0
+
+
+def test_slow_reader_loses_oldest(ring):
+    producer, consumer = ring
+    for k in range(20):
+        producer.push(_msg(k))
+    out = consumer.read()
+    assert out["timestamp"].tolist() == list(range(12, 20))
+    assert consumer.overruns == 12
+    producer.push(_msg(20))
+    assert consumer.read()["timestamp"].tolist() == [20]
+    assert consumer.overruns == 12
+
+
+def test_read_messages_round_trip(ring):
+    producer, consumer = ring
+    sent = [_msg(k) for k in range(3)]
+    for msg in sent:
+        producer.push(msg)
+    got = consumer.read_messages()
+    assert got == sent
+    assert [m.timestamp for m in got] == [0.0, 1.0, 2.0]
+    assert got[2].status is StatusFlags.from_byte(2)
+
+
+def test_late_consumer_starts_at_head():
+    producer = TelemetryRing(capacity=4)
+    try:
+        producer.push(_msg(0))
+        consumer = TelemetryRing(capacity=4, name=producer.name)
+        producer.push(_msg(1))
+        assert consumer.read()["timestamp"].tolist() == [1]
+        consumer.close()
+    finally:
+        producer.close()
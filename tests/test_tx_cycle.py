@@ -0,0 +1,116 @@
+"""Message1 TX cycle: deadline scheduler and achieved rate on the bus."""
+
+import time
+
+import can
+import pytest
+
+from obc_controller.can_protocol import DEFAULT_PROTOCOL, ChargerControl
+from obc_controller.engine import ChargerEngine
+from obc_controller.scheduler import CATCHUP_S, TxScheduler
+
+# Achieved rate vs. nominal, and first-to-last frame drift against
+# first + n * period
+RATE_TOLERANCE = 0.01
+MAX_DRIFT_S = 0.005
+
+
+def _send_due(sched: TxScheduler, now: float) -> int:
+    """Send every slot due at *now*, back-to-back; returns how many."""
+    sent = 0
+    while sched.due(now):
+        sched.mark_sent(now)
+        sent += 1
+    return sent
+
+
+def test_schedule_does_not_drift():
+    sched = TxScheduler(0.125)
+    sched.start(0.0)
+    for k in range(100):
+        # Every send a little late; the deadlines stay on the grid
+        assert _send_due(sched, k * 0.125 + 0.01) == 1
+    assert sched.next_deadline == 100 * 0.125
+    mean_ms, max_ms = sched.jitter_ms()
+    assert mean_ms == pytest.approx(10.0)
+    assert max_ms == pytest.approx(10.0)
+    assert sched.missed == 0
+
+
+def test_overdue_slots_sent_back_to_back():
+    sched = TxScheduler(0.125, catchup_s=1.0)
+    sched.start(0.0)
+    assert _send_due(sched, 0.0) == 1
+    # 0.5 s stall: slots at 0.125 .. 0.5 are all still sent
+    assert _send_due(sched, 0.5) == 4
+    assert sched.missed == 0
+    assert sched.next_deadline == 0.625
+    assert sched.jitter_ms()[1] == pytest.approx(375.0)
+
+
+def test_slots_beyond_catchup_window_are_missed():
+    sched = TxScheduler(0.125, catchup_s=1.0)
+    sched.start(0.0)
+    _send_due(sched, 0.0)
+    # 5 s stall, 40 slots overdue: the one in hand goes out, then only
+    # the last 1 s of them (8); the rest are given up
+    assert _send_due(sched, 5.0) == 1 + 8
+    assert sched.missed == 40 - 9
+    assert sched.next_deadline == 5.125
+    assert _send_due(sched, 5.125) == 1
+
+
+def test_default_catchup_window():
+    period = 1 / 64  # exact in binary
+    sched = TxScheduler(period)
+    sched.start(0.0)
+    _send_due(sched, 0.0)
+    sent = _send_due(sched, 1.0)
+    assert sent == 1 + int(CATCHUP_S / period)
+    assert sched.missed + sent == 64
+
+
+def test_scheduler_rejects_bad_period():
+    with pytest.raises(ValueError):
+        TxScheduler(0.0)
+
+
+@pytest.mark.parametrize("cycle_ms, seconds", [
+    (10, 1.0), (20, 1.0), (100, 1.5), (500, 3.0),
+])
+def test_achieved_rate_on_virtual_bus(channel, run_engine, cycle_ms,
+                                      seconds):
+    health = []
+
+    def publish(kind, *args):
+        if kind == "health_stats":
+            health.append(args[0])
+
+    engine = ChargerEngine(publish)
+    engine.set_connection_params("virtual", channel, 500000)
+    engine.set_cycle_ms(cycle_ms)
+    engine.configure(voltage=320.0, current=10.0,
+                     control=ChargerControl.START_CHARGING)
+    engine.enable_tx(True)
+    peer = can.Bus(interface="virtual", channel=channel)
+    try:
+        run_engine(engine)
+        # Bus timestamps of the Message1 frames seen by a second node
+        stamps = []
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            frame = peer.recv(timeout=0.05)
+            if (frame is not None
+                    and frame.arbitration_id == DEFAULT_PROTOCOL.msg1_id):
+                stamps.append(frame.timestamp)
+        stats = health[-1]
+    finally:
+        peer.shutdown()
+
+    period = cycle_ms / 1000.0
+    n = len(stamps) - 1
+    assert n >= int(seconds / period) - 2
+    span = stamps[-1] - stamps[0]
+    assert n / span == pytest.approx(1.0 / period, rel=RATE_TOLERANCE)
+    assert abs(span - n * period) <= MAX_DRIFT_S
+    assert stats.tx_missed == 0
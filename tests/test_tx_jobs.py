@@ -0,0 +1,89 @@
+"""One-shot TX jobs run by the engine loop."""
+
+import time
+
+import can
+
+from obc_controller.can_protocol import DEFAULT_PROTOCOL, ChargerControl
+from obc_controller.engine import ChargerEngine
+from obc_controller.tx_jobs import TxJob, TxStep
+
+JOB_ID = 0x01002100
+
+
+def _job(*delays: float) -> TxJob:
+    return TxJob("test", tuple(
+        TxStep(delay, JOB_ID, bytes([k])) for k, delay in enumerate(delays)
+    ))
+
+
+def _engine(
+    channel: str, events: list, cycle_ms: int = 100
+) -> ChargerEngine:
+    engine = ChargerEngine(lambda kind, *args: events.append((kind, args)))
+    engine.set_connection_params("virtual", channel, 500000)
+    engine.set_cycle_ms(cycle_ms)
+    engine.configure(voltage=320.0, current=10.0,
+                     control=ChargerControl.START_CHARGING)
+    engine.enable_tx(True)
+    return engine
+
+
+def _frames(peer: can.BusABC, seconds: float) -> list[tuple[float, int]]:
+    out = []
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        frame = peer.recv(timeout=0.02)
+        if frame is not None:
+            out.append((time.monotonic(), frame.arbitration_id))
+    return out
+
+
+def test_job_frame_goes_before_message1(channel, run_engine):
+    events = []
+    engine = _engine(channel, events)
+    # Queued before the connect: due in the same pass as the first
+    # Message1 slot
+    engine.submit_job(_job(0.0, 0.0))
+    peer = can.Bus(interface="virtual", channel=channel)
+    try:
+        run_engine(engine)
+        ids = [can_id for _, can_id in _frames(peer, 0.3)]
+    finally:
+        peer.shutdown()
+    # One job frame is queued at a time, so the second follows the
+    # Message1
+    assert ids[:3] == [JOB_ID, DEFAULT_PROTOCOL.msg1_id, JOB_ID]
+    assert ("job_done", ("test", True, "")) in events
+
+
+def test_submit_job_wakes_the_loop(channel, run_engine):
+    events = []
+    engine = _engine(channel, events, cycle_ms=500)
+    peer = can.Bus(interface="virtual", channel=channel)
+    try:
+        run_engine(engine)
+        _frames(peer, 0.15)  # first Message1; the loop is now waiting
+        submitted = time.monotonic()
+        engine.submit_job(_job(0.0))
+        frames = _frames(peer, 0.2)
+    finally:
+        peer.shutdown()
+    sent = [t for t, can_id in frames if can_id == JOB_ID]
+    assert sent and sent[0] - submitted < 0.05
+
+
+def test_cancel_drops_the_rest(channel, run_engine):
+    events = []
+    engine = _engine(channel, events)
+    engine.submit_job(_job(0.0, 0.2, 0.2, 0.2))
+    peer = can.Bus(interface="virtual", channel=channel)
+    try:
+        run_engine(engine)
+        _frames(peer, 0.1)
+        engine.cancel_jobs()
+        frames = _frames(peer, 0.8)
+    finally:
+        peer.shutdown()
+    assert all(can_id != JOB_ID for _, can_id in frames)
+    assert ("job_done", ("test", False, "cancelled")) in events
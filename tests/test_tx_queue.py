@@ -0,0 +1,186 @@
+"""Priority TX queue: lane order, back-off and Message1 replacement."""
+
+import errno
+
+import can
+import pytest
+
+from obc_controller.tx_queue import (
+    PRIO_CYCLIC,
+    PRIO_DIAG,
+    PRIO_SAFETY,
+    TX_RETRY_MAX_S,
+    TX_RETRY_MIN_S,
+    TxQueue,
+    _buffer_full,
+)
+
+MSG1_ID = 0x1806E5F4
+
+
+class _Bus:
+    """Records sent frames; refuses sends while *refuse* is set."""
+
+    def __init__(self):
+        self.sent: list[can.Message] = []
+        self.attempts = 0
+        self.refuse: can.CanError | None = None
+
+    def send(self, msg, timeout=None):
+        self.attempts += 1
+        if self.refuse is not None:
+            raise self.refuse
+        self.sent.append(msg)
+
+
+FULL = can.CanOperationError("Transmit buffer full", error_code=errno.ENOBUFS)
+
+
+def _frame(can_id: int, data: int = 0) -> can.Message:
+    return can.Message(arbitration_id=can_id, data=[data],
+                       is_extended_id=True)
+
+
+def _sent(bus: _Bus) -> list[tuple[int, int]]:
+    return [(m.arbitration_id, m.data[0]) for m in bus.sent]
+
+
+def test_lanes_flush_in_priority_order():
+    q, bus = TxQueue(), _Bus()
+    q.put(PRIO_CYCLIC, _frame(MSG1_ID, 1))
+    q.put(PRIO_DIAG, _frame(0x100, 2))
+    q.put(PRIO_DIAG, _frame(0x100, 3))
+    q.put(PRIO_SAFETY, _frame(0x200, 4))
+    assert q.flush(bus, 0.0) == (4, False)
+    assert _sent(bus) == [(0x200, 4), (0x100, 2), (0x100, 3), (MSG1_ID, 1)]
+    assert len(q) == 0 and q.backlog == 0 and q.peak == 4
+
+
+def test_backoff_doubles_up_to_cap():
+    q, bus = TxQueue(), _Bus()
+    bus.refuse = FULL
+    q.put(PRIO_CYCLIC, _frame(MSG1_ID))
+    now = 0.0
+    delays = []
+    for _ in range(8):
+        assert q.flush(bus, now) == (0, True)
+        delays.append(round(q.retry_at - now, 6))
+        # Nothing is tried before the retry time
+        attempts = bus.attempts
+        assert q.flush(bus, q.retry_at - 1e-6) == (0, False)
+        assert bus.attempts == attempts
+        now = q.retry_at
+    assert delays == [0.002, 0.004, 0.008, 0.016, 0.032, 0.05, 0.05, 0.05]
+    assert delays[0] == TX_RETRY_MIN_S and delays[-1] == TX_RETRY_MAX_S
+    assert q.overflows == 8 and q.backlog == 1
+    # The refused frame was kept and goes out once the buffer drains
+    bus.refuse = None
+    assert q.flush(bus, now) == (1, False)
+    assert _sent(bus) == [(MSG1_ID, 0)]
+    bus.refuse = FULL
+    q.put(PRIO_CYCLIC, _frame(MSG1_ID))
+    q.flush(bus, now)
+    assert q.retry_at - now == pytest.approx(TX_RETRY_MIN_S)
+
+
+def test_progress_resets_backoff():
+    q, bus = TxQueue(), _Bus()
+    bus.refuse = FULL
+    q.put(PRIO_DIAG, _frame(0x100))
+    for now in (0.0, 0.002, 0.006):
+        q.flush(bus, now)
+    assert q.retry_at == pytest.approx(0.014)
+
+    class _OneMore(_Bus):
+        def send(self, msg, timeout=None):
+            if self.sent:
+                raise FULL
+            self.sent.append(msg)
+
+    q.put(PRIO_SAFETY, _frame(0x200))
+    assert q.flush(_OneMore(), 0.007) == (1, True)
+    # The buffer takes frames, just slower than they come: short retry
+    assert q.retry_at == pytest.approx(0.007 + TX_RETRY_MIN_S)
+
+
+def test_stop_cancels_backoff():
+    q, bus = TxQueue(), _Bus()
+    bus.refuse = FULL
+    q.put(PRIO_DIAG, _frame(0x100))
+    q.flush(bus, 0.0)
+    q.flush(bus, q.retry_at)
+    assert q.retry_at > 0.0
+    bus.refuse = None
+    q.put(PRIO_SAFETY, _frame(0x200))
+    assert q.flush(bus, 0.003) == (2, False)
+    assert _sent(bus) == [(0x200, 0), (0x100, 0)]
+
+
+def test_newer_message1_replaces_queued_one():
+    q, bus = TxQueue(), _Bus()
+    done = []
+    q.put(PRIO_CYCLIC, _frame(MSG1_ID, 1), lambda t, e: done.append(1))
+    q.put(PRIO_CYCLIC, _frame(MSG1_ID + 1, 9))  # other charger
+    q.put(PRIO_CYCLIC, _frame(MSG1_ID, 2), lambda t, e: done.append(2))
+    assert q.dropped == 1
+    q.flush(bus, 0.0)
+    assert _sent(bus) == [(MSG1_ID + 1, 9), (MSG1_ID, 2)]
+    assert done == [2]  # no callback for the replaced frame
+
+
+def test_stop_drops_queued_message1():
+    q, bus = TxQueue(), _Bus()
+    q.put(PRIO_CYCLIC, _frame(MSG1_ID, 0))  # START
+    q.put(PRIO_SAFETY, _frame(MSG1_ID, 1))  # STOP, same ID
+    assert q.dropped == 1
+    q.flush(bus, 0.0)
+    assert _sent(bus) == [(MSG1_ID, 1)]
+
+
+def test_failed_send_is_dropped_with_error():
+    q, bus = TxQueue(), _Bus()
+    results = []
+    bus.refuse = can.CanOperationError("Bus-off")
+    q.put(PRIO_DIAG, _frame(0x100), lambda t, e: results.append((t, e)))
+    q.put(PRIO_CYCLIC, _frame(MSG1_ID))
+    assert q.flush(bus, 1.0) == (0, True)
+    assert results == [(1.0, "TX error: Bus-off")]
+    assert len(q) == 1 and q.overflows == 0
+    bus.refuse = None
+    assert q.flush(bus, q.retry_at) == (1, False)
+    assert _sent(bus) == [(MSG1_ID, 0)]
+
+
+def test_clear_and_reset():
+    q = TxQueue()
+    q.put(PRIO_CYCLIC, _frame(MSG1_ID))
+    q.put(PRIO_DIAG, _frame(0x100))
+    q.drop(PRIO_DIAG)
+    assert not q.pending(PRIO_DIAG) and q.pending(PRIO_CYCLIC)
+    q.reset()
+    assert len(q) == 0 and q.peak == 0 and q.retry_at == 0.0
+
+
+@pytest.mark.parametrize("exc", [
+    can.CanTimeoutError("Send timed out"),
+    can.CanOperationError("anything", error_code=errno.ENOBUFS),
+    can.CanOperationError("anything", error_code=errno.EAGAIN),
+    can.CanOperationError("Transmit buffer full"),
+    can.CanOperationError("The transmit queue is full"),
+    can.CanOperationError("PCAN error: QXMTFULL"),
+    can.CanOperationError("[Errno 105] No buffer space available"),
+])
+def test_buffer_full(exc):
+    assert _buffer_full(exc)
+
+
+@pytest.mark.parametrize("exc", [
+    can.CanOperationError("Message not successfully written"),
+    can.CanOperationError("Bus-off"),
+    can.CanOperationError("Transmit failed", error_code=errno.ENETDOWN),
+    can.CanOperationError("buffer overfull flag in status"),
+    can.CanInitializationError("Transmit buffer full"),
+    can.CanError("Transmit buffer full"),
+])
+def test_not_buffer_full(exc):
+    assert not _buffer_full(exc)